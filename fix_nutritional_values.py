@@ -8,16 +8,28 @@ Fixes:
 3) Add ex:state ex:Solid or ex:Liquid based on category
 4) Preserve formatting & triple order
 5) Handles already converted ex:Category as well
+
+The input is split at subject boundaries into ~8 MB chunks that are fixed
+in a process pool and written back in order, so memory stays bounded for
+multi-GB dumps. --validate parses every fixed chunk with rdflib.
+
+    python3 fix_nutritional_values.py
+    python3 fix_nutritional_values.py big.ttl -o big_fixed.ttl --workers 8 --validate
 """
 
+import argparse
+import os
 import re
-import shutil
+import time
 from pathlib import Path
 
+from paralelo import ordered_map
+
 INPUT = Path("combined_menu.ttl")
-BACKUP = INPUT.with_suffix(".bak")
 OUTPUT = Path("combined_menu_fixed.ttl")
 
+CHUNK_BYTES = 8 * 2**20
+
 # ---------------------------------------
 # CATEGORY LIST
 # ---------------------------------------
@@ -62,6 +74,7 @@ numeric_pattern = re.compile(
 )
 
 subject_end = re.compile(r'\.\s*$')
+prefix_line = re.compile(r'\s*(@prefix|@base|PREFIX|BASE)\b')
 
 # ---------------------------------------
 # HELPER
@@ -70,62 +83,129 @@ def infer_state_from_category(category):
     """Return Solid/Liquid based on category."""
     return CATEGORY_TO_STATE.get(category, DEFAULT_STATE)
 
+# ---------------------------------------
+# SUBJECT REWRITE
+# ---------------------------------------
+def fix_lines(lines):
+    """Rewrite a list of whole subjects (lines ending at a subject end)."""
+    out = []
+    subject_lines = []
+    current_state = None
+
+    def category_repl(m):
+        nonlocal current_state
+        cat = m.group("cat1") or m.group("cat2")  # pick whichever matched
+        cat_name = cat.replace("ex:", "")  # remove ex: prefix for state inference
+        current_state = infer_state_from_category(cat_name)
+        return f"{m.group('prefix')}ex:{cat_name}{m.group('trail')}"
+
+    for line in lines:
+        # Fix numeric literals (replace quotes with numbers)
+        line = numeric_pattern.sub(lambda m: f"{m.group('prefix')}{m.group('number')}{m.group('trail')}", line)
+
+        # Fix category (handles quoted and already ex:Category)
+        line = category_pattern.sub(category_repl, line)
+
+        # Collect lines for the current subject
+        subject_lines.append(line)
+
+        # If end of subject, inject state before final "."
+        if subject_end.search(line):
+            all_text = "".join(subject_lines).rstrip()
+            if current_state:
+                # Replace last '.' with ';' for chaining
+                if all_text.endswith('.'):
+                    all_text = all_text[:-1] + ' ;'
+                # Determine indentation (match last non-empty line)
+                last_nonempty = next((l for l in reversed(subject_lines) if l.strip()), "")
+                indent_match = re.match(r'(\s*)', last_nonempty)
+                indent = indent_match.group(1) if indent_match else '    '
+                # Append ex:state triple
+                all_text += f"\n{indent}ex:hasPhysicalState ex:{current_state} .\n"
+            else:
+                all_text += "\n"
+            out.append(all_text)
+
+            # Reset for next item
+            subject_lines = []
+            current_state = None
+
+    # Trailing lines without a closing "." are copied unchanged
+    out.extend(subject_lines)
+    return "".join(out)
+
+
+def fix_chunk(lines, prefixes, validate):
+    """Worker: rewrite one chunk and, optionally, parse it to check the syntax."""
+    text = fix_lines(lines)
+    triples = None
+    if validate:
+        from rdflib import Graph
+        triples = len(Graph().parse(data=prefixes + text, format="turtle"))
+    return text, len(lines), triples
+
+
+def split_subjects(fin, chunk_bytes):
+    """Yield lists of lines cut only at subject ends, about `chunk_bytes` each."""
+    lines, size = [], 0
+    for line in fin:
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_bytes and subject_end.search(line):
+            yield lines
+            lines, size = [], 0
+    if lines:
+        yield lines
+
+
 # ---------------------------------------
 # MAIN
 # ---------------------------------------
+def fix_file(input=INPUT, output=OUTPUT, workers=None, chunk_bytes=CHUNK_BYTES, validate=False):
+    """Fix `input` into `output` in parallel; the input is never modified."""
+    workers = workers or os.cpu_count() or 1
+    prefixes = []  # @prefix lines, needed to validate each chunk on its own
+    stats = {"lines": 0, "chunks": 0, "triples": 0}
+
+    def jobs(fin):
+        for lines in split_subjects(fin, chunk_bytes):
+            if not stats["chunks"]:
+                prefixes.extend(l for l in lines if prefix_line.match(l))
+            stats["chunks"] += 1
+            yield lines, "".join(prefixes), validate
+
+    output = Path(output)
+    tmp = output.with_name(output.name + ".tmp")
+    with open(input, "r", encoding="utf-8") as fin, tmp.open("w", encoding="utf-8") as fout:
+        for text, n, triples in ordered_map(fix_chunk, jobs(fin), workers):
+            fout.write(text)
+            stats["lines"] += n
+            stats["triples"] += triples or 0
+    os.replace(tmp, output)
+    return stats
+
+
 def main():
-    if not INPUT.exists():
-        print(f"ERROR: file not found: {INPUT}")
+    parser = argparse.ArgumentParser(description="Fix numeric literals, categories and physical state")
+    parser.add_argument("input", nargs="?", type=Path, default=INPUT)
+    parser.add_argument("-o", "--output", type=Path, default=OUTPUT)
+    parser.add_argument("--workers", type=int, help="processes (default: one per CPU)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / 2**20, help="approximate chunk size")
+    parser.add_argument("--validate", action="store_true", help="parse every fixed chunk with rdflib")
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        print(f"ERROR: file not found: {args.input}")
         return
 
-    shutil.copyfile(INPUT, BACKUP)
-    print(f"Backup created at {BACKUP}")
-
-    with INPUT.open("r", encoding="utf-8") as fin, OUTPUT.open("w", encoding="utf-8") as fout:
-        subject_lines = []
-        current_state = None
-
-        for lineno, line in enumerate(fin, start=1):
-            # Fix numeric literals (replace quotes with numbers)
-            line = numeric_pattern.sub(lambda m: f"{m.group('prefix')}{m.group('number')}{m.group('trail')}", line)
-
-            # Fix category (handles quoted and already ex:Category)
-            def category_repl(m):
-                nonlocal current_state
-                cat = m.group("cat1") or m.group("cat2")  # pick whichever matched
-                cat_name = cat.replace("ex:", "")  # remove ex: prefix for state inference
-                current_state = infer_state_from_category(cat_name)
-                return f"{m.group('prefix')}ex:{cat_name}{m.group('trail')}"
-
-            line = category_pattern.sub(category_repl, line)
-
-            # Collect lines for the current subject
-            subject_lines.append(line)
-
-            # If end of subject, inject state before final "."
-            if subject_end.search(line):
-                all_text = "".join(subject_lines).rstrip()
-                if current_state:
-                    # Replace last '.' with ';' for chaining
-                    if all_text.endswith('.'):
-                        all_text = all_text[:-1] + ' ;'
-                    # Determine indentation (match last non-empty line)
-                    last_nonempty = next((l for l in reversed(subject_lines) if l.strip()), "")
-                    indent_match = re.match(r'(\s*)', last_nonempty)
-                    indent = indent_match.group(1) if indent_match else '    '
-                    # Append ex:state triple
-                    all_text += f"\n{indent}ex:hasPhysicalState ex:{current_state} .\n"
-                else:
-                    all_text += "\n"
-                fout.write(all_text)
-
-                # Reset for next item
-                subject_lines = []
-                current_state = None
-
-    print("\nDONE — Output saved to:", OUTPUT)
-    print("To replace original: mv", OUTPUT, INPUT)
+    t0 = time.perf_counter()
+    stats = fix_file(args.input, args.output, args.workers, int(args.chunk_mb * 2**20), args.validate)
+    elapsed = time.perf_counter() - t0
+    print(f"{stats['lines']} lines in {stats['chunks']} chunks, {elapsed:.2f} s")
+    if args.validate:
+        print(f"Validated: {stats['triples']} triples")
+    print("\nDONE — Output saved to:", args.output)
 
 # ---------------------------------------
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
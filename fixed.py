@@ -27,9 +27,6 @@ input_csv = "combined_menu_renamed.csv"
 # Ruta del CSV renombrado
 output_csv = "combined_menu_fixed.csv"
 
-# Leer el CSV original
-df = pd.read_csv(input_csv)
-
 # Diccionario con los cambios de nombre de columnas
 rename_columns = {
     "Total Fat (g)": "TotalFat",
@@ -43,10 +40,16 @@ rename_columns = {
     "Protein (g)": "Protein"
 }
 
-# Renombrar las columnas
-df.rename(columns=rename_columns, inplace=True)
 
-# Guardar el CSV corregido
-df.to_csv(output_csv, index=False)
+def renombrar_columnas(df):
+    return df.rename(columns=rename_columns)
+
+
+if __name__ == "__main__":
+    # Leer el CSV original
+    df = renombrar_columnas(pd.read_csv(input_csv))
+
+    # Guardar el CSV corregido
+    df.to_csv(output_csv, index=False)
 
-print(f"CSV renombrado generado: {output_csv}")
+    print(f"CSV renombrado generado: {output_csv}")
@@ -1,37 +1,209 @@
-from flask import Flask,render_template,jsonify, request
-from utils import get_items_sparql, platos_similares, map_item_to_json
+import logging
+import time
+
+from flask import Flask,render_template,jsonify, request, stream_with_context, g as request_ctx
+import catalog_export
+import http_cache
+import metrics
+import shared_catalog
+import utils
+from utils import platos_similares, platos_similares_lote, map_item_to_json
+from catalog_query import get_catalog_index, get_name_index, parse_query_args
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Ítems por página en la tabla de index.html
+PAGE_SIZE = 50
+# Máximo de platos por request en /recomendar/batch
+MAX_BATCH = 5000
+# Parte del ETag de `/`: un cambio en la plantilla invalida las copias de los clientes
+TEMPLATE_HASH = utils.file_hash(utils.BASE_DIR / "templates/index.html")
 
-@app.route("/")
-def index():
-    items = get_items_sparql()
-    query = request.args.get("q", "").strip().lower()
+if shared_catalog.ENABLED:
+    # con `gunicorn --preload` el master publica el catálogo antes del fork
+    from catalog import get_catalog
+    get_catalog()
+
+
+def parse_weights(raw):
+    """Convierte "calories:2,sodium:0.5" en {"calories": 2.0, "sodium": 0.5}."""
+    if not raw:
+        return None
+    weights = {}
+    for part in raw.split(","):
+        nutrient, _, value = part.partition(":")
+        try:
+            weights[nutrient.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"peso inválido para {nutrient.strip()!r}") from None
+    return weights
+
+
+def paginar(rows, total, page, per_page, catalog):
+    return {
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": max(1, -(-total // per_page)) if per_page else 1,
+        "items": [catalog.items[i] for i in rows],
+    }
+
+
+# --- Métricas ---
+def _catalog_items():
+    import catalog
+    current = catalog._state["catalog"]
+    return {(): len(current) if current is not None else 0}
+
+
+metrics.gauge_callback("app_graph_triples", "Tripletes del grafo con sellos", lambda: {(): len(utils.g)})
+metrics.gauge_callback("app_catalog_items", "Ítems del catálogo materializado", _catalog_items)
 
-    # Filtrar los ítems por nombre
-    if query:
-        filtered = [p for p in items if query in p["name"].lower()]
-    else:
-        filtered = items
+
+@app.before_request
+def _start_timer():
+    request_ctx.metrics_start = time.perf_counter()
+    metrics.start_trace()
+
+
+@app.after_request
+def _record_status(response):
+    request_ctx.metrics_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def _observe_request(exc):
+    start = request_ctx.pop("metrics_start", None)
+    stages = metrics.end_trace()
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    status = request_ctx.pop("metrics_status", 500)
+    metrics.REQUEST_DURATION.observe(elapsed, route, request.method, status)
+    if elapsed * 1000 >= metrics.SLOW_REQUEST_MS:
+        metrics.SLOW_REQUESTS.inc(route)
+        detail = ", ".join(f"{name}={t * 1000:.1f}ms" for name, t in stages)
+        logger.warning(f"Request lento: {request.method} {request.full_path.rstrip('?')} {status} "
+                       f"en {elapsed * 1000:.1f} ms [{detail}]")
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _render_index(catalog_index, query):
+    # Sólo la primera página va en el HTML; el resto se pide a /platos
+    rows, total = catalog_index.query(q=query or None, page=1, per_page=PAGE_SIZE)
+    page = paginar(rows, total, 1, PAGE_SIZE, catalog_index.catalog)
+    # el paginador de script.js reusa la búsqueda con la que se armó la página
+    page["query"] = query
 
     # Si hay coincidencias, calcular platos similares al primero
-    if filtered:
-        recommendations = platos_similares(filtered[0]["name"], k=6)
+    if page["items"]:
+        recommendations = platos_similares(page["items"][0]["name"], k=6)
     else:
         recommendations = []
 
-    return render_template(
-        "index.html",
-        title="Index",
-        items=filtered,
-        recommendations=recommendations
-    )
+    with metrics.stage("render:index"):
+        return render_template(
+            "index.html",
+            title="Index",
+            items=page["items"],
+            page=page,
+            facets=catalog_index.facets(),
+            recommendations=recommendations
+        )
+
+
+@app.route("/")
+def index():
+    catalog_index = get_catalog_index()
+    query = request.args.get("q", "").strip()
+    tag = http_cache.etag(catalog_index.catalog.version, TEMPLATE_HASH, query)
+    if query:
+        return http_cache.conditional(tag, lambda: _render_index(catalog_index, query))
+    # la página inicial es igual para todos: se arma y comprime una vez por versión
+    return http_cache.send(tag, lambda: http_cache.prebuilt(
+        catalog_index.catalog, "index", lambda c: _render_index(catalog_index, "").encode(), "text/html"))
 
 @app.route("/platos")
 def listar_platos():
-    items = get_items_sparql()
-    return jsonify(items)
+    """Catálogo con filtros, orden y paginación opcionales.
+
+    Sin `page`/`per_page` devuelve la lista de ítems (como antes); con ellos,
+    un objeto con `total`, `page`, `per_page`, `pages` e `items`. Con
+    `format=columnar|ndjson|arrow|parquet` se usa otro formato de salida
+    (ver `catalog_export.py`).
+    """
+    fmt = request.args.get("format", "json")
+    try:
+        params = parse_query_args(request.args)
+        if fmt not in catalog_export.FORMATS:
+            raise ValueError(f"format debe ser uno de {', '.join(catalog_export.FORMATS)}")
+    except ValueError as e:
+        return jsonify({"error": f"Parámetro inválido: {e}"}), 400
+    if not catalog_export.available(fmt):
+        return jsonify({"error": f"Formato no disponible en este servidor: {fmt} (requiere pyarrow)"}), 501
+
+    catalog_index = get_catalog_index()
+    catalog = catalog_index.catalog
+    tag = http_cache.etag(catalog.version, request.query_string)
+
+    def serializar():
+        rows, total = catalog_index.query(**params)
+        with metrics.stage("serialize:platos" if fmt == "json" else f"serialize:platos:{fmt}"):
+            page = {}
+            if params["per_page"] is not None:
+                page = paginar(rows, total, params["page"], params["per_page"], catalog)
+            if fmt == "json":
+                return jsonify(page or [catalog.items[i] for i in rows])
+            if fmt == "ndjson":
+                lines = catalog_export.ndjson(catalog, rows, app.json.dumps)
+                return app.response_class(stream_with_context(lines), mimetype=catalog_export.MIMETYPES[fmt])
+            if fmt == "columnar":
+                page.pop("items", None)
+                page.setdefault("total", total)
+                return app.response_class(catalog_export.columnar_json(catalog, rows, **page),
+                                          mimetype=catalog_export.MIMETYPES[fmt])
+            response = app.response_class(catalog_export.WRITERS[fmt](catalog, rows),
+                                          mimetype=catalog_export.MIMETYPES[fmt])
+            response.headers["Content-Disposition"] = f"attachment; filename=platos-{catalog.version}.{fmt}"
+            return response
+
+    if set(request.args) - {"format"} or fmt not in ("json", "columnar"):
+        return http_cache.conditional(tag, serializar)
+    # el catálogo completo se serializa y comprime una vez por versión (y formato)
+    key = "platos" if fmt == "json" else ("platos", fmt)
+    return http_cache.send(tag, lambda: http_cache.prebuilt(
+        catalog, key, lambda c: serializar().get_data(), "application/json"))
+
+@app.route("/platos/filtros")
+def filtros_platos():
+    return jsonify(get_catalog_index().facets())
+
+@app.route("/buscar")
+def buscar():
+    """Búsqueda por nombre (exacta, prefijo, subcadena y aproximada), ordenada por puntaje."""
+    q = request.args.get("q", "").strip()
+    try:
+        limit = max(1, min(int(request.args.get("limit", 10)), 100))
+    except ValueError:
+        return jsonify({"error": "Parámetro inválido: limit"}), 400
+    fuzzy = request.args.get("fuzzy", "1") not in ("0", "false")
+
+    names = get_name_index()
+    with metrics.stage("name_search"):
+        hits = names.search(q, limit=limit, fuzzy=fuzzy)
+    resultados = [
+        dict(names.catalog.items[row], score=round(score, 3), match=kind)
+        for row, score, kind in hits
+    ]
+    return jsonify({"query": q, "resultados": resultados})
 
 @app.route("/recomendar")
 def recomendar():
@@ -39,29 +211,151 @@ def recomendar():
     if not nombre:
         return jsonify({"error": "Falta el parámetro 'nombre'"}), 400
     
-    similares = platos_similares(nombre)
+    try:
+        k = int(request.args.get("k", 6))
+        weights = parse_weights(request.args.get("pesos"))
+        similares = platos_similares(
+            nombre,
+            k=k,
+            metric=request.args.get("metric", "euclidean"),
+            weights=weights,
+            category=request.args.get("category") or None,
+            state=request.args.get("state") or None,
+            company=request.args.get("company") or None,
+        )
+    except (ValueError, KeyError) as e:
+        return jsonify({"error": f"Parámetro inválido: {e}"}), 400
+
     return jsonify({
         "plato_base": nombre,
         "recomendaciones": similares
     })
 
+@app.route("/recomendar/batch", methods=["POST"])
+def recomendar_batch():
+    """Recomendaciones para varios platos: {"nombres": [...], "k", "metric", "pesos", "category", ...}."""
+    body = request.get_json(silent=True)
+    nombres = body.get("nombres") if isinstance(body, dict) else None
+    if not isinstance(nombres, list) or not all(isinstance(n, str) for n in nombres):
+        return jsonify({"error": "Falta la lista 'nombres'"}), 400
+    if len(nombres) > MAX_BATCH:
+        return jsonify({"error": f"Máximo {MAX_BATCH} platos por request"}), 400
+
+    try:
+        k = int(body.get("k", 6))
+        pesos = body.get("pesos")
+        weights = parse_weights(pesos) if isinstance(pesos, str) else pesos
+        similares = platos_similares_lote(
+            nombres,
+            k=k,
+            metric=body.get("metric", "euclidean"),
+            weights=weights,
+            category=body.get("category") or None,
+            state=body.get("state") or None,
+            company=body.get("company") or None,
+        )
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return jsonify({"error": f"Parámetro inválido: {e}"}), 400
+
+    return jsonify({"resultados": [
+        {"plato_base": nombre, "recomendaciones": recs} if recs is not None
+        else {"plato_base": nombre, "error": "Plato no encontrado"}
+        for nombre, recs in zip(nombres, similares)
+    ]})
+
+@app.route("/platos_en_rango")
+def platos_en_rango():
+    """Platos locales dentro de ±TOLERANCES del plato dado (misma semántica que WikiFCD)."""
+    from querys import TOLERANCES
+    from spatial_index import get_spatial_index
+    nombre = request.args.get("nombre")
+    if not nombre:
+        return jsonify({"error": "Falta el parámetro 'nombre'"}), 400
+    index = get_spatial_index()
+    idx = index.catalog.index_of(nombre)
+    if idx is None:
+        return jsonify({"error": "Plato no encontrado"}), 404
+
+    base = dict(zip(index.nutrients, index.tree.points[idx]))
+    rows = index.within_tolerances(base, TOLERANCES)
+    return jsonify({
+        "plato_base": index.catalog.items[idx]["name"],
+        "platos": [index.catalog.items[i] for i in rows if i != idx]
+    })
+
 @app.route("/recomendar_wiki")
 def recomendar_wiki():
     # Supongamos que ya tienes una función que devuelve los platos desde el TTL
-    from querys import fetch_foods_with_ttl_and_json  
+    from querys import fetch_foods_with_ttl_and_json, WikiFCDError
     nombre = request.args.get("nombre")
-    items = get_items_sparql()
-    base_item = next((p for p in items if p["name"].lower() == nombre.lower()), None)
+    names = get_name_index()
+    row = names.find(nombre)
+    base_item = names.catalog.items[row] if row is not None else None
     if not base_item:
         return jsonify({"error": "Plato no encontrado"}), 404
 
     plato_base = map_item_to_json(base_item)
     
-    recomendaciones = fetch_foods_with_ttl_and_json(plato_base)[0]
+    try:
+        recomendaciones = fetch_foods_with_ttl_and_json(plato_base)[0]
+    except WikiFCDError as e:
+        return jsonify({"error": str(e), "recomendaciones": []}), 502
     print(recomendaciones)
 
     return jsonify({"recomendaciones": recomendaciones})
 
 
+
+# --- Administración del catálogo (ADMIN_TOKEN) ---
+def _admin(cambios):
+    """Aplica `cambios` (ver catalog_updates.aplicar) y traduce los errores a HTTP."""
+    import hmac
+    import catalog_updates
+    token = catalog_updates.ADMIN_TOKEN
+    if not token:
+        return jsonify({"error": "API de administración deshabilitada"}), 404
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"error": "No autorizado"}), 401
+    try:
+        catalog, uris = catalog_updates.aplicar(cambios)
+    except ValueError as e:
+        return jsonify({"error": f"Plato inválido: {e}"}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    platos = []
+    for uri in uris:
+        idx = catalog.index_of_uri(uri)
+        platos.append(catalog.items[idx] if idx is not None else {"uri": uri, "eliminado": True})
+    return jsonify({"version": catalog.version, "platos": platos})
+
+
+@app.route("/admin/platos", methods=["POST"])
+def admin_agregar():
+    response = _admin([("add", None, request.get_json(silent=True) or {})])
+    return response if isinstance(response, tuple) else (response, 201)
+
+
+@app.route("/admin/platos/<int:numero>", methods=["PUT", "DELETE"])
+def admin_modificar(numero):
+    if request.method == "DELETE":
+        return _admin([("delete", numero, None)])
+    return _admin([("update", numero, request.get_json(silent=True) or {})])
+
+
+@app.route("/admin/platos/lote", methods=["POST"])
+def admin_lote():
+    """Varios cambios en un solo snapshot: [{"op": "add"|"update"|"delete", "id": n, "plato": {...}}]."""
+    cambios = request.get_json(silent=True)
+    if not isinstance(cambios, list):
+        return jsonify({"error": "Se esperaba una lista de cambios"}), 400
+    try:
+        lote = [(c["op"], c.get("id"), c.get("plato")) for c in cambios]
+    except (TypeError, KeyError):
+        return jsonify({"error": "Cada cambio necesita 'op'"}), 400
+    return _admin(lote)
+
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
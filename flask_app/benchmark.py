@@ -0,0 +1,226 @@
+"""
+Benchmarks de las rutas críticas sobre catálogos sintéticos.
+
+Mide, para cada tamaño de catálogo:
+
+- `turtle_load`: parseo del TTL (lo que hace `utils.py` sin snapshot)
+- `snapshot_load`: carga del snapshot binario del mismo grafo
+- `seal_materialization`: entradas del grafo + `SealEngine` + tripletes de sellos
+- `build_catalog`: la consulta de ítems de `get_items_sparql` en frío
+- `seal_engine`: sólo la evaluación vectorizada de sellos
+- `get_items_sparql`: la llamada por request (catálogo ya materializado)
+- `platos_similares_cold` / `platos_similares`: primera llamada (arma el
+  recomendador) y llamadas siguientes
+- `platos_json`, `platos_page`: `/platos` completo (serializado y comprimido,
+  como en el primer request de cada versión) y paginado
+- `index_html`: render de `/` (primer request de la versión)
+- `platos_json_cached`, `index_html_cached`: los mismos cuerpos ya armados
+
+Las etapas sobre el grafo sólo corren hasta `--max-graph-items` (rdflib con 1M
+ítems son ~15M tripletes); el resto usa un catálogo armado directo desde las
+columnas sintéticas. Los resultados se guardan como JSON (por defecto en
+`benchmarks/<commit>.json`) y `--compare` muestra la razón contra otra corrida.
+
+    python3 benchmark.py
+    python3 benchmark.py --sizes 1000 10000 100000 1000000 --repeat 3
+    python3 benchmark.py --compare benchmarks/abc1234.json
+"""
+import argparse
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import rdflib
+from rdflib import Graph
+
+import synthetic_catalog
+from seals import SEAL_INPUTS, SealEngine, apply_changes, item_inputs, read_seal_definitions
+
+BASE_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BASE_DIR / "benchmarks"
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+MAX_GRAPH_ITEMS = 100000
+REGRESSION = 1.2  # razón a partir de la cual --compare marca una regresión
+
+
+def measure(fn, repeat=5):
+    """Ejecuta `fn` `repeat` veces; devuelve tiempos en segundos (mínimo y mediana)."""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": len(runs)}
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def pin_catalog(cat):
+    """Hace que `catalog.get_catalog()` devuelva `cat` mientras no cambien los TTL reales."""
+    import catalog
+    catalog._state.update(stat=catalog._current_signature(), catalog=cat)
+
+
+def bench_graph(n, workdir, repeat):
+    from catalog import build_catalog
+    from snapshot import load_graph, save_graph
+
+    results = {}
+    ttl = synthetic_catalog.write_ttl(n, workdir / f"menu_{n}.ttl")
+
+    holder = {}
+    results["turtle_load"] = measure(lambda: holder.update(g=Graph().parse(ttl, format="ttl")), 1)
+    g = holder["g"]
+    results["turtle_load"]["triples"] = len(g)
+
+    def materialize():
+        engine = SealEngine(read_seal_definitions(g), *item_inputs(g))
+        apply_changes(g, [(uri, seal, True) for uri, seal in engine.seal_triples()])
+    results["seal_materialization"] = measure(materialize, 1)
+
+    snap = workdir / f"menu_{n}.snapshot"
+    save_graph(g, f"synthetic-{n}", snap)
+    results["snapshot_load"] = measure(lambda: load_graph(f"synthetic-{n}", snap), repeat)
+
+    holder = {}
+    results["build_catalog"] = measure(lambda: holder.update(c=build_catalog(g, f"synthetic-{n}-0")), 1)
+    return holder["c"], results
+
+
+def bench_catalog(cat, repeat):
+    import utils
+    from app import app
+    from catalog import NUTRIENT_INDEX
+
+    results = {}
+    seal_cols = [NUTRIENT_INDEX[s] for s in SEAL_INPUTS]
+    liquid = cat.states == "liquid"
+    definitions = read_seal_definitions(Graph().parse(data=synthetic_catalog.schema_header(), format="ttl"))
+    results["seal_engine"] = measure(
+        lambda: SealEngine(definitions, cat.uris, cat.nutrients[:, seal_cols], liquid, np.ones(len(cat), dtype=bool)),
+        repeat)
+
+    pin_catalog(cat)
+    results["get_items_sparql"] = measure(utils.get_items_sparql, repeat)
+
+    name = cat.names[len(cat) // 2]
+    results["platos_similares_cold"] = measure(lambda: utils.platos_similares(name, k=6), 1)
+    results["platos_similares"] = measure(lambda: utils.platos_similares(name, k=6), repeat)
+
+    client = app.test_client()
+
+    def get(url):
+        resp = client.get(url)
+        assert resp.status_code == 200, (url, resp.status_code)
+        results.setdefault("bytes", {})[url] = len(resp.data)
+
+    def cold(url):
+        # `/` y `/platos` completos se arman una vez por versión (http_cache.prebuilt):
+        # se descartan los cuerpos para medir la serialización y el render
+        def run():
+            for key in [k for k in cat.derived if isinstance(k, tuple) and k[0] == "body"]:
+                del cat.derived[key]
+            get(url)
+        return run
+
+    get("/platos?page=1&per_page=50")  # arma los índices de la versión
+    results["platos_json"] = measure(cold("/platos"), repeat)
+    results["platos_json_cached"] = measure(lambda: get("/platos"), repeat)
+    results["platos_page"] = measure(lambda: get("/platos?page=2&per_page=50&sort=calories"), repeat)
+    results["index_html"] = measure(cold("/"), repeat)
+    results["index_html_cached"] = measure(lambda: get("/"), repeat)
+    return results
+
+
+def run(sizes, repeat, max_graph_items, seed=0):
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "rdflib": rdflib.__version__,
+        "repeat": repeat,
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            print(f"--- {n} ítems", flush=True)
+            results = {}
+            if n <= max_graph_items:
+                cat, results = bench_graph(n, Path(tmp), repeat)
+            else:
+                cat = synthetic_catalog.generate_catalog(n, seed)
+            results.update(bench_catalog(cat, repeat))
+            results["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            report["sizes"][str(n)] = results
+            for stage, r in results.items():
+                if isinstance(r, dict) and "median" in r:
+                    print(f"  {stage:<24} {r['median'] * 1000:10.2f} ms", flush=True)
+    return report
+
+
+def print_scaling(report):
+    """Tabla etapa × tamaño con la razón de crecimiento entre tamaños consecutivos."""
+    sizes = list(report["sizes"])
+    stages = []
+    for results in report["sizes"].values():
+        stages += [s for s, r in results.items() if isinstance(r, dict) and "median" in r and s not in stages]
+    print(f"\n{'etapa':<24}" + "".join(f"{n:>16}" for n in sizes))
+    for stage in stages:
+        cells, prev = [], None
+        for n in sizes:
+            r = report["sizes"][n].get(stage)
+            if r is None:
+                cells.append(f"{'-':>16}")
+                prev = None
+                continue
+            ms = r["median"] * 1000
+            growth = f" x{ms / prev:.1f}" if prev else ""
+            cells.append(f"{ms:>10.2f}{growth:>6}")
+            prev = ms
+        print(f"{stage:<24}" + "".join(cells))
+
+
+def compare(report, baseline):
+    print(f"\nComparación con {baseline['commit']} (mediana actual / anterior):")
+    for n, results in report["sizes"].items():
+        for stage, r in results.items():
+            old = baseline["sizes"].get(n, {}).get(stage)
+            if not isinstance(r, dict) or "median" not in r or not old:
+                continue
+            ratio = r["median"] / old["median"] if old["median"] else float("inf")
+            flag = "  <-- regresión" if ratio > REGRESSION else ""
+            print(f"  {n:>8} {stage:<24} {ratio:6.2f}{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de la app sobre catálogos sintéticos")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-graph-items", type=int, default=MAX_GRAPH_ITEMS)
+    parser.add_argument("-o", "--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat, args.max_graph_items)
+    output = args.output or RESULTS_DIR / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print_scaling(report)
+    print(f"\nResultados en {output}")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
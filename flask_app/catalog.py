@@ -0,0 +1,339 @@
+"""
+Catálogo materializado de ítems del menú.
+
+La consulta SPARQL de ítems se ejecuta una sola vez por versión del grafo y su
+resultado se guarda como diccionarios uri/nombre más una matriz NumPy con los
+nutrientes (una columna por nutriente). La versión sólo se invalida cuando
+cambia el contenido de `utils/merged.ttl` o de `nutritional_ontology.ttl` (los
+sellos se derivan de ambos), así que por request el costo es un par de `stat`
+y una búsqueda en diccionario.
+
+Con `SHARED_CATALOG=1` el catálogo se publica en archivos mapeados en memoria
+que comparten todos los workers (ver `shared_catalog.py`).
+"""
+import hashlib
+import logging
+import re
+import threading
+
+import numpy as np
+
+import metrics
+import shared_catalog
+import sparql_registry
+import utils
+from snapshot import load_items, save_items
+from utils import get_local_name, clean_category, safe_float, file_hash
+
+logger = logging.getLogger(__name__)
+
+# --- Columnas de la matriz de nutrientes ---
+NUTRIENTS = (
+    "calories", "protein", "fat", "carbs", "sugars",
+    "saturatedFat", "sodium", "transFat", "cholesterol", "fiber",
+)
+NUTRIENT_INDEX = {n: i for i, n in enumerate(NUTRIENTS)}
+
+ITEMS_QUERY = """
+PREFIX ex: <http://example.com/menu#>
+PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+
+SELECT ?item ?name ?company ?calories ?protein ?fat ?carbs ?sugars ?saturatedFat ?sodium
+       ?transFat ?cholesterol ?fiber ?category ?state ?seal ?sealLabel
+WHERE {
+    ?item a ex:MenuItem ;
+          ex:itemName ?name ;
+          ex:company ?company ;
+          ex:calories ?calories ;
+          ex:protein ?protein ;
+          ex:totalFat ?fat ;
+          ex:carbs ?carbs ;
+          ex:sugars ?sugars ;
+          ex:saturatedFat ?saturatedFat ;
+          ex:sodium ?sodium .
+
+    OPTIONAL { ?item ex:transFat ?transFat }
+    OPTIONAL { ?item ex:cholesterol ?cholesterol }
+    OPTIONAL { ?item ex:fiber ?fiber }
+    OPTIONAL { ?item ex:category ?category }
+    OPTIONAL { ?item ex:hasPhysicalState ?stateRaw }
+
+    BIND(IF(?stateRaw = ex:Liquid, "liquid", "solid") AS ?state)
+
+    OPTIONAL {
+        ?item ex:hasNutritionalSeal ?seal .
+        ?seal skos:prefLabel ?sealLabel .
+    }
+}
+"""
+sparql_registry.register("items", ITEMS_QUERY)
+
+
+class Catalog:
+    """Vista inmutable de los ítems de una versión del grafo."""
+
+    def __init__(self, version, items, nutrients):
+        self.version = version
+        self.items = items
+        self.uris = [p["uri"] for p in items]
+        self.names = [p["name"] for p in items]
+        self.index_by_uri = {uri: i for i, uri in enumerate(self.uris)}
+        self.index_by_name = {}
+        for i, name in enumerate(self.names):
+            self.index_by_name.setdefault(name.lower(), i)
+        # id entero por nombre exacto, para comparar nombres de forma vectorizada
+        ids = {}
+        self.name_ids = np.array([ids.setdefault(n, len(ids)) for n in self.names], dtype=np.int64)
+        self.companies = np.array([p["company"] for p in items], dtype=str)
+        self.categories = np.array([p["category"] for p in items], dtype=str)
+        self.states = np.array([p["state"] for p in items], dtype=str)
+        self.nutrients = nutrients
+        self.nutrients.flags.writeable = False
+        self.derived = {}  # índices armados sobre este snapshot (ver `derived`)
+
+    def __len__(self):
+        return len(self.items)
+
+    def column(self, nutrient):
+        return self.nutrients[:, NUTRIENT_INDEX[nutrient]]
+
+    def index_of(self, nombre):
+        """Índice del primer ítem cuyo nombre coincide (sin distinguir mayúsculas)."""
+        if not nombre:
+            return None
+        return self.index_by_name.get(nombre.lower())
+
+    def index_of_uri(self, uri):
+        return self.index_by_uri.get(uri)
+
+    def find(self, nombre):
+        idx = self.index_of(nombre)
+        return self.items[idx] if idx is not None else None
+
+
+def natural_key(text):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", text)]
+
+
+def collect_items(rows):
+    """Diccionarios de ítems y filas de nutrientes (por URI) a partir de las filas de ITEMS_QUERY."""
+    items_map = {}
+    values = {}
+    seal_iri = {}
+    for row in rows:
+        item_uri = str(row.item)
+
+        if item_uri not in items_map:
+            items_map[item_uri] = {
+                "uri": item_uri,
+                "name": str(row.name),
+                "company": get_local_name(row.company),
+                "calories": safe_float(row.calories),
+                "protein": safe_float(row.protein),
+                "fat": safe_float(row.fat),
+                "carbs": safe_float(row.carbs),
+                "sugars": safe_float(row.sugars),
+                "saturatedFat": safe_float(row.saturatedFat),
+                "sodium": safe_float(row.sodium),
+                "category": clean_category(row.category) if row.category else "",
+                "state": str(row.state) if row.state else "solid",
+                "seals": []
+            }
+            values[item_uri] = [items_map[item_uri].get(n) for n in NUTRIENTS[:7]] + [
+                safe_float(row.transFat),
+                safe_float(row.cholesterol),
+                safe_float(row.fiber),
+            ]
+
+        if row.sealLabel:
+            seal_label = str(row.sealLabel)
+            seal_iri.setdefault(seal_label, str(row.seal))
+            if seal_label not in items_map[item_uri]["seals"]:
+                items_map[item_uri]["seals"].append(seal_label)
+
+    # el orden de las filas depende del store: los sellos van en el de
+    # `SealEngine.definitions` (por IRI) para que el catálogo sea siempre igual
+    for item in items_map.values():
+        item["seals"].sort(key=lambda label: (seal_iri[label], label))
+    return items_map, values
+
+
+def build_catalog(graph, version=""):
+    """Ejecuta la consulta de ítems sobre `graph` y materializa el catálogo."""
+    rows = sparql_registry.select("items", graph)
+    items_map, values = collect_items(rows)
+
+    # orden estable (item/1, item/2, ...) sin importar cómo se cargó el grafo
+    items = sorted(items_map.values(), key=lambda p: natural_key(p["uri"]))
+    nutrients = np.array([values[p["uri"]] for p in items], dtype=np.float64).reshape(-1, len(NUTRIENTS))
+    return Catalog(version, items, nutrients)
+
+
+# --- Versionado por contenido de los TTL ---
+def _source_files():
+    return (utils.ORIGINAL_FILE, utils.ONTOLOGY_FILE)
+
+
+def _stat_signature(paths):
+    sig = []
+    for p in paths:
+        try:
+            st = p.stat()
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def _version_of(hashes):
+    return hashlib.sha256("|".join(h or "-" for h in hashes).encode()).hexdigest()[:16]
+
+
+def base_version(version):
+    """Versión de los archivos de la que deriva `version` (sin el sufijo de cambios en vivo)."""
+    return version.partition("+")[0]
+
+
+def _current_signature():
+    """`stat` de los TTL y, con SHARED_CATALOG, del puntero a la generación compartida."""
+    return _stat_signature(_source_files()) + shared_catalog.signature()
+
+
+def _load_or_build(hashes):
+    """Usa la tabla de ítems guardada si corresponde a esta versión; si no, la construye."""
+    version = _version_of(hashes)
+    if not shared_catalog.ENABLED:
+        return _materialize(hashes, version)
+    catalog = shared_catalog.attach(version)
+    if catalog is None:
+        # un solo proceso arma y publica; los demás se conectan a lo publicado
+        with shared_catalog.locked():
+            catalog = shared_catalog.attach(version)
+            if catalog is None:
+                catalog = shared_catalog.publish(_materialize(hashes, version))
+    return catalog
+
+
+def _materialize(hashes, version):
+    cached = load_items(version, utils.GRAPHS_DIR)
+    if cached is not None:
+        return Catalog(version, *cached)
+
+    catalog = build_catalog(utils.g, version)
+    if hashes[0]:
+        try:
+            save_items(catalog.items, catalog.nutrients, version, utils.GRAPHS_DIR)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la tabla de ítems: {e}")
+    return catalog
+
+
+_lock = threading.Lock()
+# graph_version: versión del catálogo que corresponde a `utils.g` de este proceso
+_state = {"stat": None, "hashes": None, "catalog": None, "graph_version": None}
+
+
+def get_catalog():
+    """Devuelve el catálogo vigente, reconstruyéndolo sólo si cambiaron los TTL."""
+    paths = _source_files()
+    stat = _current_signature()
+    catalog = _state["catalog"]
+    if catalog is not None and stat == _state["stat"]:
+        metrics.cache_hit("catalog")
+        return catalog
+
+    with _lock:
+        catalog = _state["catalog"]
+        if catalog is not None and stat == _state["stat"]:
+            return catalog
+
+        hashes = tuple(file_hash(p) for p in paths)
+        if catalog is not None and hashes == _state["hashes"]:
+            # Sólo cambió el mtime (p. ej. un `touch`): la versión sigue siendo válida
+            _state["stat"] = stat
+            metrics.cache_hit("catalog")
+            shared = shared_catalog.attach(catalog.version) if shared_catalog.ENABLED else None
+            if shared is not None and shared.generation != getattr(catalog, "generation", None):
+                # otro proceso publicó una generación nueva de la misma versión
+                _state["catalog"] = shared
+                return shared
+            return catalog
+
+        metrics.cache_miss("catalog")
+
+        if _state["hashes"] is not None:
+            logger.info("Cambió el grafo en disco, recargando catálogo...")
+            utils.recargar_grafo()
+
+        catalog = _load_or_build(hashes)
+        _state.update(stat=_current_signature(), hashes=hashes, catalog=catalog,
+                      graph_version=_version_of(hashes))
+        logger.info(f"Catálogo {catalog.version} materializado: {len(catalog)} ítems")
+        return catalog
+
+
+def graph_version():
+    """Versión del catálogo que refleja el grafo en memoria de este proceso."""
+    return _state["graph_version"]
+
+
+def check_writable(base):
+    """RuntimeError si `base` no es a la vez el snapshot vigente y el del grafo de este proceso.
+
+    Con SHARED_CATALOG, otro worker puede haber publicado cambios que este
+    proceso sólo ve en el catálogo compartido, no en su grafo: aplicar cambios
+    sobre ese grafo pisaría los del otro.
+    """
+    if base.version != _state["graph_version"]:
+        raise RuntimeError("El catálogo vigente lo publicó otro proceso; con SHARED_CATALOG "
+                           "los cambios en vivo requieren un solo worker")
+    if shared_catalog.ENABLED:
+        current = shared_catalog.read_current()
+        if current is not None and current["version"] != base.version:
+            raise RuntimeError("Otro proceso publicó un cambio del catálogo; reintentar")
+
+
+def publish(catalog, base, warm=(), graph=None):
+    """Deja `catalog` como snapshot vigente en lugar de `base` (lo usan los cambios en vivo).
+
+    `warm` son funciones que arman sus índices derivados antes de publicarlo.
+    Si se pasa `graph` y `utils.g` se recargó mientras tanto, o si `base` ya
+    no es el vigente (ver `check_writable`), no se publica nada.
+    """
+    with _lock:
+        if graph is not None and utils.g is not graph:
+            raise RuntimeError("El grafo se recargó durante el cambio; reintentar")
+        version = catalog.version
+        if shared_catalog.ENABLED:
+            # leer CURRENT, escribir la generación y moverlo, todo bajo el lock entre procesos
+            with shared_catalog.locked():
+                check_writable(base)
+                catalog = shared_catalog.publish(catalog)
+        else:
+            check_writable(base)
+        for build in warm:
+            build(catalog)
+        # un único reemplazo de referencia: los lectores ven el snapshot anterior o el nuevo
+        _state.update(stat=_current_signature(), catalog=catalog, graph_version=version)
+    return catalog
+
+
+_derived_lock = threading.RLock()  # un derivado puede usar otros (p. ej. la página inicial)
+
+
+def derived(catalog, key, build, name):
+    """Estructura derivada de `catalog` (índices, recomendador), armada una vez por snapshot.
+
+    Vive en el propio snapshot: uno nuevo puede publicarse con sus índices ya
+    armados sin afectar a los lectores que todavía usan el anterior.
+    """
+    value = catalog.derived.get(key)
+    if value is not None:
+        metrics.cache_hit(name)
+        return value
+    with _derived_lock:
+        value = catalog.derived.get(key)
+        if value is None:
+            metrics.cache_miss(name)
+            value = catalog.derived[key] = build(catalog)
+        return value
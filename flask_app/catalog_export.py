@@ -0,0 +1,104 @@
+"""
+Formatos de exportación del catálogo para consumidores masivos (`/platos?format=`).
+
+- `columnar`: JSON con un arreglo por campo en vez de un objeto por ítem (las
+  claves no se repiten en cada fila).
+- `ndjson`: un ítem por línea, generado por bloques mientras se envía.
+- `arrow` / `parquet`: tabla de Apache Arrow (archivo IPC) o Parquet armada
+  directo desde las columnas NumPy del catálogo, sin pasar por dicts. Requieren
+  el paquete opcional `pyarrow`.
+
+Todos respetan los filtros, el orden y la paginación de `/platos`.
+"""
+import io
+import json
+
+import numpy as np
+
+from catalog import NUTRIENT_INDEX, derived
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # opcional: sin él no hay arrow/parquet
+    pa = pq = None
+
+# Campos de cada ítem, en el orden de `catalog.build_catalog`
+ITEM_NUTRIENTS = ("calories", "protein", "fat", "carbs", "sugars", "saturatedFat", "sodium")
+TEXT_COLUMNS = {"company": "companies", "category": "categories", "state": "states"}
+
+FORMATS = ("json", "columnar", "ndjson", "arrow", "parquet")
+ARROW_FORMATS = ("arrow", "parquet")
+MIMETYPES = {
+    "columnar": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.file",
+    "parquet": "application/vnd.apache.parquet",
+}
+NDJSON_CHUNK = 500  # líneas por bloque enviado
+
+
+def available(fmt):
+    return fmt not in ARROW_FORMATS or pa is not None
+
+
+def _seal_lists(catalog):
+    return derived(catalog, "seal_lists", lambda c: [p["seals"] for p in c.items], "seal_lists")
+
+
+def columns(catalog, rows):
+    """Campo → valores de las filas `rows` (listas de Python o arreglos NumPy)."""
+    rows = np.asarray(rows, dtype=np.intp)
+    seals = _seal_lists(catalog)
+    out = {"uri": [catalog.uris[i] for i in rows], "name": [catalog.names[i] for i in rows]}
+    out["company"] = catalog.companies[rows]
+    for nutrient in ITEM_NUTRIENTS:
+        out[nutrient] = catalog.nutrients[rows, NUTRIENT_INDEX[nutrient]]
+    out["category"] = catalog.categories[rows]
+    out["state"] = catalog.states[rows]
+    out["seals"] = [seals[i] for i in rows]
+    return out
+
+
+def columnar_json(catalog, rows, **extra):
+    cols = {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in columns(catalog, rows).items()}
+    payload = {"version": catalog.version, **extra, "count": len(rows), "columns": cols}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def ndjson(catalog, rows, dumps):
+    """Genera el NDJSON de a NDJSON_CHUNK ítems (los dicts ya existen en el catálogo)."""
+    items = catalog.items
+    rows = np.asarray(rows, dtype=np.intp).tolist()
+    for start in range(0, len(rows), NDJSON_CHUNK):
+        yield "".join(dumps(items[i]) + "\n" for i in rows[start:start + NDJSON_CHUNK])
+
+
+def arrow_table(catalog, rows):
+    cols = columns(catalog, rows)
+    arrays = {}
+    for name, values in cols.items():
+        if name == "seals":
+            arrays[name] = pa.array(values, type=pa.list_(pa.string()))
+        elif name in ITEM_NUTRIENTS:
+            arrays[name] = pa.array(values, type=pa.float64())
+        else:
+            arrays[name] = pa.array(values.tolist() if isinstance(values, np.ndarray) else values, type=pa.string())
+    return pa.table(arrays, metadata={"version": catalog.version})
+
+
+def to_arrow(catalog, rows):
+    sink = pa.BufferOutputStream()
+    table = arrow_table(catalog, rows)
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_parquet(catalog, rows):
+    buf = io.BytesIO()
+    pq.write_table(arrow_table(catalog, rows), buf, compression="zstd")
+    return buf.getvalue()
+
+
+WRITERS = {"arrow": to_arrow, "parquet": to_parquet}
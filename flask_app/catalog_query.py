@@ -0,0 +1,176 @@
+"""
+Consultas filtradas, ordenadas y paginadas sobre el catálogo.
+
+Por cada versión del catálogo se precalculan índices invertidos (compañía,
+categoría, estado y sello → filas) y las columnas de nutrientes ordenadas, de
+modo que los filtros de rango se resuelven con `np.searchsorted` y el orden
+con permutaciones ya calculadas.
+"""
+
+import numpy as np
+
+import metrics
+from catalog import NUTRIENTS, derived, get_catalog
+from name_index import NameIndex
+
+# Campos categóricos que aceptan filtro exacto (parámetro → atributo del catálogo)
+FACETS = {"company": "companies", "category": "categories", "state": "states"}
+
+SORT_FIELDS = ("name", "company", "category") + NUTRIENTS
+
+# Valor del filtro de sellos para los ítems sin ninguno
+NO_SEAL = "none"
+
+MAX_PER_PAGE = 500
+
+
+def _inverted(values):
+    index = {}
+    for row, value in enumerate(values):
+        index.setdefault(value, []).append(row)
+    return {k: np.array(v, dtype=np.intp) for k, v in index.items()}
+
+
+class CatalogIndex:
+    """Índices de una versión fija del catálogo."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        n = len(catalog)
+        self.inverted = {field: _inverted(getattr(catalog, attr).tolist()) for field, attr in FACETS.items()}
+
+        seals = {}
+        for row, item in enumerate(catalog.items):
+            for label in item["seals"]:
+                seals.setdefault(label, []).append(row)
+        self.by_seal = {k: np.array(v, dtype=np.intp) for k, v in seals.items()}
+        self.no_seal = np.array([i for i, p in enumerate(catalog.items) if not p["seals"]], dtype=np.intp)
+
+        # columnas ordenadas: sorted_values[n] == columna[sorted_rows[n]]
+        self.sorted_rows, self.sorted_values = {}, {}
+        for nutrient in NUTRIENTS:
+            column = catalog.column(nutrient)
+            order = np.argsort(column, kind="stable")
+            self.sorted_rows[nutrient] = order
+            self.sorted_values[nutrient] = column[order]
+
+        self.names = NameIndex(catalog)
+        lower_names = [name.lower() for name in catalog.names]
+        self.sort_order = dict(self.sorted_rows)
+        self.sort_order["name"] = np.array(sorted(range(n), key=lower_names.__getitem__), dtype=np.intp)
+        for field in ("company", "category"):
+            column = getattr(catalog, FACETS[field])
+            self.sort_order[field] = np.argsort(column, kind="stable")
+
+    def facets(self):
+        """Valores posibles de cada filtro (para poblar los <select>)."""
+        out = {field: sorted(k for k in index if k) for field, index in self.inverted.items()}
+        out["seal"] = sorted(self.by_seal)
+        return out
+
+    def _rows_mask(self, rows):
+        m = np.zeros(len(self.catalog), dtype=bool)
+        m[rows] = True
+        return m
+
+    def range_rows(self, nutrient, lo=None, hi=None):
+        """Filas con lo <= nutriente <= hi usando la columna ordenada."""
+        values = self.sorted_values[nutrient]
+        start = np.searchsorted(values, lo, side="left") if lo is not None else 0
+        end = np.searchsorted(values, hi, side="right") if hi is not None else len(values)
+        return self.sorted_rows[nutrient][start:end]
+
+    def select(self, facets=None, seal=None, ranges=None, q=None):
+        """Máscara de filas que cumplen todos los filtros."""
+        mask = np.ones(len(self.catalog), dtype=bool)
+        for field, value in (facets or {}).items():
+            if value:
+                rows = self.inverted[field].get(value)
+                mask &= self._rows_mask(rows) if rows is not None else False
+        if seal == NO_SEAL:
+            mask &= self._rows_mask(self.no_seal)
+        elif seal:
+            rows = self.by_seal.get(seal)
+            mask &= self._rows_mask(rows) if rows is not None else False
+        for nutrient, (lo, hi) in (ranges or {}).items():
+            if lo is not None or hi is not None:
+                mask &= self._rows_mask(self.range_rows(nutrient, lo, hi))
+        if q:
+            mask &= self._rows_mask(self.names.substring_rows(q))
+        return mask
+
+    def query(self, facets=None, seal=None, ranges=None, q=None,
+              sort=None, order="asc", page=1, per_page=None):
+        """Devuelve (filas de la página, total de coincidencias)."""
+        mask = self.select(facets, seal, ranges, q)
+        if sort:
+            perm = self.sort_order[sort]
+            rows = perm[mask[perm]]
+            if order == "desc":
+                rows = rows[::-1]
+        else:
+            rows = np.flatnonzero(mask)
+        total = len(rows)
+        if per_page:
+            start = (page - 1) * per_page
+            rows = rows[start:start + per_page]
+        return rows, total
+
+
+def parse_query_args(args):
+    """Convierte los parámetros del request en argumentos de `CatalogIndex.query`.
+
+    Lanza ValueError si algún parámetro no es válido.
+    """
+    ranges = {}
+    for nutrient in NUTRIENTS:
+        lo, hi = args.get(f"min_{nutrient}"), args.get(f"max_{nutrient}")
+        if lo not in (None, "") or hi not in (None, ""):
+            ranges[nutrient] = (float(lo) if lo not in (None, "") else None,
+                                float(hi) if hi not in (None, "") else None)
+
+    sort = args.get("sort") or None
+    if sort and sort not in SORT_FIELDS:
+        raise ValueError(f"sort debe ser uno de {', '.join(SORT_FIELDS)}")
+    order = args.get("order", "asc")
+    if order not in ("asc", "desc"):
+        raise ValueError("order debe ser 'asc' o 'desc'")
+
+    page = int(args.get("page", 1))
+    per_page = args.get("per_page")
+    per_page = min(int(per_page), MAX_PER_PAGE) if per_page else None
+    if page < 1 or (per_page is not None and per_page < 1):
+        raise ValueError("page y per_page deben ser positivos")
+    if per_page is None and "page" in args:
+        per_page = 50
+
+    return {
+        "facets": {field: args.get(field) or None for field in FACETS},
+        "seal": args.get("seal") or None,
+        "ranges": ranges,
+        "q": args.get("q", "").strip() or None,
+        "sort": sort,
+        "order": order,
+        "page": page,
+        "per_page": per_page,
+    }
+
+
+def _build_index(catalog):
+    with metrics.stage("build:catalog_index"):
+        return CatalogIndex(catalog)
+
+
+def index_for(catalog):
+    """Índices de un snapshot del catálogo (se arman una vez por snapshot)."""
+    return derived(catalog, "catalog_index", _build_index, "catalog_index")
+
+
+def get_catalog_index():
+    """Índices de la versión vigente del catálogo."""
+    return index_for(get_catalog())
+
+
+def get_name_index():
+    """Índice de nombres de la versión vigente del catálogo."""
+    return get_catalog_index().names
@@ -0,0 +1,254 @@
+"""
+Altas, cambios y bajas de `ex:MenuItem` en vivo, sin reiniciar la app.
+
+Un lote de cambios se valida completo antes de tocar nada y después:
+
+1. reemplaza los tripletes de esos ítems en el grafo de datos de `utils.g`;
+2. recalcula sólo las filas de esos ítems en el motor de sellos y aplica la
+   diferencia en el grafo de sellos;
+3. arma un snapshot nuevo del catálogo a partir del anterior (sólo se vuelven
+   a consultar los ítems tocados) y sus índices derivados, incluida la tabla
+   de vecinos de `similarity.py` si existe (sólo los vecindarios afectados);
+4. lo publica reemplazando una única referencia (`catalog.publish`).
+
+Los escritores se serializan con un lock; los lectores nunca lo toman. Las
+rutas HTTP de lectura sólo usan el snapshot vigente, así que ven el catálogo
+anterior o el nuevo completo, nunca uno a medio aplicar.
+
+Los cambios viven en memoria del proceso (y, con SHARED_CATALOG, en la
+generación compartida que publica): se pierden cuando cambian los TTL en
+disco y el grafo se recarga. Con GRAPH_STORE=sqlite el grafo es de sólo
+lectura y los cambios se rechazan.
+
+Con SHARED_CATALOG los demás workers pasan a la generación nueva, pero su
+grafo sigue siendo el anterior: sólo acepta cambios el proceso cuyo grafo
+corresponde a la generación vigente, y la publicación se hace bajo el lock
+entre procesos comparando contra la generación de la que partió el lote.
+En la práctica, los cambios en vivo con catálogo compartido requieren un
+solo worker; los demás responden 409.
+"""
+import math
+import os
+import threading
+import uuid
+
+import numpy as np
+from rdflib import Literal, RDF, URIRef, XSD
+
+import catalog as catalog_module
+import sparql_registry
+import utils
+from catalog import Catalog, NUTRIENTS, natural_key
+from catalog_query import index_for
+from recommender import recommender_for, similarity_for
+from seals import apply_changes, item_inputs
+from sqlite_store import SQLiteStore
+from utils import EX, GRAPH_DATA, GRAPH_SEALS, GRAPH_SIMILARITY
+
+# Token para las rutas /admin (sin token, la API de administración no se expone)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+ITEM_BASE = "http://example.com/menu/item/"
+COMPANY_BASE = "http://dbpedia.org/resource/"
+
+# Campo del JSON → propiedad (los nutrientes en el orden de catalog.NUTRIENTS)
+NUMERIC_FIELDS = {
+    "calories": EX.calories, "protein": EX.protein, "fat": EX.totalFat, "carbs": EX.carbs,
+    "sugars": EX.sugars, "saturatedFat": EX.saturatedFat, "sodium": EX.sodium,
+    "transFat": EX.transFat, "cholesterol": EX.cholesterol, "fiber": EX.fiber,
+}
+FIELDS = {"name", "company", "category", "state", *NUMERIC_FIELDS}
+# Lo que exige ITEMS_QUERY para que el ítem aparezca en el catálogo
+REQUIRED = (EX.itemName, EX.company, *[NUMERIC_FIELDS[n] for n in NUTRIENTS[:7]])
+STATES = {"solid": EX.Solid, "liquid": EX.Liquid}
+
+OPERATIONS = ("add", "update", "delete")
+
+_write_lock = threading.Lock()
+
+
+def item_uri(numero):
+    return URIRef(f"{ITEM_BASE}{numero}")
+
+
+def _number(field, value):
+    if isinstance(value, bool):
+        raise ValueError(f"{field} debe ser numérico")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} debe ser numérico") from None
+    if not math.isfinite(number) or number < 0:
+        raise ValueError(f"{field} debe ser un número no negativo")
+    return Literal(str(number), datatype=XSD.float)
+
+
+def _text(field, value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{field} debe ser un texto no vacío")
+    return value.strip()
+
+
+def _terms(fields, data):
+    """Propiedad → término RDF para los campos del JSON de un ítem."""
+    unknown = set(fields) - FIELDS
+    if unknown:
+        raise ValueError(f"campos desconocidos: {', '.join(sorted(unknown))}")
+    terms = {}
+    for field, value in fields.items():
+        if field in NUMERIC_FIELDS:
+            terms[NUMERIC_FIELDS[field]] = _number(field, value)
+        elif field == "name":
+            terms[EX.itemName] = Literal(_text(field, value))
+        elif field == "company":
+            company = _text(field, value)
+            terms[EX.company] = URIRef(company if company.startswith("http") else
+                                       COMPANY_BASE + company.replace(" ", "_"))
+        elif field == "category":
+            category = _text(field, value)
+            # las categorías conocidas son IRIs ex:Categoria; el resto, texto (como en los datos)
+            known = category.isidentifier() and (None, EX.category, EX[category]) in data
+            terms[EX.category] = EX[category] if known else Literal(category)
+        elif field == "state":
+            if not isinstance(value, str) or value not in STATES:
+                raise ValueError(f"state debe ser uno de {', '.join(STATES)}")
+            terms[EX.hasPhysicalState] = STATES[value]
+    return terms
+
+
+def _current_terms(data, uri):
+    return {p: o for p, o in data.predicate_objects(uri) if p != RDF.type}
+
+
+def _plan(cambios, data):
+    """Valida el lote y devuelve [(op, uri, términos)] sin modificar el grafo."""
+    existing = set(data.subjects(RDF.type, EX.MenuItem))
+    next_id = max((int(u.rsplit("/", 1)[1]) for u in existing
+                   if u.startswith(ITEM_BASE) and u.rsplit("/", 1)[1].isdigit()), default=0) + 1
+    plan = []
+    for op, numero, fields in cambios:
+        if op not in OPERATIONS:
+            raise ValueError(f"operación desconocida: {op}")
+        if fields is not None and not isinstance(fields, dict):
+            raise ValueError("los campos del plato deben ser un objeto")
+        if op == "add":
+            uri, next_id = item_uri(next_id), next_id + 1
+            terms = {EX.hasPhysicalState: EX.Solid, **_terms(fields or {}, data)}
+        else:
+            uri = item_uri(numero)
+            if uri not in existing:
+                raise LookupError(f"No existe el plato {numero}")
+            terms = None
+            if op == "update":
+                terms = {**_current_terms(data, uri), **_terms(fields or {}, data)}
+        if terms is not None:
+            missing = [p.split("#")[-1] for p in REQUIRED if p not in terms]
+            if missing:
+                raise ValueError(f"faltan campos: {', '.join(missing)}")
+            existing.add(uri)
+        else:
+            existing.discard(uri)
+        plan.append((op, uri, terms))
+    return plan
+
+
+def _next_catalog(old, rows, deleted, version):
+    """Snapshot nuevo: el anterior con las filas de `rows` reemplazadas o agregadas."""
+    items_map, values = catalog_module.collect_items(rows)
+    position = {uri: i for i, uri in enumerate(old.uris)}
+    items = list(old.items)
+    nutrients = np.array(old.nutrients)
+    keep = np.ones(len(items), dtype=bool)
+    added = []
+    for uri, item in items_map.items():
+        if uri in position:
+            items[position[uri]] = item
+            nutrients[position[uri]] = values[uri]
+        else:
+            added.append(uri)
+    for uri in deleted:
+        if uri in position:
+            keep[position[uri]] = False
+    items = [p for p, k in zip(items, keep) if k]
+    nutrients = nutrients[keep]
+    added.sort(key=natural_key)
+    if added:
+        items += [items_map[uri] for uri in added]
+        nutrients = np.vstack([nutrients, [values[uri] for uri in added]])
+    return Catalog(version, items, nutrients.reshape(-1, len(NUTRIENTS)))
+
+
+def aplicar(cambios):
+    """Aplica un lote [(op, número, campos)] y publica el snapshot nuevo.
+
+    Devuelve (catálogo publicado, [URI de cada cambio]). Errores: ValueError
+    si el lote es inválido, LookupError si un ítem no existe y RuntimeError si
+    el grafo no se puede modificar. Si algo falla antes de publicar, los
+    grafos y el motor de sellos quedan como estaban.
+    """
+    with _write_lock:
+        graph = utils.g
+        if isinstance(graph.store, SQLiteStore) or utils.motor_sellos is None:
+            raise RuntimeError("El grafo es de sólo lectura (GRAPH_STORE=sqlite)")
+        old = catalog_module.get_catalog()
+        catalog_module.check_writable(old)
+        data, seals = graph.graph(GRAPH_DATA), graph.graph(GRAPH_SEALS)
+        plan = _plan(cambios, data)
+
+        # el motor se modifica sobre una copia y los grafos con deshacer, en orden inverso
+        engine = utils.motor_sellos.copy()
+        undo = []
+        try:
+            published = _apply(plan, graph, data, seals, engine, old, undo)
+        except BaseException:
+            for step in reversed(undo):
+                step()
+            raise
+        utils.motor_sellos = engine
+        return published, [str(uri) for _, uri, _ in plan]
+
+
+def _apply(plan, graph, data, seals, engine, old, undo):
+    upserted = {}
+    deleted = set()
+    for op, uri, terms in plan:
+        removed = list(data.triples((uri, None, None)))
+        added = [] if terms is None else [(uri, RDF.type, EX.MenuItem)] + [(uri, p, o) for p, o in terms.items()]
+        data.remove((uri, None, None))
+        data.addN((s, p, o, data) for s, p, o in added)
+        undo.append(lambda uri=uri, removed=removed: (
+            data.remove((uri, None, None)), data.addN((s, p, o, data) for s, p, o in removed)))
+        if terms is None:
+            deleted.add(str(uri))
+            upserted.pop(str(uri), None)
+        else:
+            upserted[str(uri)] = uri
+            deleted.discard(str(uri))
+
+    changes = engine.remove_items(deleted)
+    if upserted:
+        changes += engine.upsert_items(*item_inputs(data, list(upserted.values())))
+    apply_changes(seals, changes)
+    undo.append(lambda: apply_changes(seals, [(i, seal, not has) for i, seal, has in changes]))
+
+    rows = [row for uri in upserted.values()
+            for row in sparql_registry.select("items", graph, {"item": uri})]
+    version = f"{catalog_module.base_version(old.version)}+{uuid.uuid4().hex[:8]}"
+    new = _next_catalog(old, rows, deleted, version)
+    warm = [index_for, recommender_for]
+
+    old_table = similarity_for(old)
+    if old_table:
+        # sólo se recalculan los vecindarios afectados (ver similarity.py)
+        table, touched = old_table.updated(new, set(upserted), deleted)
+        similar = graph.graph(GRAPH_SIMILARITY)
+
+        def swap(remove, add):
+            remove.remove_from(similar, touched, remove.k)
+            add.add_to(similar, [i for i, uri in enumerate(add.uris) if uri in touched])
+
+        swap(old_table, table)
+        undo.append(lambda: swap(table, old_table))
+        warm.append(lambda c: c.derived.setdefault("similarity", table))
+
+    return catalog_module.publish(new, old, warm=warm, graph=graph)
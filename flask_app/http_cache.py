@@ -0,0 +1,78 @@
+"""
+Respuestas condicionales y precomprimidas para las rutas del catálogo.
+
+El contenido de `/` y `/platos` sólo depende de la versión del catálogo y de
+los parámetros del request, así que el ETag es un hash de ambos: un cliente
+que reenvía `If-None-Match` recibe 304 sin que se arme ni serialice nada.
+
+Los cuerpos más pedidos (el catálogo completo de `/platos` y la página inicial
+sin búsqueda) se arman una vez por snapshot, junto con sus versiones gzip y
+brotli (si está instalado el paquete `brotli`), y se sirven desde memoria.
+"""
+import gzip
+import hashlib
+
+from flask import current_app, request
+
+from catalog import derived
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él sólo se ofrece gzip
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+class Body:
+    """Cuerpo de una respuesta con sus versiones comprimidas."""
+
+    def __init__(self, data, mimetype):
+        self.mimetype = mimetype
+        self.encoded = {"identity": data, "gzip": gzip.compress(data, GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def etag(version, *parts):
+    h = hashlib.sha256(version.encode())
+    for part in parts:
+        h.update(b"\0" + (part if isinstance(part, bytes) else str(part).encode()))
+    return h.hexdigest()[:24]
+
+
+def not_modified(tag):
+    return request.if_none_match.contains_weak(tag)
+
+
+def _finish(response, tag):
+    # weak: la misma entidad se sirve con distintas Content-Encoding
+    response.set_etag(tag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def conditional(tag, build):
+    """304 si el cliente ya tiene `tag`; si no, la respuesta de `build()` con el ETag."""
+    if not_modified(tag):
+        return _finish(current_app.response_class(status=304), tag)
+    return _finish(current_app.make_response(build()), tag)
+
+
+def prebuilt(catalog, key, build, mimetype):
+    """Cuerpo `key` de `catalog` (se arma y comprime una vez por snapshot)."""
+    return derived(catalog, ("body", key), lambda c: Body(build(c), mimetype), "response_body")
+
+
+def send(tag, get_body):
+    """Respuesta con `get_body()` en la mejor codificación que acepte el cliente (o 304)."""
+    if not_modified(tag):
+        return _finish(current_app.response_class(status=304), tag)
+    body = get_body()
+    encoding = request.accept_encodings.best_match([e for e in ("br", "gzip") if e in body.encoded])
+    response = current_app.response_class(body.encoded[encoding or "identity"], mimetype=body.mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return _finish(response, tag)
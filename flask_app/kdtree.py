@@ -0,0 +1,143 @@
+"""
+KD-tree estático sobre arreglos NumPy.
+
+El árbol se guarda en arreglos planos (sin objetos por nodo) y las hojas se
+evalúan de forma vectorizada. Lo usan el índice de nutrientes del catálogo
+(`spatial_index.py`) y el espejo local de WikiFCD (`wikifcd_mirror.py`).
+"""
+import heapq
+
+import numpy as np
+
+LEAF_SIZE = 32
+
+
+class KDTree:
+    """KD-tree estático; los índices devueltos son filas de `points`."""
+
+    def __init__(self, points, leaf_size=LEAF_SIZE):
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        n, self.dim = self.points.shape if self.points.ndim == 2 else (0, 0)
+        self.perm = np.arange(n)
+
+        start, end, left, right, lo, hi = [], [], [], [], [], []
+
+        def new_node(s, e):
+            block = self.points[self.perm[s:e]]
+            start.append(s)
+            end.append(e)
+            left.append(-1)
+            right.append(-1)
+            lo.append(block.min(axis=0) if e > s else np.zeros(self.dim))
+            hi.append(block.max(axis=0) if e > s else np.zeros(self.dim))
+            return len(start) - 1
+
+        new_node(0, n)
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            s, e = start[node], end[node]
+            if e - s <= leaf_size:
+                continue
+            # se divide por la dimensión de mayor extensión, en la mediana
+            d = int(np.argmax(hi[node] - lo[node]))
+            if hi[node][d] == lo[node][d]:
+                continue
+            idx = self.perm[s:e]
+            mid = (e - s) // 2
+            order = np.argpartition(self.points[idx, d], mid)
+            self.perm[s:e] = idx[order]
+            left[node] = new_node(s, s + mid)
+            right[node] = new_node(s + mid, e)
+            stack.extend((left[node], right[node]))
+
+        self.start = np.array(start, dtype=np.intp)
+        self.end = np.array(end, dtype=np.intp)
+        self.left = np.array(left, dtype=np.intp)
+        self.right = np.array(right, dtype=np.intp)
+        self.lo = np.array(lo).reshape(-1, self.dim)
+        self.hi = np.array(hi).reshape(-1, self.dim)
+
+    def __len__(self):
+        return len(self.perm)
+
+    def _leaf(self, node):
+        return self.left[node] < 0
+
+    def _rows(self, node):
+        return self.perm[self.start[node]:self.end[node]]
+
+    def _min_dist2(self, node, q):
+        gap = np.maximum(self.lo[node] - q, 0) + np.maximum(q - self.hi[node], 0)
+        return float(gap @ gap)
+
+    def box(self, lower, upper):
+        """Filas con lower <= punto <= upper en todas las dimensiones."""
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        found = []
+        stack = [0] if len(self) else []
+        while stack:
+            node = stack.pop()
+            if np.any(self.hi[node] < lower) or np.any(self.lo[node] > upper):
+                continue
+            rows = self._rows(node)
+            if np.all(self.lo[node] >= lower) and np.all(self.hi[node] <= upper):
+                found.append(rows)
+            elif self._leaf(node):
+                pts = self.points[rows]
+                found.append(rows[np.all((pts >= lower) & (pts <= upper), axis=1)])
+            else:
+                stack.extend((self.left[node], self.right[node]))
+        return np.sort(np.concatenate(found)) if found else np.array([], dtype=np.intp)
+
+    def radius(self, q, r):
+        """Filas a distancia euclidiana <= r de `q`."""
+        q = np.asarray(q, dtype=np.float64)
+        r2 = r * r
+        found = []
+        stack = [0] if len(self) else []
+        while stack:
+            node = stack.pop()
+            if self._min_dist2(node, q) > r2:
+                continue
+            if self._leaf(node):
+                rows = self._rows(node)
+                diff = self.points[rows] - q
+                found.append(rows[np.einsum("ij,ij->i", diff, diff) <= r2])
+            else:
+                stack.extend((self.left[node], self.right[node]))
+        return np.sort(np.concatenate(found)) if found else np.array([], dtype=np.intp)
+
+    def knn(self, q, k, exclude=None):
+        """k vecinos exactos más cercanos como (filas, distancias) ordenadas.
+
+        `exclude` es una máscara booleana opcional de filas a ignorar.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if k <= 0 or not len(self):
+            return np.array([], dtype=np.intp), np.array([])
+        best = []  # max-heap (-d2, -fila)
+        frontier = [(0.0, 0)]
+        while frontier:
+            d2, node = heapq.heappop(frontier)
+            if len(best) == k and d2 > -best[0][0]:
+                break
+            if self._leaf(node):
+                rows = self._rows(node)
+                if exclude is not None:
+                    rows = rows[~exclude[rows]]
+                diff = self.points[rows] - q
+                for row, dd in zip(rows, np.einsum("ij,ij->i", diff, diff)):
+                    entry = (-float(dd), -int(row))
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+            else:
+                for child in (self.left[node], self.right[node]):
+                    heapq.heappush(frontier, (self._min_dist2(child, q), child))
+        best.sort(reverse=True)
+        rows = np.array([-r for _, r in best], dtype=np.intp)
+        dists = np.sqrt([-d for d, _ in best])
+        return rows, dists
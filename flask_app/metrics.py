@@ -0,0 +1,180 @@
+"""
+Métricas de la app en formato de texto de Prometheus (sin dependencias).
+
+- `stage(nombre)`: context manager que mide una etapa interna (carga del
+  grafo, cada consulta SPARQL, recomendador, HTTP a WikiFCD, render) en el
+  histograma `app_stage_duration_seconds`.
+- `cache_hit(nombre)` / `cache_miss(nombre)`: contadores de las caches.
+- `gauge_callback(...)`: valores leídos al momento del scrape (tamaño del
+  grafo, ítems del catálogo, etc.).
+
+`app.py` registra la latencia por ruta y expone todo en `/metrics`. Los
+requests más lentos que `SLOW_REQUEST_MS` se registran en el log con el
+desglose de sus etapas.
+"""
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites (segundos) de los buckets de los histogramas
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", 500))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in zip(names, values)) + "}"
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        self.name, self.help = name, help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels → [conteos por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        names = self.labelnames + ("le",)
+        for labels, counts in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                out.append(f"{self.name}_bucket{_labels(names, labels + (_format(bound),))} {cumulative}")
+            out.append(f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {counts[-1]}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {counts[-2]!r}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {counts[-1]}")
+        return out
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help = name, help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        out += [f"{self.name}{_labels(self.labelnames, k)} {_format(v)}" for k, v in sorted(values.items())]
+        return out
+
+
+class CallbackMetric:
+    """Métrica cuyos valores se calculan al hacer el scrape: fn() → {labels: valor}."""
+
+    def __init__(self, name, help, kind, labelnames, fn):
+        self.name, self.help, self.kind = name, help, kind
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.fn()
+        except Exception as e:  # una métrica rota no debe romper /metrics
+            return out + [f"# error: {e}"]
+        out += [f"{self.name}{_labels(self.labelnames, k)} {_format(v)}" for k, v in sorted(values.items())]
+        return out
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+REQUEST_DURATION = _register(Histogram(
+    "app_request_duration_seconds", "Latencia de los requests por ruta", ("route", "method", "status")))
+STAGE_DURATION = _register(Histogram(
+    "app_stage_duration_seconds", "Duración de las etapas internas", ("stage",)))
+CACHE_REQUESTS = _register(Counter(
+    "app_cache_requests_total", "Consultas a caches internas", ("cache", "result")))
+SLOW_REQUESTS = _register(Counter(
+    "app_slow_requests_total", "Requests más lentos que SLOW_REQUEST_MS", ("route",)))
+
+
+def gauge_callback(name, help, fn, labelnames=()):
+    return _register(CallbackMetric(name, help, "gauge", labelnames, fn))
+
+
+def render():
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# --- Etapas ---
+_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+
+def start_trace():
+    """Empieza a acumular las etapas del request actual."""
+    _trace.set([])
+
+
+def end_trace():
+    """Devuelve [(etapa, segundos)] del request actual y deja de acumular."""
+    stages = _trace.get()
+    _trace.set(None)
+    return stages or []
+
+
+@contextmanager
+def stage(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        STAGE_DURATION.observe(elapsed, name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((name, elapsed))
+
+
+def cache_hit(name):
+    CACHE_REQUESTS.inc(name, "hit")
+
+
+def cache_miss(name):
+    CACHE_REQUESTS.inc(name, "miss")
@@ -0,0 +1,143 @@
+"""
+Índice de nombres de platos para búsqueda y autocompletado.
+
+Los nombres se normalizan (minúsculas, sin tildes ni símbolos) y se indexan de
+dos formas: un índice invertido de trigramas, para coincidencias por
+subcadena y búsqueda aproximada, y una lista ordenada de palabras, para
+buscar por prefijo de palabra con `bisect` (las consultas de 1–2 caracteres
+de `search`, que no tienen trigramas). Se construye una vez por versión del
+catálogo (ver `catalog_query.CatalogIndex`).
+"""
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+
+# Puntaje por tipo de coincidencia (la aproximada usa el coeficiente de Dice < 1)
+EXACT, NAME_PREFIX, WORD_PREFIX, SUBSTRING = 4.0, 3.0, 2.0, 1.0
+
+MIN_FUZZY_SCORE = 0.35
+
+_non_alnum = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """'Café  Mocha®' → 'cafe mocha'."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _non_alnum.sub(" ", text).strip()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    """Índice de los nombres de una versión fija del catálogo."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.keys = []        # nombre normalizado por key id
+        self.rows = []        # filas del catálogo por key id
+        key_id = {}
+        for row, name in enumerate(catalog.names):
+            key = normalize(name)
+            if key not in key_id:
+                key_id[key] = len(self.keys)
+                self.keys.append(key)
+                self.rows.append([])
+            self.rows[key_id[key]].append(row)
+        self.key_id = key_id
+
+        postings = {}
+        self.sizes = np.zeros(len(self.keys), dtype=np.int32)
+        for kid, key in enumerate(self.keys):
+            grams = trigrams(f" {key} ")
+            self.sizes[kid] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(kid)
+        self.postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+
+        # (palabra, key id) ordenado para autocompletar por prefijo
+        self.words = sorted((word, kid) for kid, key in enumerate(self.keys) for word in set(key.split()))
+        self.word_list = [w for w, _ in self.words]
+
+    def _prefix_keys(self, prefix):
+        start = bisect.bisect_left(self.word_list, prefix)
+        end = bisect.bisect_left(self.word_list, prefix + "\uffff")
+        return {kid for _, kid in self.words[start:end]}
+
+    def _substring_keys(self, nq):
+        grams = trigrams(nq)
+        if not grams:
+            # consultas de 1–2 caracteres: no hay trigramas, se recorren las claves
+            return {kid for kid, key in enumerate(self.keys) if nq in key}
+        lists = sorted((self.postings.get(g) for g in grams), key=lambda a: -1 if a is None else len(a))
+        if lists[0] is None:
+            return set()
+        candidates = lists[0]
+        for other in lists[1:]:
+            candidates = np.intersect1d(candidates, other, assume_unique=True)
+            if not len(candidates):
+                return set()
+        return {int(k) for k in candidates if nq in self.keys[k]}
+
+    def substring_rows(self, query):
+        """Filas cuyo nombre normalizado contiene la consulta normalizada."""
+        nq = normalize(query)
+        if not nq:
+            return np.arange(len(self.catalog))
+        keys = self._substring_keys(nq)
+        return np.array(sorted(r for k in keys for r in self.rows[k]), dtype=np.intp)
+
+    def _fuzzy_scores(self, nq):
+        grams = trigrams(f" {nq} ")
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        if not hits:
+            return {}
+        overlap = np.bincount(np.concatenate(hits), minlength=len(self.keys))
+        dice = 2.0 * overlap / (len(grams) + self.sizes)
+        best = np.flatnonzero(dice >= MIN_FUZZY_SCORE)
+        return {int(k): float(dice[k]) for k in best}
+
+    def search(self, query, limit=10, fuzzy=True):
+        """Lista ordenada de (fila, puntaje, tipo) para `query`."""
+        nq = normalize(query)
+        if not nq:
+            return []
+        scores = {}
+
+        def offer(kid, score, kind):
+            if kid not in scores or scores[kid][0] < score:
+                scores[kid] = (score, kind)
+
+        # sin trigramas (1–2 caracteres) se autocompleta sólo por prefijo de palabra
+        keys = self._substring_keys(nq) if trigrams(nq) else self._prefix_keys(nq)
+        for kid in keys:
+            key = self.keys[kid]
+            if key == nq:
+                offer(kid, EXACT, "exact")
+            elif key.startswith(nq):
+                offer(kid, NAME_PREFIX, "prefix")
+            elif f" {nq}" in f" {key}":
+                offer(kid, WORD_PREFIX, "word")
+            else:
+                offer(kid, SUBSTRING, "substring")
+        if fuzzy and len(scores) < limit:
+            for kid, score in self._fuzzy_scores(nq).items():
+                offer(kid, score, "fuzzy")
+
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1][0], len(self.keys[kv[0]]), self.rows[kv[0]][0]))
+        out = []
+        for kid, (score, kind) in ranked:
+            for row in self.rows[kid]:
+                out.append((row, score, kind))
+            if len(out) >= limit:
+                break
+        return out[:limit]
+
+    def find(self, name):
+        """Fila del primer ítem con ese nombre normalizado, o None."""
+        kid = self.key_id.get(normalize(name))
+        return self.rows[kid][0] if kid is not None else None
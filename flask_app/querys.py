@@ -1,9 +1,44 @@
-import requests
+import logging
+import os
 import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
 from rdflib import Graph, Literal, Namespace, URIRef, XSD, RDF, SKOS
 
+import metrics
+from wikifcd_mirror import get_mirror
+
+logger = logging.getLogger(__name__)
+
 # ---------- CONFIG ----------
-ENDPOINT = "https://wikifcd.wikibase.cloud/query/sparql"
+# Se puede apuntar a un endpoint SPARQL local (p. ej. para pruebas) con WIKIFCD_ENDPOINT
+ENDPOINT = os.environ.get("WIKIFCD_ENDPOINT", "https://wikifcd.wikibase.cloud/query/sparql")
+
+# (connect, read) en segundos
+TIMEOUT = (
+    float(os.environ.get("WIKIFCD_CONNECT_TIMEOUT", 3.05)),
+    float(os.environ.get("WIKIFCD_READ_TIMEOUT", 15)),
+)
+POOL_SIZE = 10
+CACHE_SIZE = 256
+CACHE_TTL = 3600  # segundos
+# Circuit breaker: fallos (o llamadas más lentas que SLOW_CALL) seguidos para abrirlo
+BREAKER_FAILURES = 3
+BREAKER_RESET = 30  # segundos abierto antes de dejar pasar una llamada de prueba
+SLOW_CALL = float(os.environ.get("WIKIFCD_SLOW_CALL", 5))
+# Prefetch de los perfiles más pedidos
+PREFETCH_WORKERS = 2
+PREFETCH_QUEUE = 16
+PREFETCH_TOP = 20
+PREFETCH_MARGIN = 0.2  # fracción del TTL: se refresca si queda menos que esto
+POPULARITY_SIZE = 1024
+# Si no hay espejo local (wikifcd_mirror.py), consultar el endpoint remoto
+REMOTE_FALLBACK = os.environ.get("WIKIFCD_REMOTE_FALLBACK", "1") not in ("0", "false")
 
 TOLERANCES = {
     "calories": 200, "totalfat": 7, "fatsaturated": 4, "fattrans": 2,
@@ -20,8 +55,314 @@ NUTRITIONAL_SEALS = [
     {"seal": "HighSugar", "nutrient": "sugar", "thresholdSolid": 10.0, "unit": "g"},
 ]
 
+# ---------- CLIENTE HTTP ----------
+class WikiFCDError(Exception):
+    """Fallo de red, timeout o respuesta inválida del endpoint WikiFCD."""
+
+
+class TTLCache:
+    """Cache LRU con expiración por entrada, segura entre threads."""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL, clock=time.monotonic, name=None):
+        self.maxsize = maxsize
+        self.name = name  # nombre en app_cache_requests_total (None: no se reporta)
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < self.clock():
+                # las entradas vencidas se conservan (hasta salir por LRU) para `stale`
+                self.misses += 1
+                if self.name:
+                    metrics.cache_miss(self.name)
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            if self.name:
+                metrics.cache_hit(self.name)
+            return entry[1]
+
+    def peek(self, key, default=None):
+        """Como `get`, pero sin contar aciertos ni fallos ni tocar el orden LRU."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[1] if entry is not None and entry[0] >= self.clock() else default
+
+    def stale(self, key, default=None):
+        """Valor guardado aunque esté vencido (respuesta degradada)."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[1] if entry is not None else default
+
+    def expires_in(self, key):
+        """Segundos hasta que vence `key` (negativo si ya venció, None si no está)."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[0] - self.clock() if entry is not None else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes con la misma clave en una sola ejecución."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = fn(*args)
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+class CircuitBreaker:
+    """Deja de llamar al endpoint tras `failures` fallos o llamadas lentas seguidas.
+
+    Abierto durante `reset` segundos; luego deja pasar una llamada de prueba
+    (semiabierto) que lo cierra si sale bien.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, reset=BREAKER_RESET, slow=SLOW_CALL, clock=time.monotonic):
+        self.failures = failures
+        self.reset = reset
+        self.slow = slow
+        self.clock = clock
+        self.count = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "open" if self.clock() - self.opened_at < self.reset else "half-open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, ok, elapsed=0.0):
+        with self._lock:
+            self._trial = False
+            if ok and elapsed <= self.slow:
+                self.count, self.opened_at = 0, None
+                return
+            self.count += 1
+            if self.count >= self.failures or self.opened_at is not None:
+                if self.opened_at is None:
+                    logger.warning(f"WikiFCD: circuito abierto tras {self.count} fallos/llamadas lentas")
+                self.opened_at = self.clock()
+
+
+def cache_key(reference_values, limit, sample_size, lang):
+    """Perfil de referencia redondeado a la grilla de TOLERANCES."""
+    grid = tuple(
+        (key, round(reference_values[key] / tol)) if tol else (key, reference_values[key])
+        for key, tol in sorted(TOLERANCES.items()) if key in reference_values
+    )
+    return grid, limit, sample_size, lang
+
+
+class WikiFCDClient:
+    """Cliente del endpoint SPARQL de WikiFCD con pool de conexiones y cache."""
+
+    def __init__(self, endpoint=ENDPOINT, timeout=TIMEOUT, pool_size=POOL_SIZE,
+                 cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL, mirror=None, remote_fallback=REMOTE_FALLBACK):
+        self.endpoint = endpoint
+        self.mirror = mirror
+        self.remote_fallback = remote_fallback
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept"] = "application/sparql-results+json"
+        self.cache = TTLCache(cache_size, cache_ttl, name="wikifcd")
+        self.flight = SingleFlight()
+        self.breaker = CircuitBreaker()
+        self.popularity = Counter()
+        self._profiles = {}
+        self._pending = set()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def select(self, query, name="select"):
+        """Ejecuta un SELECT y devuelve la lista de bindings (`name` etiqueta la métrica)."""
+        try:
+            with metrics.stage(f"wikifcd_http:{name}"):
+                resp = self.session.get(self.endpoint, params={"query": query}, timeout=self.timeout)
+                resp.raise_for_status()
+                data = resp.json()
+        except (requests.RequestException, ValueError) as e:
+            raise WikiFCDError(f"Error consultando {self.endpoint}: {e}") from e
+        return data.get("results", {}).get("bindings", [])
+
+    def fetch_similar(self, reference_values, limit=100, sample_size=6, lang="en"):
+        """(json_list, grafo) de alimentos similares, usando la cache si corresponde.
+
+        Pedidos simultáneos del mismo perfil comparten una sola consulta; con el
+        circuito abierto se responde de inmediato con la cache vencida o vacío.
+        """
+        args = (dict(reference_values), limit, sample_size, lang)
+        key = cache_key(*args)
+        self._note(key, args)
+        cached = self.cache.get(key)
+        if cached is None:
+            cached = self.flight.do(key, self._load, key, args)
+        self._prefetch_popular()
+        return cached
+
+    def _load(self, key, args, force=False):
+        cached = None if force else self.cache.peek(key)  # otro hilo pudo llenarla mientras tanto
+        if cached is not None:
+            return cached
+        mirror = self.mirror if self.mirror is not None else get_mirror()
+        if mirror is not None:
+            rows = mirror.similar_rows(*args[:2], TOLERANCES, *args[2:])
+        elif not self.remote_fallback:
+            rows = []
+        elif not self.breaker.allow():
+            return self.cache.stale(key) or build_results([])
+        else:
+            start, ok = time.monotonic(), False
+            try:
+                rows = _remote_rows(self, *args)
+                ok = True
+            except WikiFCDError as e:
+                stale = self.cache.stale(key)
+                if stale is None:
+                    raise
+                logger.warning(f"WikiFCD: se responde con la cache vencida ({e})")
+                return stale
+            finally:
+                # cualquier excepción cuenta como fallo y libera la llamada de prueba
+                self.breaker.record(ok, time.monotonic() - start)
+        result = build_results(rows)
+        self.cache.set(key, result)
+        return result
+
+    # --- Prefetch ---
+    def _note(self, key, args):
+        with self._pool_lock:
+            self.popularity[key] += 1
+            self._profiles[key] = args
+            if len(self.popularity) > POPULARITY_SIZE:
+                # decaimiento: se reducen los contadores y se olvidan los perfiles fríos
+                for k, n in list(self.popularity.items()):
+                    if n // 2:
+                        self.popularity[k] = n // 2
+                    else:
+                        del self.popularity[k], self._profiles[k]
+
+    def _prefetch_popular(self):
+        """Refresca en segundo plano los perfiles más pedidos que están por vencer."""
+        if self.breaker.state == "open":
+            return
+        margin = self.cache.ttl * PREFETCH_MARGIN
+        with self._pool_lock:
+            for key, _ in self.popularity.most_common(PREFETCH_TOP):
+                if len(self._pending) >= PREFETCH_QUEUE:
+                    break
+                left = self.cache.expires_in(key)
+                # sin entrada: aún en curso o ya descartada por LRU
+                if key in self._pending or left is None or left > margin:
+                    continue
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(PREFETCH_WORKERS, thread_name_prefix="wikifcd-prefetch")
+                self._pending.add(key)
+                self._pool.submit(self._refresh, key, self._profiles[key])
+
+    def _refresh(self, key, args):
+        try:
+            # se fuerza la recarga aunque la entrada siga vigente (está por vencer)
+            self.flight.do(key, self._load, key, args, True)
+        except WikiFCDError as e:
+            logger.debug(f"Prefetch WikiFCD falló: {e}")
+        finally:
+            with self._pool_lock:
+                self._pending.discard(key)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+metrics.gauge_callback(
+    "app_wikifcd_circuit_open", "1 si el circuit breaker de WikiFCD está abierto",
+    lambda: {(): int(_client is not None and _client.breaker.state == "open")})
+metrics.gauge_callback(
+    "app_wikifcd_prefetch_pending", "Prefetch de WikiFCD en curso o en cola",
+    lambda: {(): len(_client._pending) if _client is not None else 0})
+
+
+def get_client():
+    """Cliente compartido por el proceso (un pool de conexiones por worker)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = WikiFCDClient()
+    return _client
+
+
 # ---------- FUNCION PRINCIPAL ----------
-def fetch_foods_with_ttl_and_json(reference_values, limit=100, sample_size=6, lang="en", ttl_file="foods.ttl"):
+def fetch_foods_with_ttl_and_json(reference_values, limit=100, sample_size=6, lang="en", ttl_file=None, client=None):
+    """Alimentos de WikiFCD dentro de ±TOLERANCES de `reference_values`.
+
+    Devuelve (json_list, grafo RDF en memoria). Si se indica `ttl_file`, el
+    grafo además se serializa a ese archivo.
+    """
+    client = client or get_client()
+    json_list, g = client.fetch_similar(reference_values, limit, sample_size, lang)
+    if ttl_file:
+        g.serialize(ttl_file, format="turtle")
+    return json_list, g
+
+
+def _remote_rows(client, reference_values, limit, sample_size, lang):
+    """Muestra de alimentos similares consultando el endpoint remoto."""
     # --- SPARQL dinámico para el rango de nutrientes ---
     param_map = {
         "calories": "calories", "totalfat": "totalfat", "fatsaturated": "fatsaturated",
@@ -61,12 +402,9 @@ def fetch_foods_with_ttl_and_json(reference_values, limit=100, sample_size=6, la
     LIMIT {limit}
     """
 
-    headers = {"Accept": "application/sparql-results+json"}
-    resp = requests.get(ENDPOINT, params={"query": query}, headers=headers)
-    data = resp.json()
-    bindings = data.get("results", {}).get("bindings", [])
+    bindings = client.select(query, "similar")
     if not bindings:
-        return [], []
+        return []
 
     # Sample aleatorio
     sample = random.sample(bindings, min(sample_size, len(bindings)))
@@ -83,10 +421,19 @@ def fetch_foods_with_ttl_and_json(reference_values, limit=100, sample_size=6, la
         FILTER(LANG(?foodLabel)="{lang}")
     }}
     """
-    label_resp = requests.get(ENDPOINT, params={"query": label_query}, headers=headers).json()
     labels_map = {item["food"]["value"]: item["foodLabel"]["value"]
-                  for item in label_resp.get("results", {}).get("bindings", [])}
+                  for item in client.select(label_query, "labels")}
 
+    rows = []
+    for r in sample:
+        row = {k: float(v["value"]) if k != "food" else v["value"] for k, v in r.items()}
+        row["foodLabel"] = labels_map.get(r["food"]["value"], r["food"]["value"].split("/")[-1])
+        rows.append(row)
+    return rows
+
+
+def build_results(rows):
+    """(json_list, grafo RDF) a partir de filas {food, foodLabel, calories, ...}."""
     # --- Construir RDF y JSON ---
     g = Graph()
     EX = Namespace("http://example.com/menu#")
@@ -98,9 +445,7 @@ def fetch_foods_with_ttl_and_json(reference_values, limit=100, sample_size=6, la
 
     json_list = []
 
-    for idx, r in enumerate(sample, 1):
-        row = {k: float(v["value"]) if k != "food" else v["value"] for k, v in r.items()}
-        row["foodLabel"] = labels_map.get(r["food"]["value"], r["food"]["value"].split("/")[-1])
+    for idx, row in enumerate(rows, 1):
         item_uri = EX[f"item/{idx}"]
         g.add((item_uri, RDF.type, EX.MenuItem))
 
@@ -146,8 +491,6 @@ def fetch_foods_with_ttl_and_json(reference_values, limit=100, sample_size=6, la
             "saturatedFat": row["fatsaturated"],
         })
 
-    print(json_list)
-
-    g.serialize(ttl_file, format="turtle")
-    return json_list, ttl_file
+    logger.debug(json_list)
+    return json_list, g
 
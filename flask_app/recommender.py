@@ -0,0 +1,226 @@
+"""
+Motor de recomendación k-NN sobre la matriz de nutrientes del catálogo.
+
+Todas las distancias se calculan en una sola pasada vectorizada y el top-k se
+obtiene con `np.argpartition`, sin ordenar el catálogo completo.
+"""
+
+import numpy as np
+
+import metrics
+from catalog import NUTRIENTS, NUTRIENT_INDEX, derived, get_catalog
+from similarity import SimilarityTable
+from spatial_index import NutrientIndex
+
+# Nutrientes que usaba la versión original de `platos_similares`
+DEFAULT_NUTRIENTS = ("calories", "protein", "fat", "carbs")
+
+METRICS = ("euclidean", "zscore", "weighted")
+
+# Desde este tamaño el k-NN euclidiano se resuelve con el KD-tree
+KDTREE_MIN_ITEMS = 20000
+# Memoria máxima de las diferencias de un bloque de consultas en `similares_lote`
+BLOCK_BYTES = 32 * 1024 * 1024
+
+
+class Recommender:
+    """k vecinos más cercanos para una versión fija del catálogo."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.X = catalog.nutrients
+        self.mean = self.X.mean(axis=0) if len(catalog) else np.zeros(len(NUTRIENTS))
+        std = self.X.std(axis=0) if len(catalog) else np.ones(len(NUTRIENTS))
+        # Columnas constantes no deben dividir por cero
+        self.std = np.where(std > 0, std, 1.0)
+        self.Z = (self.X - self.mean) / self.std
+        self._indexes = {}
+
+    def spatial_index(self, nutrients):
+        key = tuple(nutrients)
+        if key not in self._indexes:
+            self._indexes[key] = NutrientIndex(self.catalog, key)
+        return self._indexes[key]
+
+    def _space(self, metric, nutrients, weights):
+        """Devuelve (matriz, columnas, pesos) según la métrica pedida."""
+        if metric not in METRICS:
+            raise ValueError(f"Métrica desconocida: {metric}")
+        if nutrients is None:
+            nutrients = DEFAULT_NUTRIENTS if metric == "euclidean" else NUTRIENTS
+        cols = [NUTRIENT_INDEX[n] for n in nutrients]
+
+        w = None
+        if metric == "weighted":
+            w = check_weights(weights or {}, nutrients)
+        M = self.X if metric == "euclidean" else self.Z
+        return M, cols, w
+
+    def mask(self, category=None, state=None, company=None):
+        """Máscara booleana de ítems que cumplen los pre-filtros."""
+        m = np.ones(len(self.catalog), dtype=bool)
+        if category:
+            m &= self.catalog.categories == category
+        if state:
+            m &= self.catalog.states == state
+        if company:
+            m &= self.catalog.companies == company
+        return m
+
+    def distances(self, query, metric="euclidean", nutrients=None, weights=None):
+        """Distancias de un vector de nutrientes (orden `NUTRIENTS`) a todo el catálogo."""
+        M, cols, w = self._space(metric, nutrients, weights)
+        q = np.asarray(query, dtype=np.float64)
+        if metric != "euclidean":
+            q = (q - self.mean) / self.std
+        diff = M[:, cols] - q[cols]
+        if w is not None:
+            diff = diff * np.sqrt(w)
+        return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+    def top_k(self, dist, k, mask=None):
+        """Índices de las k menores distancias (ordenadas), ignorando lo enmascarado."""
+        if mask is not None:
+            candidates = np.flatnonzero(mask)
+            dist = dist[candidates]
+        else:
+            candidates = np.arange(len(dist))
+        if k <= 0 or len(candidates) == 0:
+            return np.array([], dtype=np.intp), np.array([])
+        if k < len(candidates):
+            part = smallest_k(dist, k)
+        else:
+            part = np.arange(len(candidates))
+        # desempate por posición en el catálogo, igual que el sort estable original
+        order = part[np.lexsort((candidates[part], dist[part]))]
+        return candidates[order], dist[order]
+
+    def similares(self, idx, k=6, metric="euclidean", nutrients=None, weights=None,
+                  category=None, state=None, company=None):
+        """Ítems más parecidos al ítem `idx` del catálogo."""
+        table = similarity_for(self.catalog)
+        if (table and metric == "euclidean" and weights is None and 0 < k <= table.k
+                and tuple(nutrients or DEFAULT_NUTRIENTS) == table.nutrients
+                and not (category or state or company)):
+            # vecinos materializados por similarity.py
+            return [self.catalog.items[i] for i in table.lookup(idx, k)]
+
+        with metrics.stage("recommender"):
+            mask = self.mask(category, state, company)
+            # se excluye el plato base y sus homónimos exactos
+            mask &= self.catalog.name_ids != self.catalog.name_ids[idx]
+
+            if metric == "euclidean" and len(self.catalog) >= KDTREE_MIN_ITEMS:
+                index = self.spatial_index(nutrients or DEFAULT_NUTRIENTS)
+                indices, _ = index.tree.knn(index.tree.points[idx], k, exclude=~mask)
+            else:
+                dist = self.distances(self.X[idx], metric, nutrients, weights)
+                indices, _ = self.top_k(dist, k, mask)
+        return [self.catalog.items[i] for i in indices]
+
+    def pairwise_top_k(self, indices, k, metric="euclidean", nutrients=None, weights=None, mask=None):
+        """Top-k de varios ítems a la vez: (índices, distancias), una fila por consulta.
+
+        Cada ítem excluye sus homónimos exactos; las filas con menos de k
+        candidatos se rellenan con -1 / inf (ver `block_top_k`).
+        """
+        M, cols, w = self._space(metric, nutrients, weights)
+        candidates = np.arange(len(self.catalog)) if mask is None else np.flatnonzero(mask)
+        indices = np.asarray(indices, dtype=np.intp)
+        C = M[np.ix_(candidates, cols)]
+        Q = M[np.ix_(indices, cols)]
+        names = self.catalog.name_ids
+        return block_top_k(Q, names[indices], C, names[candidates], candidates, k, w)
+
+    def similares_lote(self, indices, k=6, metric="euclidean", nutrients=None, weights=None,
+                       category=None, state=None, company=None):
+        """`similares` para varios ítems, con una sola pasada matricial por bloque."""
+        with metrics.stage("recommender:batch"):
+            mask = self.mask(category, state, company)
+            neighbors, _ = self.pairwise_top_k(indices, k, metric, nutrients, weights, mask)
+        items = self.catalog.items
+        return [[items[i] for i in row if i >= 0] for row in neighbors.tolist()]
+
+
+def check_weights(weights, nutrients):
+    """Pesos de `nutrients` (1 por defecto); ValueError si alguno no es válido."""
+    unknown = set(weights) - set(nutrients)
+    if unknown:
+        raise ValueError(f"pesos de nutrientes desconocidos: {', '.join(sorted(map(str, unknown)))}")
+    w = np.array([float(weights.get(n, 1.0)) for n in nutrients])
+    if not np.isfinite(w).all() or (w < 0).any():
+        raise ValueError("los pesos deben ser números finitos no negativos")
+    return w
+
+
+def smallest_k(dist, k):
+    """Posiciones de las k menores distancias de cada fila (sin ordenar).
+
+    `argpartition` elige cualquiera de los empatados en la k-ésima distancia;
+    acá entran siempre los de menor posición, para que el resultado no dependa
+    de cómo se partió el cálculo.
+    """
+    kth = np.take_along_axis(dist, np.argpartition(dist, k - 1, axis=-1)[..., k - 1:k], axis=-1)
+    below = dist < kth
+    tied = dist == kth
+    need = k - below.sum(axis=-1, keepdims=True)
+    chosen = below | (tied & (np.cumsum(tied, axis=-1) <= need))
+    return np.nonzero(chosen)[-1].reshape(dist.shape[:-1] + (k,))
+
+
+def block_top_k(Q, q_names, C, c_names, candidates, k, weights=None):
+    """k vecinos de cada fila de Q entre las filas de C (cuyos índices son `candidates`).
+
+    Las distancias consultas × candidatos se calculan por bloques de filas
+    para que la matriz de diferencias no pase de BLOCK_BYTES. Se excluyen los
+    candidatos con el mismo nombre que la consulta; las filas con menos de k
+    candidatos se rellenan con -1 / inf. `weights` pondera cada columna como
+    en `Recommender.distances`. Los empates se desempatan por posición en el
+    catálogo, igual que `Recommender.top_k`.
+    """
+    kk = min(k, len(candidates))
+    out_idx = np.full((len(Q), max(k, 0)), -1, dtype=np.intp)
+    out_dist = np.full((len(Q), max(k, 0)), np.inf)
+    if kk <= 0:
+        return out_idx, out_dist
+
+    block = max(1, BLOCK_BYTES // max(1, C.size * 8))
+    for start in range(0, len(Q), block):
+        q = Q[start:start + block]
+        diff = q[:, None, :] - C[None, :, :]
+        if weights is not None:
+            diff = diff * np.sqrt(weights)
+        dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        dist[c_names[None, :] == q_names[start:start + block, None]] = np.inf
+        if kk < len(candidates):
+            part = smallest_k(dist, kk)
+        else:
+            part = np.broadcast_to(np.arange(len(candidates)), (len(q), kk))
+        d = np.take_along_axis(dist, part, axis=1)
+        order = np.lexsort((candidates[part], d), axis=-1)
+        part = np.take_along_axis(part, order, axis=1)
+        d = np.take_along_axis(d, order, axis=1)
+        out_idx[start:start + block, :kk] = np.where(np.isfinite(d), candidates[part], -1)
+        out_dist[start:start + block, :kk] = d
+    return out_idx, out_dist
+
+
+def _load_similarity(catalog):
+    table = SimilarityTable.load()
+    # False (y no None) para que `derived` recuerde que no hay tabla para este snapshot
+    return table if table is not None and table.version == catalog.version else False
+
+
+def similarity_for(catalog):
+    """Tabla de vecinos materializada de `catalog`, o False si no hay una al día."""
+    return derived(catalog, "similarity", _load_similarity, "similarity")
+
+
+def recommender_for(catalog):
+    """Recomendador de un snapshot del catálogo (se arma una vez por snapshot)."""
+    return derived(catalog, "recommender", Recommender, "recommender")
+
+
+def get_recommender():
+    """Recomendador asociado a la versión vigente del catálogo."""
+    return recommender_for(get_catalog())
@@ -0,0 +1,293 @@
+"""
+Motor de sellos nutricionales (ley 20.606) vectorizado e incremental.
+
+Los umbrales (`ex:thresholdSolid` / `ex:thresholdLiquid`) se leen de los
+`ex:NutritionalSeal` del grafo y, si existe, de `nutritional_ontology.ttl`,
+que tiene prioridad. Todos los ítems × sellos se evalúan como comparaciones de
+arreglos: `valor >= where(liquido, umbral_liquido, umbral_solido)`.
+
+El estado del motor (entradas, umbrales y la matriz de sellos) se guarda junto
+a la cache con los hashes de los archivos de origen. Así una cache obsoleta se
+detecta por contenido y, cuando sólo cambian umbrales o algunos ítems, se
+recalculan sólo esas columnas o filas.
+"""
+import json
+import logging
+from typing import NamedTuple
+
+import numpy as np
+from rdflib import Graph, Literal, Namespace, RDF, SKOS, URIRef, XSD
+
+logger = logging.getLogger(__name__)
+
+EX = Namespace("http://example.com/menu#")
+
+# Nutrientes que pueden gatillar un sello (en el orden de las columnas de entrada)
+SEAL_INPUTS = ("calories", "sugars", "saturatedFat", "sodium")
+
+# Respaldo si un sello no declara `ex:nutrient` (p. ej. nutritional_ontology.ttl)
+DEFAULT_SEAL_NUTRIENTS = {
+    "HighCalories": "calories",
+    "HighSugar": "sugars",
+    "HighSaturatedFat": "saturatedFat",
+    "HighSodium": "sodium",
+}
+
+
+class SealDefinition(NamedTuple):
+    iri: str
+    label: str
+    nutrient: str
+    solid: float
+    liquid: float
+
+
+def _to_float(lit):
+    """Igual que `xsd:float(...)` en SPARQL: valores no numéricos ("<1") no cuentan."""
+    try:
+        return float(lit)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def read_seal_definitions(graph, overrides=None):
+    """Lee los sellos de `graph`; `overrides` (otro grafo) reemplaza umbrales y etiquetas."""
+    defs = {}
+    for source in (graph, overrides):
+        if source is None:
+            continue
+        for seal in source.subjects(RDF.type, EX.NutritionalSeal):
+            iri = str(seal)
+            prev = defs.get(iri)
+            nutrient = source.value(seal, EX.nutrient)
+            label = source.value(seal, SKOS.prefLabel)
+            solid = source.value(seal, EX.thresholdSolid)
+            liquid = source.value(seal, EX.thresholdLiquid)
+            nutrient = str(nutrient) if nutrient is not None else (
+                prev.nutrient if prev else DEFAULT_SEAL_NUTRIENTS.get(iri.split("#")[-1]))
+            if nutrient not in SEAL_INPUTS or solid is None or liquid is None:
+                continue
+            defs[iri] = SealDefinition(
+                iri=iri,
+                label=str(label) if label is not None else (prev.label if prev else iri.split("#")[-1]),
+                nutrient=nutrient,
+                solid=float(solid),
+                liquid=float(liquid),
+            )
+    return [defs[k] for k in sorted(defs)]
+
+
+def item_inputs(graph, items=None):
+    """Entradas del motor para los `ex:MenuItem` del grafo.
+
+    Devuelve (uris, valores n×len(SEAL_INPUTS), líquido, tiene_estado). Los
+    ítems sin `ex:hasPhysicalState` no reciben sellos, como en la consulta
+    SPARQL original.
+    """
+    if items is None:
+        items = sorted(graph.subjects(RDF.type, EX.MenuItem))
+    uris, values, liquid, has_state = [], [], [], []
+    for item in items:
+        state = graph.value(item, EX.hasPhysicalState)
+        uris.append(str(item))
+        values.append([_to_float(graph.value(item, EX[n])) for n in SEAL_INPUTS])
+        liquid.append(state == EX.Liquid)
+        has_state.append(state is not None)
+    return (
+        uris,
+        np.array(values, dtype=np.float64).reshape(-1, len(SEAL_INPUTS)),
+        np.array(liquid, dtype=bool),
+        np.array(has_state, dtype=bool),
+    )
+
+
+class SealEngine:
+    """Matriz ítems × sellos y sus entradas, actualizable por filas o columnas."""
+
+    def __init__(self, definitions, uris, values, liquid, has_state, sources=None):
+        self.definitions = list(definitions)
+        self.uris = list(uris)
+        self.row = {u: i for i, u in enumerate(self.uris)}
+        self.values = np.asarray(values, dtype=np.float64).reshape(-1, len(SEAL_INPUTS))
+        self.liquid = np.asarray(liquid, dtype=bool)
+        self.has_state = np.asarray(has_state, dtype=bool)
+        self.sources = sources or {}
+        self.mask = np.zeros((len(self.uris), len(self.definitions)), dtype=bool)
+        self.mask[:] = self.evaluate()
+
+    def copy(self):
+        """Copia independiente (para aplicar cambios que todavía pueden descartarse)."""
+        engine = SealEngine.__new__(SealEngine)
+        engine.__dict__.update(self.__dict__)
+        engine.definitions, engine.uris, engine.row = list(self.definitions), list(self.uris), dict(self.row)
+        engine.sources = dict(self.sources)
+        for name in ("values", "liquid", "has_state", "mask"):
+            setattr(engine, name, getattr(self, name).copy())
+        return engine
+
+    def evaluate(self, rows=None, seals=None):
+        """Evalúa los sellos `seals` (índices) para las filas `rows` sin tocar `mask`."""
+        rows = np.arange(len(self.uris)) if rows is None else np.asarray(rows, dtype=np.intp)
+        seals = range(len(self.definitions)) if seals is None else seals
+        out = np.zeros((len(rows), len(seals)), dtype=bool)
+        values, liquid = self.values[rows], self.liquid[rows]
+        valid = self.has_state[rows]
+        for j, s in enumerate(seals):
+            d = self.definitions[s]
+            col = values[:, SEAL_INPUTS.index(d.nutrient)]
+            threshold = np.where(liquid, d.liquid, d.solid)
+            with np.errstate(invalid="ignore"):
+                out[:, j] = valid & (col >= threshold)
+        return out
+
+    def _diff(self, rows, cols, new):
+        """Aplica `new` sobre mask[rows, cols] y devuelve [(uri, seal_iri, tiene_sello)]."""
+        old = self.mask[np.ix_(rows, cols)]
+        changed = np.argwhere(old != new)
+        self.mask[np.ix_(rows, cols)] = new
+        return [(self.uris[rows[r]], self.definitions[cols[c]].iri, bool(new[r, c])) for r, c in changed]
+
+    def set_definitions(self, definitions):
+        """Reemplaza las definiciones; sólo se recalculan los sellos nuevos o modificados."""
+        old = {d.iri: (i, d) for i, d in enumerate(self.definitions)}
+        definitions = list(definitions)
+        new_iris = {d.iri for d in definitions}
+        changes = [(self.uris[r], iri, False)
+                   for iri, (i, _) in old.items() if iri not in new_iris
+                   for r in np.flatnonzero(self.mask[:, i])]
+
+        mask = np.zeros((len(self.uris), len(definitions)), dtype=bool)
+        affected = []
+        for j, d in enumerate(definitions):
+            if d.iri in old:
+                mask[:, j] = self.mask[:, old[d.iri][0]]
+            if d.iri not in old or old[d.iri][1] != d:
+                affected.append(j)
+        self.definitions, self.mask = definitions, mask
+
+        if affected:
+            rows = np.arange(len(self.uris))
+            changes += self._diff(rows, affected, self.evaluate(rows, affected))
+        logger.info(f"Sellos recalculados: {[definitions[j].iri.split('#')[-1] for j in affected]}")
+        return changes
+
+    def upsert_items(self, uris, values, liquid, has_state):
+        """Agrega o actualiza ítems; sólo se evalúan sus filas."""
+        rows = []
+        for uri in uris:
+            if uri not in self.row:
+                self.row[uri] = len(self.uris)
+                self.uris.append(uri)
+            rows.append(self.row[uri])
+        n = len(self.uris)
+        if n > len(self.values):
+            grow = n - len(self.values)
+            self.values = np.vstack([self.values, np.full((grow, len(SEAL_INPUTS)), np.nan)])
+            self.liquid = np.concatenate([self.liquid, np.zeros(grow, dtype=bool)])
+            self.has_state = np.concatenate([self.has_state, np.zeros(grow, dtype=bool)])
+            self.mask = np.vstack([self.mask, np.zeros((grow, len(self.definitions)), dtype=bool)])
+        rows = np.asarray(rows, dtype=np.intp)
+        self.values[rows] = values
+        self.liquid[rows] = liquid
+        self.has_state[rows] = has_state
+        cols = list(range(len(self.definitions)))
+        return self._diff(rows, cols, self.evaluate(rows, cols))
+
+    def sync_items(self, uris, values, liquid, has_state):
+        """Deja el motor con exactamente estos ítems; sólo se evalúan los nuevos o cambiados."""
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(SEAL_INPUTS))
+        liquid, has_state = np.asarray(liquid, dtype=bool), np.asarray(has_state, dtype=bool)
+        keep = set(uris)
+        changes = self.remove_items([u for u in self.uris if u not in keep])
+        rows = np.array([self.row.get(u, -1) for u in uris], dtype=np.intp)
+        known = rows >= 0
+        changed = ~known
+        old = self.values[rows[known]]
+        new = values[known]
+        changed[known] = ~(((old == new) | (np.isnan(old) & np.isnan(new))).all(axis=1)
+                           & (self.liquid[rows[known]] == liquid[known])
+                           & (self.has_state[rows[known]] == has_state[known]))
+        picked = np.flatnonzero(changed)
+        if len(picked):
+            changes += self.upsert_items([uris[i] for i in picked], values[picked],
+                                         liquid[picked], has_state[picked])
+        logger.info(f"Sellos recalculados para {len(picked)} ítems nuevos o cambiados "
+                    f"({len(self.uris) - len(picked)} sin cambios)")
+        return changes
+
+    def remove_items(self, uris):
+        """Quita ítems del motor y devuelve los sellos que tenían."""
+        rows = [self.row[u] for u in uris if u in self.row]
+        changes = [(self.uris[r], self.definitions[c].iri, False)
+                   for r in rows for c in np.flatnonzero(self.mask[r])]
+        keep = np.ones(len(self.uris), dtype=bool)
+        keep[rows] = False
+        self.uris = [u for u, k in zip(self.uris, keep) if k]
+        self.row = {u: i for i, u in enumerate(self.uris)}
+        self.values, self.liquid = self.values[keep], self.liquid[keep]
+        self.has_state, self.mask = self.has_state[keep], self.mask[keep]
+        return changes
+
+    def seal_triples(self):
+        """Todos los (item, seal) con sello, para poblar un grafo nuevo."""
+        return [(self.uris[r], self.definitions[c].iri) for r, c in np.argwhere(self.mask)]
+
+    # --- Persistencia ---
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                uris=np.array(self.uris, dtype=str),
+                values=self.values,
+                liquid=self.liquid,
+                has_state=self.has_state,
+                mask=self.mask,
+                definitions=np.array(json.dumps([d._asdict() for d in self.definitions])),
+                sources=np.array(json.dumps(self.sources)),
+            )
+
+    @classmethod
+    def load(cls, path):
+        """Carga el estado guardado, o None si no existe o no se puede leer."""
+        try:
+            data = np.load(path)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        with data:
+            engine = cls.__new__(cls)
+            engine.definitions = [SealDefinition(**d) for d in json.loads(str(data["definitions"]))]
+            engine.uris = data["uris"].tolist()
+            engine.row = {u: i for i, u in enumerate(engine.uris)}
+            engine.values = data["values"]
+            engine.liquid = data["liquid"]
+            engine.has_state = data["has_state"]
+            engine.mask = data["mask"]
+            engine.sources = json.loads(str(data["sources"]))
+        return engine
+
+
+def apply_changes(graph, changes):
+    """Agrega o quita los tripletes `ex:hasNutritionalSeal` de `changes`."""
+    for item, seal, has in changes:
+        triple = (URIRef(item), EX.hasNutritionalSeal, URIRef(seal))
+        if has:
+            graph.add(triple)
+        else:
+            graph.remove(triple)
+
+
+def sync_definitions(graph, definitions):
+    """Deja los umbrales del grafo iguales a `definitions` (p. ej. tras leer la ontología)."""
+    for d in definitions:
+        seal = URIRef(d.iri)
+        for prop, value in ((EX.thresholdSolid, d.solid), (EX.thresholdLiquid, d.liquid)):
+            if _to_float(graph.value(seal, prop)) != value:
+                graph.set((seal, prop, Literal(str(value), datatype=XSD.decimal)))
+
+
+def load_ontology(path):
+    if path is None or not path.exists():
+        return None
+    g = Graph()
+    g.parse(path, format="ttl")
+    return g
@@ -0,0 +1,281 @@
+"""
+Catálogo en archivos mapeados en memoria, compartido entre workers.
+
+Con un servidor pre-fork (p. ej. `gunicorn --preload`) cada worker armaba
+sus propios diccionarios de ítems y vectores NumPy. Con `SHARED_CATALOG=1`
+el catálogo se publica como columnas `.npy` en `utils/graphs/shared/gen-N/`:
+
+- la matriz de nutrientes, la posición de cada sello en la lista del ítem y
+  los códigos de nombre;
+- compañía, categoría y estado como arreglos de texto de ancho fijo;
+- URIs y nombres como tablas de strings (blob UTF-8 + offsets);
+- tablas de hash ordenadas para buscar por nombre o URI sin diccionarios.
+
+Todos los procesos los abren con `np.load(..., mmap_mode="r")`, así que las
+páginas se comparten a través de la cache del sistema operativo y el RSS
+total casi no crece al agregar workers. Los ítems (dicts) se arman al vuelo
+cuando se piden.
+
+`CURRENT` guarda la generación vigente. Cada publicación incrementa el
+contador, y los workers que ven una generación nueva (por `stat`) se cambian
+a ella sin reiniciar.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections.abc import Sequence
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("SHARED_CATALOG", "") not in ("", "0")
+SHARED_DIR = Path(__file__).resolve().parent / "utils/graphs/shared"
+
+FORMAT_VERSION = 3  # 3: sellos de cada ítem en orden fijo
+KEEP_GENERATIONS = 2  # la vigente y la anterior (algún worker puede seguir usándola)
+
+# Campos de cada ítem → columna de la matriz de nutrientes (orden de catalog.NUTRIENTS)
+ITEM_NUTRIENTS = ("calories", "protein", "fat", "carbs", "sugars", "saturatedFat", "sodium")
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class StringTable(Sequence):
+    """Lista de strings sobre un blob UTF-8 + offsets mapeados (se decodifican al pedirlos)."""
+
+    def __init__(self, blob, offsets):
+        self.blob, self.offsets = blob, offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        data = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        for i in range(len(offsets) - 1):
+            yield data[offsets[i]:offsets[i + 1]].decode("utf-8")
+
+    @staticmethod
+    def save(directory, name, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        np.save(directory / f"{name}.blob.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(directory / f"{name}.offsets.npy", offsets)
+
+    @classmethod
+    def load(cls, directory, name):
+        return cls(np.load(directory / f"{name}.blob.npy", mmap_mode="r"),
+                   np.load(directory / f"{name}.offsets.npy", mmap_mode="r"))
+
+
+class HashIndex:
+    """Búsqueda texto → primera fila, con hashes ordenados en vez de un dict."""
+
+    def __init__(self, hashes, rows):
+        self.hashes, self.rows = hashes, rows
+
+    @staticmethod
+    def build(keys):
+        hashes = np.fromiter((_hash64(k) for k in keys), dtype=np.uint64, count=len(keys))
+        order = np.lexsort((np.arange(len(keys)), hashes))  # por hash y, a igual hash, por fila
+        return hashes[order], order.astype(np.int64)
+
+    def find(self, key, matches):
+        h = np.uint64(_hash64(key))
+        lo = np.searchsorted(self.hashes, h, side="left")
+        hi = np.searchsorted(self.hashes, h, side="right")
+        for row in self.rows[lo:hi].tolist():
+            if matches(row):
+                return row
+        return None
+
+
+class LazyItems(Sequence):
+    """`catalog.items` armado al vuelo desde las columnas compartidas."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __len__(self):
+        return len(self.catalog)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        c = self.catalog
+        if i < 0:
+            i += len(c)
+        values = c.nutrients[i].tolist()
+        item = {"uri": c.uris[i], "name": c.names[i], "company": str(c.companies[i])}
+        item.update(zip(ITEM_NUTRIENTS, values))
+        item["category"] = str(c.categories[i])
+        item["state"] = str(c.states[i])
+        ranks = c.seal_ranks[i]
+        cols = np.flatnonzero(ranks)
+        # en el orden en que el ítem los tenía al publicarse
+        item["seals"] = [c.seal_labels[j] for j in cols[np.argsort(ranks[cols])].tolist()]
+        return item
+
+
+class SharedCatalog:
+    """Misma interfaz que `catalog.Catalog`, sobre columnas mapeadas en memoria."""
+
+    def __init__(self, directory, generation):
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        self.directory = directory
+        self.generation = generation
+        self.version = meta["version"]
+        self.seal_labels = meta["seal_labels"]
+
+        def load(name):
+            return np.load(directory / f"{name}.npy", mmap_mode="r")
+
+        self.nutrients = load("nutrients")
+        self.seal_ranks = load("seal_ranks")
+        self.name_ids = load("name_ids")
+        self.companies = load("companies")
+        self.categories = load("categories")
+        self.states = load("states")
+        self.uris = StringTable.load(directory, "uris")
+        self.names = StringTable.load(directory, "names")
+        self._by_name = HashIndex(load("name_hashes"), load("name_rows"))
+        self._by_uri = HashIndex(load("uri_hashes"), load("uri_rows"))
+        self.items = LazyItems(self)
+        self.derived = {}
+
+    def __len__(self):
+        return len(self.nutrients)
+
+    def column(self, nutrient):
+        from catalog import NUTRIENT_INDEX
+        return self.nutrients[:, NUTRIENT_INDEX[nutrient]]
+
+    def index_of(self, nombre):
+        if not nombre:
+            return None
+        key = nombre.lower()
+        return self._by_name.find(key, lambda row: self.names[row].lower() == key)
+
+    def index_of_uri(self, uri):
+        return self._by_uri.find(uri, lambda row: self.uris[row] == uri)
+
+    def find(self, nombre):
+        idx = self.index_of(nombre)
+        return self.items[idx] if idx is not None else None
+
+
+# --- Publicación ---
+def _write(catalog, directory):
+    directory.mkdir(parents=True)
+    labels = []
+    for item in catalog.items:
+        labels += [s for s in item["seals"] if s not in labels]
+    col = {label: j for j, label in enumerate(labels)}
+    # 0: sin el sello; si no, su posición (desde 1) en la lista del ítem
+    ranks = np.zeros((len(catalog), len(labels)), dtype=np.int16)
+    for row, item in enumerate(catalog.items):
+        ranks[row, [col[s] for s in item["seals"]]] = np.arange(1, len(item["seals"]) + 1)
+
+    np.save(directory / "nutrients.npy", np.ascontiguousarray(catalog.nutrients))
+    np.save(directory / "seal_ranks.npy", ranks)
+    np.save(directory / "name_ids.npy", np.asarray(catalog.name_ids))
+    for name in ("companies", "categories", "states"):
+        np.save(directory / f"{name}.npy", np.asarray(getattr(catalog, name)))
+    names = list(catalog.names)
+    uris = list(catalog.uris)
+    StringTable.save(directory, "names", names)
+    StringTable.save(directory, "uris", uris)
+    for prefix, keys in (("name", [n.lower() for n in names]), ("uri", uris)):
+        hashes, rows = HashIndex.build(keys)
+        np.save(directory / f"{prefix}_hashes.npy", hashes)
+        np.save(directory / f"{prefix}_rows.npy", rows)
+    meta = {"format": FORMAT_VERSION, "version": catalog.version, "seal_labels": labels, "items": len(catalog)}
+    (directory / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+
+def read_current(root=SHARED_DIR):
+    try:
+        return json.loads((root / "CURRENT").read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def signature(root=SHARED_DIR):
+    """(mtime, tamaño) de CURRENT, para detectar una generación nueva con un `stat`."""
+    if not ENABLED:
+        return ()
+    try:
+        st = (root / "CURRENT").stat()
+        return ((st.st_mtime_ns, st.st_size),)
+    except FileNotFoundError:
+        return (None,)
+
+
+def attach(version=None, root=SHARED_DIR):
+    """Catálogo de la generación vigente (None si no hay o deriva de otros archivos).
+
+    Se compara sólo la versión de los archivos: una generación publicada por
+    un cambio en vivo ("<versión>+<cambio>") también sirve.
+    """
+    current = read_current(root)
+    if current is None or current.get("format") != FORMAT_VERSION:
+        return None
+    if version is not None and current["version"].partition("+")[0] != version.partition("+")[0]:
+        return None
+    try:
+        return SharedCatalog(root / current["directory"], current["generation"])
+    except (FileNotFoundError, ValueError, KeyError) as e:
+        logger.warning(f"No se pudo abrir el catálogo compartido: {e}")
+        return None
+
+
+def publish(catalog, root=SHARED_DIR):
+    """Escribe `catalog` como generación nueva y la deja vigente; devuelve la vista compartida.
+
+    Llamar con `locked()` tomado: el número de generación sale de CURRENT.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    current = read_current(root)
+    generation = (current["generation"] if current else 0) + 1
+    name = f"gen-{generation}"
+    shutil.rmtree(root / name, ignore_errors=True)
+    _write(catalog, root / name)
+
+    pointer = {"format": FORMAT_VERSION, "generation": generation, "version": catalog.version, "directory": name}
+    tmp = root / "CURRENT.tmp"
+    tmp.write_text(json.dumps(pointer), encoding="utf-8")
+    os.replace(tmp, root / "CURRENT")
+    logger.info(f"Catálogo {catalog.version} publicado como generación {generation}")
+
+    # los archivos ya mapeados por otros procesos siguen siendo válidos tras borrarlos
+    for old in root.glob("gen-*"):
+        if int(old.name.split("-")[1]) <= generation - KEEP_GENERATIONS:
+            shutil.rmtree(old, ignore_errors=True)
+    return SharedCatalog(root / name, generation)
+
+
+@contextmanager
+def locked(root=SHARED_DIR):
+    """Lock entre procesos para que un solo worker arme y publique cada versión."""
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / "lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
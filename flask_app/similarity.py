@@ -0,0 +1,223 @@
+"""
+Grafo de similitud materializado: los k vecinos más cercanos de cada ítem.
+
+`python3 similarity.py` calcula, para todo `ex:MenuItem` del catálogo, sus k
+vecinos (distancia euclidiana sobre DEFAULT_NUTRIENTS, la métrica por defecto
+de `/recomendar`) por bloques de filas repartidos en un pool de procesos. El
+resultado se guarda en `utils/graphs/similarity.npz` y como N-Quads en
+`utils/graphs/similarity.nq`. Si el archivo corresponde a las fuentes
+cargadas, al arrancar se agrega al grafo con nombre `graph/similarity`:
+
+    item ex:similarTo vecino .
+    <item/similar/1> ex:source item ; ex:target vecino ;
+                     ex:distance "12.3"^^xsd:double ; ex:rank 1 .
+
+Con la tabla disponible, `/recomendar` sin filtros ni pesos es una búsqueda
+por fila. Los cambios en vivo (`catalog_updates.py`) recalculan sólo los
+vecindarios afectados: los ítems cambiados y los que los tenían como vecinos;
+al resto sólo se le intercalan los ítems cambiados que quedan más cerca que su
+k-ésimo vecino.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from rdflib import Literal, Namespace, URIRef, XSD
+
+EX = Namespace("http://example.com/menu#")
+
+SIMILARITY_FILE = Path(__file__).resolve().parent / "utils/graphs/similarity.npz"
+K = 6
+BLOCK_ROWS = 1024  # filas de consultas por tarea del pool
+
+
+class SimilarityTable:
+    """Vecinos (índices de fila, -1 si faltan) y distancias de una versión del catálogo."""
+
+    def __init__(self, version, uris, neighbors, distances, nutrients, sources=None):
+        self.version = version
+        self.uris = list(uris)
+        self.neighbors = neighbors
+        self.distances = distances
+        self.nutrients = tuple(nutrients)
+        self.sources = sources or {}
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    def lookup(self, row, k):
+        return [i for i in self.neighbors[row, :max(k, 0)].tolist() if i >= 0]
+
+    # --- Grafo RDF ---
+    def triples(self, rows=None):
+        rows = range(len(self.uris)) if rows is None else rows
+        for row in rows:
+            item = URIRef(self.uris[row])
+            for rank, (j, d) in enumerate(zip(self.neighbors[row].tolist(), self.distances[row].tolist()), 1):
+                if j < 0:
+                    continue
+                target = URIRef(self.uris[j])
+                node = URIRef(f"{item}/similar/{rank}")
+                yield item, EX.similarTo, target
+                yield node, EX.source, item
+                yield node, EX.target, target
+                yield node, EX.distance, Literal(d, datatype=XSD.double)
+                yield node, EX.rank, Literal(rank)
+
+    def add_to(self, graph, rows=None):
+        graph.addN((s, p, o, graph) for s, p, o in self.triples(rows))
+
+    @staticmethod
+    def remove_from(graph, uris, k):
+        for uri in uris:
+            item = URIRef(uri)
+            graph.remove((item, EX.similarTo, None))
+            for rank in range(1, k + 1):
+                graph.remove((URIRef(f"{item}/similar/{rank}"), None, None))
+
+    # --- Persistencia ---
+    def save(self, path=SIMILARITY_FILE):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                uris=np.array(self.uris, dtype=str),
+                neighbors=self.neighbors,
+                distances=self.distances,
+                meta=np.array(json.dumps({"version": self.version, "nutrients": self.nutrients,
+                                          "sources": self.sources})),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=SIMILARITY_FILE):
+        """Tabla guardada, o None si no existe o no se puede leer."""
+        try:
+            data = np.load(path)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        with data:
+            meta = json.loads(str(data["meta"]))
+            return cls(meta["version"], data["uris"].tolist(), data["neighbors"], data["distances"],
+                       meta["nutrients"], meta["sources"])
+
+    # --- Mantenimiento incremental ---
+    def updated(self, catalog, changed, deleted):
+        """Tabla para `catalog`, que difiere de la actual en los URIs `changed` y `deleted`.
+
+        Devuelve (tabla nueva, URIs cuyas filas cambiaron).
+        """
+        from recommender import block_top_k
+        X, names = _space(catalog, self.nutrients)
+        position = {uri: i for i, uri in enumerate(catalog.uris)}
+        remap = np.array([position.get(u, -1) for u in self.uris] + [-1], dtype=np.intp)
+        old_touched = np.array([u in changed or u in deleted for u in self.uris] + [False])
+
+        n, k = len(catalog), self.k
+        survivors = np.flatnonzero(remap[:-1] >= 0)
+        moved = remap[survivors]
+        neighbors = np.full((n, k), -1, dtype=np.intp)
+        distances = np.full((n, k), np.inf)
+        # el -1 de "sin vecino" cae en el centinela final de `remap` / `old_touched`
+        neighbors[moved] = remap[self.neighbors[survivors]]
+        distances[moved] = self.distances[survivors]
+
+        # filas a recalcular: las nuevas, las cambiadas y las que tenían a alguna de vecina
+        stale = np.ones(n, dtype=bool)
+        stale[moved] = old_touched[self.neighbors[survivors]].any(axis=1)
+        stale[[position[u] for u in changed if u in position]] = True
+
+        all_rows = np.arange(n)
+        rows = np.flatnonzero(stale)
+        if len(rows):
+            neighbors[rows], distances[rows] = block_top_k(X[rows], names[rows], X, names, all_rows, k)
+
+        # al resto se le intercalan los ítems cambiados que quedan más cerca
+        new_rows = np.array(sorted(position[u] for u in changed if u in position), dtype=np.intp)
+        rest = np.flatnonzero(~stale)
+        if len(new_rows) and len(rest):
+            cand, cand_d = block_top_k(X[rest], names[rest], X[new_rows], names[new_rows], new_rows,
+                                       min(k, len(new_rows)))
+            idx = np.hstack([neighbors[rest], cand])
+            dist = np.hstack([distances[rest], cand_d])
+            order = np.lexsort((np.where(idx >= 0, idx, n), dist), axis=-1)[:, :k]
+            neighbors[rest] = np.take_along_axis(idx, order, axis=1)
+            distances[rest] = np.take_along_axis(dist, order, axis=1)
+
+        table = SimilarityTable(catalog.version, catalog.uris, neighbors, distances, self.nutrients, self.sources)
+        old_rows = {u: i for i, u in enumerate(self.uris)}
+        touched = set(deleted) | set(changed)
+        for row, uri in enumerate(table.uris):
+            old = old_rows.get(uri)
+            if (old is None or not np.array_equal(remap[self.neighbors[old]], neighbors[row])
+                    or not np.array_equal(self.distances[old], distances[row])):
+                touched.add(uri)
+        return table, touched
+
+
+def _space(catalog, nutrients):
+    from catalog import NUTRIENT_INDEX
+    cols = [NUTRIENT_INDEX[n] for n in nutrients]
+    return np.ascontiguousarray(catalog.nutrients[:, cols]), np.asarray(catalog.name_ids)
+
+
+_shared = {}
+
+
+def _init_worker(X, names):
+    _shared.update(X=X, names=names)
+
+
+def _block(start, stop, k):
+    from recommender import block_top_k
+    X, names = _shared["X"], _shared["names"]
+    return block_top_k(X[start:stop], names[start:stop], X, names, np.arange(len(X)), k)
+
+
+def compute(catalog, k=K, nutrients=None, workers=None, block_rows=BLOCK_ROWS):
+    """Calcula la tabla completa de `catalog` repartiendo bloques de filas en procesos."""
+    from recommender import DEFAULT_NUTRIENTS
+    nutrients = tuple(nutrients or DEFAULT_NUTRIENTS)
+    X, names = _space(catalog, nutrients)
+    workers = workers or os.cpu_count() or 1
+    starts = list(range(0, len(X), block_rows))
+    if workers <= 1 or len(starts) <= 1:
+        _init_worker(X, names)
+        parts = [_block(s, s + block_rows, k) for s in starts]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(X, names)) as pool:
+            parts = list(pool.map(_block, starts, [s + block_rows for s in starts], [k] * len(starts)))
+    neighbors = np.vstack([p[0] for p in parts]) if parts else np.empty((0, k), dtype=np.intp)
+    distances = np.vstack([p[1] for p in parts]) if parts else np.empty((0, k))
+    return SimilarityTable(catalog.version, catalog.uris, neighbors, distances, nutrients)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materializa los k vecinos de cada ítem como grafo ex:similarTo")
+    parser.add_argument("-k", type=int, default=K)
+    parser.add_argument("--nutrients", nargs="+", help="columnas (por defecto, las de /recomendar)")
+    parser.add_argument("--workers", type=int, help="procesos (por defecto, uno por CPU)")
+    args = parser.parse_args()
+
+    from rdflib import Graph
+
+    import utils
+    from catalog import get_catalog
+
+    catalog = get_catalog()
+    t0 = time.perf_counter()
+    table = compute(catalog, args.k, args.nutrients, args.workers)
+    table.sources = utils.fuentes_cargadas
+    table.save()
+    graph = Graph(identifier=utils.GRAPH_SIMILARITY)
+    table.add_to(graph)
+    path = utils.GRAPHS_DIR / "similarity.nq"
+    utils.escribir_nquads(graph, path, utils._nquads_key("similarity", table.sources))
+    print(f"{len(table.uris)} ítems × {table.k} vecinos en {time.perf_counter() - t0:.2f} s "
+          f"→ {SIMILARITY_FILE.name}, {path.name} ({len(graph)} tripletes)")
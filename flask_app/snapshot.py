@@ -0,0 +1,206 @@
+"""
+Snapshot binario de los grafos con nombre y de la tabla de ítems derivada.
+
+Los términos RDF se codifican en un diccionario (un id entero por término) y
+los tripletes quedan como un arreglo `int32` de n×3. Todo se guarda como
+archivos `.npy` dentro de un directorio por grafo (`utils/graphs/<grafo>.snapshot/`),
+de modo que se pueden abrir con `np.load(..., mmap_mode="r")`. `meta.json`
+guarda el hash SHA-256 del TTL de origen: si no coincide, el snapshot se ignora.
+
+Uso para comparar tiempos de arranque:
+
+    python3 snapshot.py
+"""
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+from rdflib import BNode, Graph, Literal, URIRef
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+ITEMS_FORMAT_VERSION = 2  # 2: sellos de cada ítem en orden fijo
+
+KIND_URI, KIND_BNODE, KIND_LITERAL = 0, 1, 2
+
+
+def _write_strings(path, strings):
+    """Guarda una lista de strings como blob UTF-8 + offsets."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(path / "strings.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(path / "offsets.npy", offsets)
+
+
+def _read_strings(path):
+    blob = np.load(path / "strings.npy", mmap_mode="r")
+    offsets = np.load(path / "offsets.npy", mmap_mode="r")
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def _read_meta(directory):
+    try:
+        with open(directory / "meta.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _replace_dir(tmp, final):
+    if final.exists():
+        shutil.rmtree(final)
+    os.rename(tmp, final)
+
+
+# --- Grafo ---
+def encode_graph(graph):
+    """Codifica el grafo como (tabla de términos, arreglo de tripletes)."""
+    ids = {}
+    kinds, values, datatypes, langs = [], [], [], []
+
+    def term_id(term):
+        tid = ids.get(term)
+        if tid is not None:
+            return tid
+        if isinstance(term, Literal):
+            # el datatype también es un término del diccionario
+            dt = term_id(term.datatype) if term.datatype is not None else -1
+            kinds.append(KIND_LITERAL)
+            datatypes.append(dt)
+            langs.append(term.language or "")
+        else:
+            kinds.append(KIND_BNODE if isinstance(term, BNode) else KIND_URI)
+            datatypes.append(-1)
+            langs.append("")
+        values.append(str(term))
+        tid = ids[term] = len(values) - 1
+        return tid
+
+    triples = np.array([(term_id(s), term_id(p), term_id(o)) for s, p, o in graph],
+                       dtype=np.int32).reshape(-1, 3)
+    terms = {
+        "kinds": np.array(kinds, dtype=np.uint8),
+        "datatypes": np.array(datatypes, dtype=np.int32),
+        "langs": langs,
+        "values": values,
+    }
+    return terms, triples
+
+
+def decode_terms(terms):
+    """Reconstruye los términos rdflib, una sola vez por id."""
+    kinds, datatypes = terms["kinds"], terms["datatypes"]
+    values, langs = terms["values"], terms["langs"]
+    out = [None] * len(values)
+    for i in range(len(values)):
+        kind = kinds[i]
+        if kind == KIND_URI:
+            out[i] = URIRef(values[i])
+        elif kind == KIND_BNODE:
+            out[i] = BNode(values[i])
+    for i in range(len(values)):
+        if kinds[i] == KIND_LITERAL:
+            dt = out[datatypes[i]] if datatypes[i] >= 0 else None
+            out[i] = Literal(values[i], datatype=dt, lang=langs[i] or None)
+    return out
+
+
+def save_graph(graph, source_hash, directory):
+    terms, triples = encode_graph(graph)
+    tmp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    (tmp / "terms").mkdir(parents=True)
+    (tmp / "langs").mkdir()
+    np.save(tmp / "triples.npy", triples)
+    np.save(tmp / "kinds.npy", terms["kinds"])
+    np.save(tmp / "datatypes.npy", terms["datatypes"])
+    _write_strings(tmp / "terms", terms["values"])
+    _write_strings(tmp / "langs", terms["langs"])
+    meta = {
+        "format": FORMAT_VERSION,
+        "source_sha256": source_hash,
+        "triples": int(len(triples)),
+        "terms": len(terms["values"]),
+    }
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    _replace_dir(tmp, directory)
+    logger.info(f"Snapshot del grafo guardado en {directory} ({meta['triples']} tripletes)")
+
+
+def load_graph(source_hash, directory, graph=None):
+    """Carga el grafo desde el snapshot; devuelve None si falta o está desactualizado."""
+    meta = _read_meta(directory)
+    if not meta or meta.get("format") != FORMAT_VERSION or meta.get("source_sha256") != source_hash:
+        return None
+    triples = np.load(directory / "triples.npy", mmap_mode="r")
+    terms = decode_terms({
+        "kinds": np.load(directory / "kinds.npy", mmap_mode="r"),
+        "datatypes": np.load(directory / "datatypes.npy", mmap_mode="r"),
+        "values": _read_strings(directory / "terms"),
+        "langs": _read_strings(directory / "langs"),
+    })
+    g = graph if graph is not None else Graph()
+    g.addN((terms[s], terms[p], terms[o], g) for s, p, o in triples.tolist())
+    return g
+
+
+# --- Tabla de ítems ---
+def save_items(items, nutrients, source_hash, directory):
+    """Guarda la tabla de ítems del catálogo junto al snapshot del grafo."""
+    if not directory.exists():
+        return
+    target = directory / "items"
+    tmp = directory / "items.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    np.save(tmp / "nutrients.npy", np.asarray(nutrients))
+    with open(tmp / "items.json", "w", encoding="utf-8") as f:
+        json.dump(items, f, ensure_ascii=False)
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"format": ITEMS_FORMAT_VERSION, "source_sha256": source_hash, "items": len(items)}, f)
+    _replace_dir(tmp, target)
+
+
+def load_items(source_hash, directory):
+    """Devuelve (items, nutrients) si la tabla corresponde a `source_hash`, si no None."""
+    target = directory / "items"
+    meta = _read_meta(target)
+    if not meta or meta.get("format") != ITEMS_FORMAT_VERSION or meta.get("source_sha256") != source_hash:
+        return None
+    with open(target / "items.json", encoding="utf-8") as f:
+        items = json.load(f)
+    nutrients = np.load(target / "nutrients.npy", mmap_mode="r")
+    if len(items) != len(nutrients):
+        return None
+    return items, nutrients
+
+
+if __name__ == "__main__":
+    import utils
+    from utils import file_hash
+
+    source = utils.ORIGINAL_FILE
+    directory = utils.GRAPHS_DIR / "data.snapshot"
+    source_hash = file_hash(source)
+
+    t0 = time.perf_counter()
+    g = Graph()
+    g.parse(source, format="ttl")
+    t_ttl = time.perf_counter() - t0
+
+    if load_graph(source_hash, directory) is None:
+        save_graph(g, source_hash, directory)
+
+    t0 = time.perf_counter()
+    g2 = load_graph(source_hash, directory)
+    t_snap = time.perf_counter() - t0
+
+    print(f"Turtle:   {t_ttl:.3f} s ({len(g)} tripletes)")
+    print(f"Snapshot: {t_snap:.3f} s ({len(g2)} tripletes)")
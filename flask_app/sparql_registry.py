@@ -0,0 +1,45 @@
+"""
+Registro de consultas SPARQL precompiladas.
+
+Cada consulta se registra una vez con un nombre (`register`) y se compila en
+ese momento con `prepareQuery`: el parseo y la traducción al álgebra no se
+repiten por llamada. `select(nombre, ...)` la ejecuta con los bindings dados.
+
+Los resultados no se cachean acá: la única consulta sobre `utils.g` es la de
+ítems, y su resultado ya queda materializado en el catálogo de cada versión.
+"""
+import threading
+
+from rdflib.plugins.sparql import prepareQuery
+
+import metrics
+import utils
+
+NAMESPACES = {"ex": utils.EX, "skos": utils.SKOS}
+
+_queries = {}
+_queries_lock = threading.Lock()
+
+
+def register(name, text, namespaces=None):
+    """Compila `text` y lo deja disponible como `name` (devuelve la consulta preparada)."""
+    prepared = prepareQuery(text, initNs=namespaces or NAMESPACES)
+    with _queries_lock:
+        _queries[name] = prepared
+    return prepared
+
+
+def prepared(name):
+    try:
+        return _queries[name]
+    except KeyError:
+        raise KeyError(f"Consulta SPARQL no registrada: {name}") from None
+
+
+def select(name, graph=None, bindings=None):
+    """Filas de la consulta `name` sobre `graph` (por defecto `utils.g`)."""
+    query = prepared(name)
+    if graph is None:
+        graph = utils.g
+    with metrics.stage(f"query:{name}"):
+        return list(graph.query(query, initBindings=bindings or {}))
@@ -0,0 +1,60 @@
+"""
+Índice espacial (KD-tree) sobre los vectores de nutrientes del catálogo.
+
+Soporta consultas de caja con la misma semántica que los filtros "±tolerancia
+en cada nutriente" de `querys.py`, consultas por radio y k-NN exacto. El árbol
+se guarda en arreglos NumPy planos (sin objetos por nodo) y las hojas se
+evalúan de forma vectorizada (ver `kdtree.py`).
+"""
+
+import numpy as np
+
+from catalog import NUTRIENTS, NUTRIENT_INDEX, derived, get_catalog
+from kdtree import KDTree
+
+# Nombres de `querys.TOLERANCES` (WikiFCD) → columnas del catálogo
+WIKI_TO_CATALOG = {
+    "calories": "calories", "totalfat": "fat", "fatsaturated": "saturatedFat",
+    "fattrans": "transFat", "cholesterol": "cholesterol", "sodium": "sodium",
+    "carbs": "carbs", "fiber": "fiber", "sugar": "sugars", "protein": "protein",
+}
+
+
+class NutrientIndex:
+    """KD-tree sobre un subconjunto de columnas de una versión del catálogo."""
+
+    def __init__(self, catalog, nutrients=NUTRIENTS):
+        self.catalog = catalog
+        self.nutrients = tuple(nutrients)
+        self.cols = [NUTRIENT_INDEX[n] for n in self.nutrients]
+        self.tree = KDTree(catalog.nutrients[:, self.cols])
+
+    def _vector(self, values):
+        return np.array([float(values.get(n, 0.0)) for n in self.nutrients])
+
+    def within_tolerances(self, reference, tolerances):
+        """Ítems dentro de ±tolerancia en cada nutriente (claves de `querys.TOLERANCES`).
+
+        Los nutrientes sin tolerancia o sin valor de referencia no restringen.
+        """
+        lower = np.full(len(self.nutrients), -np.inf)
+        upper = np.full(len(self.nutrients), np.inf)
+        for key, tol in tolerances.items():
+            name = WIKI_TO_CATALOG.get(key, key)
+            if name in self.nutrients and name in reference:
+                j = self.nutrients.index(name)
+                lower[j] = reference[name] - tol
+                upper[j] = reference[name] + tol
+        return self.tree.box(lower, upper)
+
+    def within_radius(self, reference, r):
+        return self.tree.radius(self._vector(reference), r)
+
+    def nearest(self, reference, k, exclude=None):
+        return self.tree.knn(self._vector(reference), k, exclude=exclude)
+
+
+def get_spatial_index(nutrients=NUTRIENTS):
+    """Índice de la versión vigente del catálogo; se arma una vez por snapshot."""
+    key = tuple(nutrients)
+    return derived(get_catalog(), ("spatial_index", key), lambda c: NutrientIndex(c, key), "spatial_index")
@@ -0,0 +1,359 @@
+"""
+Store de rdflib persistente en SQLite, compartido por todos los workers.
+
+En vez de que cada worker de Flask/gunicorn parsee su propio `Dataset` en
+memoria, el Dataset (ontología, datos y sellos, ver `utils.cargar_grafo`) se
+vuelca una vez a `utils/graph.sqlite` y cada worker lo abre en modo sólo
+lectura: arranca en milisegundos y las páginas del archivo se comparten a
+través de la cache del sistema operativo (`mmap`).
+
+Esquema:
+
+- `terms(id, kind, value, datatype, lang)`: diccionario de términos RDF;
+- `quads(s, p, o, c)`: ids de término, con índices (p, o, s), (o, s) y
+  (s, p, o) además de la clave (c, s, p, o);
+- `graphs`, `namespaces` y `meta` (hashes de las fuentes con que se armó).
+
+Se activa con `GRAPH_STORE=sqlite`; si el archivo no existe o no corresponde
+a las fuentes actuales, `utils.py` vuelve a cargar el grafo en memoria.
+
+    python3 sqlite_store.py            # arma utils/graph.sqlite
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from rdflib import BNode, Dataset, Graph, Literal, URIRef
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+from rdflib.store import Store
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE = Path(__file__).resolve().parent / "utils/graph.sqlite"
+
+KIND_URI, KIND_BNODE, KIND_LITERAL = 0, 1, 2
+
+MMAP_SIZE = 1 << 30
+BATCH_SIZE = 50000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT NOT NULL DEFAULT '',
+    lang TEXT NOT NULL DEFAULT '',
+    UNIQUE (kind, value, datatype, lang)
+);
+CREATE TABLE IF NOT EXISTS quads (
+    s INTEGER NOT NULL, p INTEGER NOT NULL, o INTEGER NOT NULL, c INTEGER NOT NULL,
+    PRIMARY KEY (c, s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS quads_pos ON quads (p, o, s);
+CREATE INDEX IF NOT EXISTS quads_os ON quads (o, s);
+CREATE INDEX IF NOT EXISTS quads_spo ON quads (s, p, o);
+CREATE TABLE IF NOT EXISTS graphs (c INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS namespaces (prefix TEXT PRIMARY KEY, uri TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def _key(term):
+    if isinstance(term, Literal):
+        return KIND_LITERAL, str(term), str(term.datatype or ""), term.language or ""
+    return (KIND_BNODE if isinstance(term, BNode) else KIND_URI), str(term), "", ""
+
+
+class SQLiteStore(Store):
+    """Store de quads (context-aware y graph-aware) sobre un archivo SQLite."""
+
+    context_aware = True
+    graph_aware = True
+    formula_aware = False
+    transaction_aware = False
+
+    def __init__(self, configuration=None, read_only=False):
+        self.read_only = read_only
+        self.path = None
+        self._local = threading.local()
+        self._ids = {}  # término → id (sólo al escribir)
+        self._namespace, self._prefix = {}, {}
+        self._term = lru_cache(maxsize=1 << 16)(self._decode)
+        self._find = lru_cache(maxsize=1 << 16)(self._find_id)
+        super().__init__(configuration)
+
+    # --- Conexión ---
+    def open(self, configuration, create=False):
+        self.path = Path(configuration)
+        if self.read_only and not self.path.exists():
+            raise FileNotFoundError(self.path)
+        conn = self._conn()
+        if create and not self.read_only:
+            conn.executescript(SCHEMA)
+        self._namespace = {p: URIRef(u) for p, u in conn.execute("SELECT prefix, uri FROM namespaces")}
+        self._prefix = {u: p for p, u in self._namespace.items()}
+        return None
+
+    def _conn(self):
+        """Una conexión por hilo (los cursores de rdflib son generadores perezosos)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.read_only:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+                conn.execute("PRAGMA query_only = ON")
+            else:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            self._local.conn = conn
+        return conn
+
+    def close(self, commit_pending_transaction=False):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            if commit_pending_transaction and not self.read_only:
+                conn.commit()
+            conn.close()
+            self._local.conn = None
+
+    def commit(self):
+        if not self.read_only:
+            self._conn().commit()
+
+    def meta(self):
+        return dict(self._conn().execute("SELECT key, value FROM meta"))
+
+    def set_meta(self, **values):
+        self._conn().executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                 [(k, json.dumps(v) if not isinstance(v, str) else v) for k, v in values.items()])
+
+    # --- Términos ---
+    def _decode(self, tid):
+        kind, value, datatype, lang = self._conn().execute(
+            "SELECT kind, value, datatype, lang FROM terms WHERE id = ?", (tid,)).fetchone()
+        if kind == KIND_URI:
+            return URIRef(value)
+        if kind == KIND_BNODE:
+            return BNode(value)
+        return Literal(value, datatype=URIRef(datatype) if datatype else None, lang=lang or None)
+
+    def _find_id(self, key):
+        row = self._conn().execute(
+            "SELECT id FROM terms WHERE kind = ? AND value = ? AND datatype = ? AND lang = ?", key).fetchone()
+        return row[0] if row else None
+
+    def _lookup(self, term):
+        tid = self._ids.get(term)
+        if tid is not None:
+            return tid
+        if self.read_only:
+            # en sólo lectura los ids no cambian: se pueden cachear
+            return self._find(_key(term))
+        return self._find_id(_key(term))
+
+    def _intern(self, term):
+        tid = self._lookup(term)
+        if tid is None:
+            tid = self._conn().execute("INSERT INTO terms (kind, value, datatype, lang) VALUES (?, ?, ?, ?)",
+                                       _key(term)).lastrowid
+        self._ids[term] = tid
+        return tid
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"{self.path} está abierto en modo sólo lectura")
+
+    @staticmethod
+    def _identifier(context):
+        if context is None:
+            return None
+        return getattr(context, "identifier", context)
+
+    def _graph(self, tid):
+        return Graph(store=self, identifier=self._term(tid))
+
+    # --- Escritura ---
+    def add(self, triple, context, quoted=False):
+        self.addN([(*triple, context)])
+
+    def addN(self, quads):
+        self._check_writable()
+        conn = self._conn()
+        rows = []
+        for s, p, o, c in quads:
+            ident = self._identifier(c) or DATASET_DEFAULT_GRAPH_ID
+            rows.append((self._intern(s), self._intern(p), self._intern(o), self._intern(ident)))
+            if len(rows) >= BATCH_SIZE:
+                self._insert(conn, rows)
+                rows = []
+        if rows:
+            self._insert(conn, rows)
+
+    @staticmethod
+    def _insert(conn, rows):
+        conn.executemany("INSERT OR IGNORE INTO quads VALUES (?, ?, ?, ?)", rows)
+        conn.executemany("INSERT OR IGNORE INTO graphs VALUES (?)", {(r[3],) for r in rows})
+
+    def remove(self, triple_pattern, context=None):
+        self._check_writable()
+        where, args = self._where(triple_pattern, context)
+        if where is not None:
+            self._conn().execute(f"DELETE FROM quads WHERE {where}", args)
+
+    def add_graph(self, graph):
+        if self._lookup(graph.identifier) is not None or self.read_only:
+            return
+        self._conn().execute("INSERT OR IGNORE INTO graphs VALUES (?)", (self._intern(graph.identifier),))
+
+    def remove_graph(self, graph):
+        self._check_writable()
+        self.remove((None, None, None), graph)
+        tid = self._lookup(graph.identifier)
+        if tid is not None:
+            self._conn().execute("DELETE FROM graphs WHERE c = ?", (tid,))
+
+    # --- Lectura ---
+    def _where(self, triple_pattern, context):
+        """Condición SQL del patrón; where=None si algún término no existe (no hay resultados)."""
+        where, args = [], []
+        for col, term in zip("spo", triple_pattern):
+            if term is None:
+                continue
+            tid = self._lookup(term)
+            if tid is None:
+                return None, None
+            where.append(f"{col} = ?")
+            args.append(tid)
+        ident = self._identifier(context)
+        if ident is not None:
+            tid = self._lookup(ident)
+            if tid is None:
+                return None, None
+            where.append("c = ?")
+            args.append(tid)
+        return " AND ".join(where) or "1", args
+
+    def triples(self, triple_pattern, context=None):
+        where, args = self._where(triple_pattern, context)
+        if where is None:
+            return
+        term = self._term
+        if self._identifier(context) is not None:
+            for s, p, o in self._conn().execute(f"SELECT s, p, o FROM quads WHERE {where}", args):
+                yield (term(s), term(p), term(o)), iter((context,))
+        else:
+            # unión de todos los grafos: cada triplete una sola vez
+            for s, p, o in self._conn().execute(f"SELECT DISTINCT s, p, o FROM quads WHERE {where}", args):
+                yield (term(s), term(p), term(o)), self._contexts_of(s, p, o)
+
+    def _contexts_of(self, s, p, o):
+        rows = self._conn().execute("SELECT c FROM quads WHERE s = ? AND p = ? AND o = ?", (s, p, o)).fetchall()
+        for (c,) in rows:
+            yield self._graph(c)
+
+    def __len__(self, context=None):
+        where, args = self._where((None, None, None), context)
+        if where is None:
+            return 0
+        if self._identifier(context) is not None:
+            sql = f"SELECT COUNT(*) FROM quads WHERE {where}"
+        else:
+            sql = "SELECT COUNT(*) FROM (SELECT DISTINCT s, p, o FROM quads)"
+        return self._conn().execute(sql, args).fetchone()[0]
+
+    def contexts(self, triple=None):
+        if triple is None:
+            rows = self._conn().execute("SELECT c FROM graphs").fetchall()
+        else:
+            where, args = self._where(triple, None)
+            if where is None:
+                return
+            rows = self._conn().execute(f"SELECT DISTINCT c FROM quads WHERE {where}", args).fetchall()
+        for (c,) in rows:
+            yield self._graph(c)
+
+    # --- Prefijos ---
+    def bind(self, prefix, namespace, override=True):
+        if not override and (prefix in self._namespace or namespace in self._prefix):
+            return
+        old = self._namespace.pop(prefix, None)
+        self._prefix.pop(old, None)
+        self._namespace.pop(self._prefix.pop(namespace, None), None)
+        self._namespace[prefix] = URIRef(namespace)
+        self._prefix[URIRef(namespace)] = prefix
+        if not self.read_only and self.path is not None:
+            conn = self._conn()
+            conn.execute("DELETE FROM namespaces WHERE uri = ?", (str(namespace),))
+            conn.execute("INSERT OR REPLACE INTO namespaces VALUES (?, ?)", (prefix, str(namespace)))
+
+    def namespace(self, prefix):
+        return self._namespace.get(prefix)
+
+    def prefix(self, namespace):
+        return self._prefix.get(URIRef(namespace))
+
+    def namespaces(self):
+        yield from list(self._namespace.items())
+
+
+# --- Armado y apertura ---
+def build(source, path=STORE_FILE, sources=None):
+    """Vuelca todos los quads de `source` (un Dataset) a un archivo SQLite nuevo."""
+    tmp = path.with_name(path.name + ".tmp")
+    for leftover in (tmp, tmp.with_name(tmp.name + "-wal"), tmp.with_name(tmp.name + "-shm")):
+        leftover.unlink(missing_ok=True)
+    store = SQLiteStore()
+    store.open(tmp, create=True)
+    for prefix, namespace in source.namespaces():
+        store.bind(prefix, namespace)
+    for ctx in source.graphs():
+        store.add_graph(ctx)
+    store.addN((s, p, o, ctx) for s, p, o, ctx in source.quads((None, None, None, None)))
+    store.set_meta(sources=sources or {}, built_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    store.commit()
+    conn = store._conn()
+    conn.execute("PRAGMA journal_mode = DELETE")  # un solo archivo, apto para abrir en sólo lectura
+    conn.execute("ANALYZE")
+    store.close(commit_pending_transaction=True)
+    os.replace(tmp, path)
+    return path
+
+
+def open_dataset(path=STORE_FILE, sources=None):
+    """Dataset en sólo lectura sobre el archivo; None si no existe o fue armado con otras fuentes."""
+    try:
+        store = SQLiteStore(read_only=True)
+        store.open(path)
+        meta = store.meta()
+    except (FileNotFoundError, sqlite3.DatabaseError) as e:
+        logger.warning(f"No se pudo abrir el store SQLite {path}: {e}")
+        return None
+    if sources is not None and json.loads(meta.get("sources", "{}")) != sources:
+        logger.warning(f"El store SQLite {path} no corresponde a las fuentes actuales; ejecutar sqlite_store.py")
+        store.close()
+        return None
+    return Dataset(store=store, default_union=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Arma el store SQLite compartido a partir del grafo de la app")
+    parser.add_argument("-o", "--output", type=Path, default=STORE_FILE)
+    args = parser.parse_args()
+
+    os.environ["GRAPH_STORE"] = "memory"  # el origen siempre se carga en memoria
+    import utils
+
+    t0 = time.perf_counter()
+    build(utils.g, args.output, utils.fuentes_cargadas)
+    print(f"{len(utils.g)} tripletes → {args.output} en {time.perf_counter() - t0:.2f} s")
+
+    t0 = time.perf_counter()
+    ds = open_dataset(args.output, utils.fuentes_cargadas)
+    print(f"Apertura en sólo lectura: {(time.perf_counter() - t0) * 1000:.1f} ms ({len(ds)} tripletes)")
@@ -18,63 +18,72 @@ document.addEventListener("DOMContentLoaded", () => {
     const filterMinCarb = document.getElementById("filterMinCarbs");
     const filterMaxCarb = document.getElementById("filterMaxCarbs");
 
+    const prevPage = document.getElementById("prevPage");
+    const nextPage = document.getElementById("nextPage");
+    const pageInfo = document.getElementById("pageInfo");
+
+    let currentPage = initialPage;
+
     // --------------------------
     // Inicializar filtros dinámicos
     // --------------------------
     function initFilters() {
-        const restaurants = [...new Set(allItems.map(i => i.company))].sort();
         filterRestaurant.innerHTML = "";
         filterRestaurant.appendChild(new Option("Todos", ""));
-        restaurants.forEach(r => filterRestaurant.appendChild(new Option(r, r)));
+        facets.company.forEach(r => filterRestaurant.appendChild(new Option(r, r)));
 
-        const categories = [...new Set(allItems.map(i => i.category))].sort();
         filterCategory.innerHTML = "";
         filterCategory.appendChild(new Option("Todas", ""));
-        categories.forEach(c => filterCategory.appendChild(new Option(c, c)));
+        facets.category.forEach(c => filterCategory.appendChild(new Option(c, c)));
 
-        const allSeals = [...new Set(allItems.flatMap(i => i.seals || []))].sort();
         filterSeals.innerHTML = "";
         filterSeals.appendChild(new Option("Todos", ""));
         filterSeals.appendChild(new Option("Ninguno", "none"));
-        allSeals.forEach(s => filterSeals.appendChild(new Option(s, s)));
+        facets.seal.forEach(s => filterSeals.appendChild(new Option(s, s)));
     }
     initFilters();
 
     // --------------------------
-    // Función de filtrado avanzado
+    // Parámetros de filtrado (se evalúan en el servidor)
     // --------------------------
-    function applyFilters(list) {
-        const rest = filterRestaurant.value;
-        const cat  = filterCategory.value;
-        const seals = filterSeals.value;
-
-        const minCal = Number(filterMinCal.value || 0);
-        const maxCal = Number(filterMaxCal.value || Infinity);
-        const minProt = Number(filterMinProt.value || 0);
-        const maxProt = Number(filterMaxProt.value || Infinity);
-        const minFat = Number(filterMinFat.value || 0);
-        const maxFat = Number(filterMaxFat.value || Infinity);
-        const minCarb = Number(filterMinCarb.value || 0);
-        const maxCarb = Number(filterMaxCarb.value || Infinity);
-
-        return list.filter(p => {
-            if (rest && p.company !== rest) return false;
-            if (cat && p.category !== cat) return false;
-            if (p.calories < minCal || p.calories > maxCal) return false;
-            if (p.protein  < minProt || p.protein  > maxProt) return false;
-            if (p.fat      < minFat  || p.fat      > maxFat) return false;
-            if (p.carbs    < minCarb || p.carbs    > maxCarb) return false;
-
-            if (seals === "none") {
-                if (p.seals && p.seals.length > 0) return false;
-            } else if (seals) {
-                if (!p.seals || !p.seals.includes(seals)) return false;
-            }
-
-            return true;
+    function filterParams(query, page) {
+        const params = new URLSearchParams({ page: page || 1, per_page: initialPage.per_page });
+        if (query) params.set("q", query);
+        if (filterRestaurant.value) params.set("company", filterRestaurant.value);
+        if (filterCategory.value) params.set("category", filterCategory.value);
+        if (filterSeals.value) params.set("seal", filterSeals.value);
+
+        const ranges = [
+            ["calories", filterMinCal, filterMaxCal],
+            ["protein", filterMinProt, filterMaxProt],
+            ["fat", filterMinFat, filterMaxFat],
+            ["carbs", filterMinCarb, filterMaxCarb],
+        ];
+        ranges.forEach(([nutrient, min, max]) => {
+            if (min.value) params.set(`min_${nutrient}`, min.value);
+            if (max.value) params.set(`max_${nutrient}`, max.value);
         });
+        return params;
     }
 
+    async function fetchPage(query, page) {
+        const res = await fetch(`/platos?${filterParams(query, page)}`);
+        currentPage = await res.json();
+        currentPage.query = query;
+        renderTable(currentPage.items);
+        renderPager();
+        return currentPage.items;
+    }
+
+    function renderPager() {
+        pageInfo.textContent = `Página ${currentPage.page} de ${currentPage.pages} (${currentPage.total} platos)`;
+        prevPage.disabled = currentPage.page <= 1;
+        nextPage.disabled = currentPage.page >= currentPage.pages;
+    }
+
+    prevPage.addEventListener("click", () => fetchPage(currentPage.query, currentPage.page - 1));
+    nextPage.addEventListener("click", () => fetchPage(currentPage.query, currentPage.page + 1));
+
     // --------------------------
     // Renderizar tabla
     // --------------------------
@@ -114,11 +123,14 @@ document.addEventListener("DOMContentLoaded", () => {
     // --------------------------
     // Autocompletado
     // --------------------------
-    input.addEventListener("input", () => {
-        const query = input.value.toLowerCase();
+    input.addEventListener("input", async () => {
+        const query = input.value.trim();
         autocomplete.innerHTML = "";
         if (!query) return;
-        const matches = allItems.filter(p => p.name.toLowerCase().includes(query)).slice(0, 5);
+        const res = await fetch(`/buscar?${new URLSearchParams({ q: query, limit: 5 })}`);
+        const matches = (await res.json()).resultados;
+        if (input.value.trim() !== query) return;
+        autocomplete.innerHTML = "";
         matches.forEach(p => {
             const a = document.createElement("a");
             a.className = "list-group-item list-group-item-action";
@@ -136,10 +148,8 @@ document.addEventListener("DOMContentLoaded", () => {
     // Botón Buscar
     // --------------------------
     searchBtn.addEventListener("click", async () => {
-        const query = input.value.trim().toLowerCase();
-        let filtered = allItems.filter(p => p.name.toLowerCase().includes(query));
-        filtered = applyFilters(filtered);
-        renderTable(filtered);
+        const query = input.value.trim();
+        const filtered = await fetchPage(query, 1);
 
         if (filtered.length > 0) {
             fetchRecommendations(filtered[0].name);
@@ -161,8 +171,7 @@ document.addEventListener("DOMContentLoaded", () => {
             input.value = itemName;
 
             // Filtrar por ese nombre exacto
-            let filtered = allItems.filter(p => p.name === itemName);
-            filtered = applyFilters(filtered);
+            const filtered = (await fetchPage(itemName, 1)).filter(p => p.name === itemName);
             renderTable(filtered);
 
             // Llamar a recomendaciones si hay resultados
@@ -275,9 +284,10 @@ document.addEventListener("DOMContentLoaded", () => {
 
 
     // Render inicial
-    renderTable(allItems);
+    renderTable(initialPage.items);
+    renderPager();
 
-    if (allItems.length > 0) {
-    fetchRecommendations(allItems[0].name);
+    if (initialPage.items.length > 0) {
+    fetchRecommendations(initialPage.items[0].name);
     }
 });
@@ -0,0 +1,153 @@
+"""
+Generador de catálogos sintéticos con la forma de `utils/merged.ttl`.
+
+Produce `ex:MenuItem` con las mismas propiedades (itemName, company, category,
+hasPhysicalState y los diez nutrientes) y la misma cabecera de clases y sellos,
+para medir cómo escalan las rutas de la app con 1k/10k/100k/1M ítems. Los
+valores son deterministas para una misma semilla.
+
+    python3 synthetic_catalog.py 100000 -o /tmp/menu_100k.ttl
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+from rdflib import Graph
+
+from seals import SEAL_INPUTS, SealEngine, read_seal_definitions
+
+SOURCE_FILE = Path(__file__).resolve().parent / "utils/merged.ttl"
+ITEM_PREFIX = "http://example.com/menu/item/"
+
+COMPANIES = ("McDonald's", "KFC", "Taco_Bell", "Burger_King", "The_Wendy's_Company",
+             "Subway_(restaurant)", "Pizza_Hut")
+COMPANY_WEIGHTS = (328, 218, 183, 177, 154, 135, 74)
+
+CATEGORIES = ("Drink", "Extra", "Sandwich", "Breakfast", "Pizza", "Salad", "Dessert",
+              "Wrap", "Sauces", "Bread", "Condiment", "Veggies", "Cheese", "Snack")
+CATEGORY_WEIGHTS = (526, 246, 116, 84, 74, 52, 46, 35, 34, 15, 14, 10, 7, 2)
+
+WORDS = ("Bacon", "Cheese", "Chicken", "Double", "Spicy", "Crispy", "Grilled", "Classic",
+         "Deluxe", "Veggie", "Ranch", "BBQ", "Honey", "Mustard", "Angus", "Triple", "Mini",
+         "Supreme", "Garden", "Italian", "Mocha", "Vanilla", "Caramel", "Berry", "Iced")
+NOUNS = {
+    "Drink": ("Latte", "Shake", "Soda", "Tea", "Frappe", "Lemonade"),
+    "Sandwich": ("Burger", "Sandwich", "Melt", "Sub"),
+    "Pizza": ("Pizza", "Slice"),
+    "Salad": ("Salad", "Bowl"),
+    "Dessert": ("Cookie", "Pie", "Sundae", "Brownie"),
+    "Breakfast": ("Biscuit", "Muffin", "Oatmeal", "Burrito"),
+}
+
+# (propiedad en el TTL, mediana, dispersión lognormal, decimales); en orden de catalog.NUTRIENTS
+NUTRIENT_SHAPE = (
+    ("calories", 300.0, 0.8, 1),
+    ("protein", 10.0, 1.0, 1),
+    ("totalFat", 12.0, 1.0, 1),
+    ("carbs", 35.0, 0.8, 0),
+    ("sugars", 8.0, 1.2, 0),
+    ("saturatedFat", 4.0, 1.0, 1),
+    ("sodium", 500.0, 1.0, 0),
+    ("transFat", 0.2, 1.0, 1),
+    ("cholesterol", 30.0, 1.2, 0),
+    ("fiber", 2.0, 0.9, 0),
+)
+
+
+def schema_header(source=SOURCE_FILE):
+    """Prefijos, clases, marcas y sellos de `merged.ttl` (todo lo anterior al primer ítem)."""
+    lines = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(f"<{ITEM_PREFIX}"):
+                break
+            lines.append(line)
+    return "".join(lines)
+
+
+def _pick(rng, options, weights, n):
+    p = np.asarray(weights, dtype=np.float64)
+    return rng.choice(len(options), size=n, p=p / p.sum())
+
+
+def generate_columns(n, seed=0):
+    """Columnas del catálogo sintético: nombres, compañía, categoría, líquido y nutrientes (n×10)."""
+    rng = np.random.default_rng(seed)
+    company = _pick(rng, COMPANIES, COMPANY_WEIGHTS, n)
+    category = _pick(rng, CATEGORIES, CATEGORY_WEIGHTS, n)
+    liquid = np.asarray(CATEGORIES)[category] == "Drink"
+
+    scale = np.where(liquid, 0.4, 1.0)  # bebidas: valores por 100 mL
+    values = np.empty((n, len(NUTRIENT_SHAPE)))
+    for j, (_, median, sigma, decimals) in enumerate(NUTRIENT_SHAPE):
+        values[:, j] = np.round(median * scale * rng.lognormal(0.0, sigma, n), decimals)
+
+    w1 = rng.integers(0, len(WORDS), n)
+    w2 = rng.integers(0, len(WORDS), n)
+    noun = rng.integers(0, 6, n)
+    names = []
+    for i in range(n):
+        nouns = NOUNS.get(CATEGORIES[category[i]], ("Combo", "Side", "Bites"))
+        names.append(f"{WORDS[w1[i]]} {WORDS[w2[i]]} {nouns[noun[i] % len(nouns)]}")
+    return names, company, category, liquid, values
+
+
+def write_ttl(n, path, seed=0, source=SOURCE_FILE):
+    """Escribe un TTL sintético de `n` ítems (en streaming, sin armar el grafo en memoria)."""
+    names, company, category, liquid, values = generate_columns(n, seed)
+    props = [p for p, *_ in NUTRIENT_SHAPE]
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(schema_header(source))
+        for i in range(n):
+            lines = [f"<{ITEM_PREFIX}{i + 1}> a ex:MenuItem ;"]
+            lines.extend(f"    ex:{p} {v!r} ;" for p, v in zip(props, values[i].tolist()))
+            lines.append(f"    ex:category ex:{CATEGORIES[category[i]]} ;")
+            lines.append(f"    ex:company <http://dbpedia.org/resource/{COMPANIES[company[i]]}> ;")
+            lines.append(f"    ex:hasPhysicalState ex:{'Liquid' if liquid[i] else 'Solid'} ;")
+            name = names[i].replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'    ex:itemName "{name}" .\n\n')
+            out.write("\n".join(lines))
+    return path
+
+
+def generate_catalog(n, seed=0, source=SOURCE_FILE):
+    """`catalog.Catalog` sintético armado directo desde las columnas (sin rdflib).
+
+    Los sellos se calculan con el `SealEngine` y los umbrales de la cabecera,
+    igual que al cargar el grafo.
+    """
+    from catalog import NUTRIENT_INDEX, Catalog  # importa utils, que carga el grafo real
+
+    names, company, category, liquid, values = generate_columns(n, seed)
+    header = Graph().parse(data=schema_header(source), format="ttl")
+    definitions = read_seal_definitions(header)
+    uris = [f"{ITEM_PREFIX}{i + 1}" for i in range(n)]
+    seal_cols = [NUTRIENT_INDEX[s] for s in SEAL_INPUTS]
+    engine = SealEngine(definitions, uris, values[:, seal_cols], liquid, np.ones(n, dtype=bool))
+    labels = [d.label for d in definitions]
+
+    items = []
+    for i in range(n):
+        row = values[i].tolist()
+        items.append({
+            "uri": uris[i],
+            "name": names[i],
+            "company": COMPANIES[company[i]].replace("_", " "),
+            "calories": row[0], "protein": row[1], "fat": row[2], "carbs": row[3],
+            "sugars": row[4], "saturatedFat": row[5], "sodium": row[6],
+            "category": CATEGORIES[category[i]],
+            "state": "liquid" if liquid[i] else "solid",
+            "seals": [labels[c] for c in np.flatnonzero(engine.mask[i])],
+        })
+    return Catalog(f"synthetic-{n}-{seed}", items, values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un TTL sintético con la forma de merged.ttl")
+    parser.add_argument("items", type=int)
+    parser.add_argument("-o", "--output", type=Path, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_ttl(args.items, args.output, args.seed)
+    print(f"{args.items} ítems escritos en {args.output}", file=sys.stderr)
@@ -1,19 +1,43 @@
-from rdflib import Graph, Namespace
+from rdflib import Dataset, Graph, Namespace, URIRef
 from rdflib.namespace import SKOS, XSD,RDF
-from rdflib.plugins.sparql import prepareQuery
 from pathlib import Path
+import hashlib
 import logging
-import numpy as np
+import os
+import shutil
+import time
+import metrics
+import sqlite_store
+from similarity import SIMILARITY_FILE, SimilarityTable
+from snapshot import load_graph, save_graph
+from seals import (SealEngine, apply_changes, item_inputs,
+                   read_seal_definitions, sync_definitions)
 logger = logging.getLogger(__name__)
 
 # --- Paths ---
 BASE_DIR = Path(__file__).resolve().parent
 ORIGINAL_FILE = BASE_DIR / "utils/merged.ttl"
-CACHE_FILE = BASE_DIR / "utils/menu_with_seals.ttl"
+ONTOLOGY_FILE = BASE_DIR.parent / "nutritional_ontology.ttl"
+SEALS_STATE_FILE = BASE_DIR / "utils/menu_with_seals.state.npz"
+# snapshots y N-Quads de cada grafo con nombre
+GRAPHS_DIR = BASE_DIR / "utils/graphs"
+MERGED_NQUADS = BASE_DIR / "utils/merged.nq"
+
+# "sqlite": abrir el store compartido de sqlite_store.py en vez de cargar el grafo en memoria
+GRAPH_STORE = os.environ.get("GRAPH_STORE", "memory")
 
 # --- Namespaces ---
 EX = Namespace("http://example.com/menu#")
 
+# --- Grafos con nombre del Dataset `g` (las consultas ven la unión) ---
+GRAPH_BASE = "http://example.com/menu/graph/"
+GRAPH_ONTOLOGY = URIRef(GRAPH_BASE + "ontology")
+GRAPH_DATA = URIRef(GRAPH_BASE + "data")
+GRAPH_SEALS = URIRef(GRAPH_BASE + "seals")
+GRAPH_SIMILARITY = URIRef(GRAPH_BASE + "similarity")
+GRAPHS = {"ontology": GRAPH_ONTOLOGY, "data": GRAPH_DATA, "seals": GRAPH_SEALS, "similarity": GRAPH_SIMILARITY}
+SOURCE_FILES = {"ontology": ONTOLOGY_FILE, "data": ORIGINAL_FILE}
+
 # --- Helper functions ---
 def get_local_name(uri):
     return str(uri).split("/")[-1].replace("_", " ") if uri else ""
@@ -37,149 +61,218 @@ def safe_float(lit):
     except:
         return 0.0
 
-# --- Load graph with cache ---
-g = Graph()
-g.bind("ex", EX)
-g.bind("skos", SKOS)
-g.bind("xsd", XSD)
-
-if CACHE_FILE.exists():
-    logger.info(f"Cargando grafo desde cache: {CACHE_FILE}")
-    g.parse(CACHE_FILE, format="ttl")
-else:
-    logger.info("Cache no encontrada. Cargando grafo original y calculando sellos...")
-    g.parse(ORIGINAL_FILE, format="ttl")
-
-    # --- SPARQL dinámico para calcular sellos ---
-    query_all = """
-    PREFIX ex: <http://example.com/menu#>
-    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-    PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
-
-    SELECT ?item ?seal ?sealLabel ?nutrient ?thresholdSolid ?thresholdLiquid ?state ?calories ?sugars ?saturatedFat ?sodium
-    WHERE {
-        ?item a ex:MenuItem ;
-              ex:hasPhysicalState ?stateRaw ;
-              ex:calories ?calories ;
-              ex:sugars ?sugars ;
-              ex:saturatedFat ?saturatedFat ;
-              ex:sodium ?sodium .
-
-        ?seal a ex:NutritionalSeal ;
-              skos:prefLabel ?sealLabel ;
-              ex:nutrient ?nutrient ;
-              ex:thresholdSolid ?thresholdSolid ;
-              ex:thresholdLiquid ?thresholdLiquid .
-
-        BIND(IF(?stateRaw = ex:Liquid, "liquid", "solid") AS ?state)
-
-        BIND(
-            IF(?nutrient = "calories", ?calories,
-            IF(?nutrient = "sugars", ?sugars,
-            IF(?nutrient = "saturatedFat", ?saturatedFat,
-            IF(?nutrient = "sodium", ?sodium, 0)))) AS ?nutrientValue
-        )
-
-        FILTER(
-            (?state = "solid"  && xsd:float(?nutrientValue) >= xsd:float(?thresholdSolid)) ||
-            (?state = "liquid" && xsd:float(?nutrientValue) >= xsd:float(?thresholdLiquid))
-        )
-    }
+def file_hash(path):
+    if not path.exists():
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+# --- Grafos con nombre ---
+fuentes_cargadas = {}  # hashes_fuentes() del Dataset `g` vigente
+motor_sellos = None  # SealEngine del Dataset `g` en memoria (lo usa catalog_updates)
+
+
+def nuevo_dataset():
+    ds = Dataset(default_union=True)
+    ds.bind("ex", EX)
+    ds.bind("skos", SKOS)
+    ds.bind("xsd", XSD)
+    return ds
+
+
+def hashes_fuentes():
+    """Hashes de los archivos de los que dependen los grafos (y el estado de los sellos)."""
+    return {"merged": file_hash(ORIGINAL_FILE), "ontology": file_hash(ONTOLOGY_FILE)}
+
+
+def cargar_parte(ds, nombre, source_hash):
+    """Carga la ontología o los datos en su grafo con nombre, desde el snapshot si está al día."""
+    graph = ds.graph(GRAPHS[nombre])
+    path = SOURCE_FILES[nombre]
+    if source_hash is None:
+        logger.warning(f"No existe {path}; el grafo {nombre} queda vacío")
+        return graph
+
+    t0 = time.perf_counter()
+    directory = GRAPHS_DIR / f"{nombre}.snapshot"
+    with metrics.stage("graph_load_snapshot"):
+        loaded = load_graph(source_hash, directory, graph)
+    if loaded is not None:
+        logger.info(f"Grafo {nombre} cargado desde snapshot en {time.perf_counter() - t0:.3f} s")
+        return graph
+
+    with metrics.stage("graph_parse_turtle"):
+        graph.parse(path, format="ttl")
+    logger.info(f"Grafo {nombre} cargado desde {path.name} en {time.perf_counter() - t0:.3f} s")
+    try:
+        save_graph(graph, source_hash, directory)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el snapshot del grafo {nombre}: {e}")
+    return graph
+
+
+def cargar_grafo(recalcular=False):
+    """Arma el Dataset: ontología, datos y sellos, cada uno en su grafo con nombre.
+
+    Con GRAPH_STORE=sqlite se abre el store compartido de `sqlite_store.py`
+    si fue armado con las mismas fuentes. Si no, la ontología y los datos se
+    cargan por separado (cada uno desde su snapshot si su archivo no cambió) y
+    los sellos se derivan del estado del motor guardado en SEALS_STATE_FILE:
+    si los hashes de ORIGINAL_FILE y ONTOLOGY_FILE coinciden no se evalúa
+    nada; si cambió la ontología se recalculan los sellos cuyos umbrales
+    cambiaron, y si cambiaron los datos, sólo los ítems nuevos, cambiados o
+    eliminados. Todo se recalcula sólo si falta el estado o no se puede leer.
+    """
+    global fuentes_cargadas, motor_sellos
+    sources = hashes_fuentes()
+    if GRAPH_STORE == "sqlite" and not recalcular:
+        t0 = time.perf_counter()
+        ds = sqlite_store.open_dataset(sqlite_store.STORE_FILE, sources)
+        if ds is not None:
+            logger.info(f"Grafo abierto desde {sqlite_store.STORE_FILE} en {time.perf_counter() - t0:.3f} s")
+            fuentes_cargadas = sources
+            motor_sellos = None
+            return ds
+
+    ds = nuevo_dataset()
+    GRAPHS_DIR.mkdir(parents=True, exist_ok=True)
+
+    ontology = cargar_parte(ds, "ontology", sources["ontology"])
+    data = cargar_parte(ds, "data", sources["merged"])
+    seals = ds.graph(GRAPH_SEALS)
+
+    engine = None if recalcular else SealEngine.load(SEALS_STATE_FILE)
+    if engine is None:
+        logger.info("Estado de sellos no encontrado o ilegible. Calculando sellos...")
+        with metrics.stage("seal_materialization"):
+            engine = SealEngine(read_seal_definitions(data, ontology), *item_inputs(data))
+    else:
+        with metrics.stage("seal_materialization"):
+            if engine.sources.get("ontology") != sources["ontology"]:
+                logger.info("Cambiaron los umbrales de la ontología. Recalculando sólo esos sellos...")
+                engine.set_definitions(read_seal_definitions(data, ontology))
+            if engine.sources.get("merged") != sources["merged"]:
+                logger.info("Cambiaron los datos. Recalculando sólo los ítems afectados...")
+                engine.sync_items(*item_inputs(data))
+
+    with metrics.stage("seal_materialization"):
+        apply_changes(seals, [(item, seal, True) for item, seal in engine.seal_triples()])
+    # los umbrales de los datos quedan iguales a los vigentes (los de la ontología)
+    sync_definitions(data, engine.definitions)
+
+    # vecinos materializados por similarity.py, si corresponden a estas fuentes
+    table = SimilarityTable.load(SIMILARITY_FILE)
+    if table is not None and table.sources == sources:
+        with metrics.stage("similarity_graph"):
+            table.add_to(ds.graph(GRAPH_SIMILARITY))
+
+    if engine.sources != sources:
+        engine.sources = sources
+        engine.save(SEALS_STATE_FILE)
+        logger.info(f"Estado de sellos guardado en {SEALS_STATE_FILE}")
+    fuentes_cargadas = sources
+    motor_sellos = engine
+    return ds
+
+
+def recargar_grafo(recalcular=False):
+    """Reemplaza el Dataset global `g` (lo usa el catálogo cuando cambian las fuentes).
+
+    Las partes cuyo archivo no cambió se vuelven a leer desde su snapshot.
     """
-    prepared_query = prepareQuery(query_all, initNs={"ex": EX, "skos": SKOS, "xsd": XSD})
+    global g
+    with metrics.stage("graph_load"):
+        g = cargar_grafo(recalcular=recalcular)
+    return g
+
+
+# --- Exportación N-Quads ---
+def _nquads_key(nombre, sources):
+    if nombre == "ontology":
+        return f"ontology={sources['ontology']}"
+    # los datos llevan los umbrales sincronizados y los sellos dependen de ambos archivos
+    return f"merged={sources['merged']} ontology={sources['ontology']}"
+
+
+def escribir_nquads(graph, path, key):
+    """N-Quads de un grafo con nombre: las líneas N-Triples + el IRI del grafo."""
+    suffix = f" <{graph.identifier}> .\n"
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as out:
+        out.write(f"# {key}\n")
+        for line in graph.serialize(format="nt").splitlines():
+            if line.endswith(" ."):
+                out.write(line[:-2] + suffix)
+    os.replace(tmp, path)
 
-    # --- Agregar triples hasNutritionalSeal ---
-    for row in g.query(prepared_query):
-        g.add((row.item, EX.hasNutritionalSeal, row.seal))
 
-    # --- Guardar cache ---
-    g.serialize(destination=CACHE_FILE, format="ttl")
-    logger.info(f"Grafo con sellos guardado en cache: {CACHE_FILE}")
+def _primera_linea(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.readline().rstrip("\n")
+    except FileNotFoundError:
+        return None
+
 
+def exportar_nquads(destino=MERGED_NQUADS, ds=None):
+    """Escribe el Dataset completo en N-Quads concatenando un archivo por grafo.
 
+    Cada grafo se serializa sólo si su archivo en GRAPHS_DIR no corresponde a
+    las fuentes cargadas; el resto se copia tal cual.
+    """
+    ds = ds if ds is not None else g
+    tmp = destino.with_name(destino.name + ".tmp")
+    with open(tmp, "wb") as out:
+        for nombre, ident in GRAPHS.items():
+            path = GRAPHS_DIR / f"{nombre}.nq"
+            key = _nquads_key(nombre, fuentes_cargadas)
+            if _primera_linea(path) != f"# {key}":
+                escribir_nquads(ds.graph(ident), path, key)
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, out, 1 << 20)
+    os.replace(tmp, destino)
+    return destino
+
+
+with metrics.stage("graph_load"):
+    g = cargar_grafo()
 
 # --- Función para obtener items con sellos ---
 def get_items_sparql():
-    items_map = {}
-
-    query = """
-    PREFIX ex: <http://example.com/menu#>
-    PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
-
-    SELECT ?item ?name ?company ?calories ?protein ?fat ?carbs ?sugars ?saturatedFat ?sodium ?category ?state ?seal ?sealLabel
-    WHERE {
-        ?item a ex:MenuItem ;
-              ex:itemName ?name ;
-              ex:company ?company ;
-              ex:calories ?calories ;
-              ex:protein ?protein ;
-              ex:totalFat ?fat ;
-              ex:carbs ?carbs ;
-              ex:sugars ?sugars ;
-              ex:saturatedFat ?saturatedFat ;
-              ex:sodium ?sodium .
-
-        OPTIONAL { ?item ex:category ?category }
-        OPTIONAL { ?item ex:hasPhysicalState ?stateRaw }
-
-        BIND(IF(?stateRaw = ex:Liquid, "liquid", "solid") AS ?state)
-
-        OPTIONAL {
-            ?item ex:hasNutritionalSeal ?seal .
-            ?seal skos:prefLabel ?sealLabel .
-        }
-    }
+    """Devuelve los ítems del catálogo materializado (no volver a modificar los dicts).
+
+    Es una secuencia de sólo lectura: una lista, o con SHARED_CATALOG un
+    `shared_catalog.LazyItems` que arma un dict nuevo en cada acceso.
     """
-    prepared_query = prepareQuery(query, initNs={"ex": EX, "skos": SKOS})
-
-    for row in g.query(prepared_query):
-        item_uri = str(row.item)
-        name = str(row.name)
-
-        if item_uri not in items_map:
-            items_map[item_uri] = {
-                "uri": item_uri,
-                "name": name,
-                "company": get_local_name(row.company),
-                "calories": safe_float(row.calories),
-                "protein": safe_float(row.protein),
-                "fat": safe_float(row.fat),
-                "carbs": safe_float(row.carbs),
-                "sugars": safe_float(row.sugars),
-                "saturatedFat": safe_float(row.saturatedFat),
-                "sodium": safe_float(row.sodium),
-                "category": clean_category(row.category) if row.category else "",
-                "state": str(row.state) if row.state else "solid",
-                "seals": []
-            }
-
-        if row.sealLabel:
-            seal_label = str(row.sealLabel)
-            if seal_label not in items_map[item_uri]["seals"]:
-                items_map[item_uri]["seals"].append(seal_label)
-
-    return list(items_map.values())
+    from catalog import get_catalog
+    return get_catalog().items
 
 
 # --- Recommender ---
-def platos_similares(nombre, k=6):
-    items = get_items_sparql()
-    base = next((p for p in items if p["name"].lower() == nombre.lower()), None)
-    if not base:
+def platos_similares(nombre, k=6, metric="euclidean", nutrients=None, weights=None,
+                     category=None, state=None, company=None):
+    from recommender import get_recommender
+    rec = get_recommender()
+    idx = rec.catalog.index_of(nombre)
+    if idx is None:
         return []
-
-    X_base = np.array([base["calories"], base["protein"], base["fat"], base["carbs"]])
-
-    sims = []
-    for p in items:
-        if p["name"] == base["name"]:
-            continue
-        X = np.array([p["calories"], p["protein"], p["fat"], p["carbs"]])
-        dist = np.linalg.norm(X - X_base)
-        sims.append((dist, p))
-
-    sims.sort(key=lambda x: x[0])
-    return [s[1] for s in sims[:k]]
+    return rec.similares(idx, k=k, metric=metric, nutrients=nutrients, weights=weights,
+                         category=category, state=state, company=company)
+
+
+def platos_similares_lote(nombres, k=6, metric="euclidean", nutrients=None, weights=None,
+                          category=None, state=None, company=None):
+    """`platos_similares` para varios nombres; None en los que no existen."""
+    from recommender import get_recommender
+    rec = get_recommender()
+    found = [rec.catalog.index_of(n) for n in nombres]
+    rows = [i for i in found if i is not None]
+    similares = iter(rec.similares_lote(rows, k=k, metric=metric, nutrients=nutrients, weights=weights,
+                                        category=category, state=state, company=company))
+    return [next(similares) if i is not None else None for i in found]
 
 def ttl_to_dict(ttl_file):
     g = Graph()
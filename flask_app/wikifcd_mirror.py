@@ -0,0 +1,246 @@
+"""
+Espejo local de los nutrientes de WikiFCD.
+
+Guarda en `utils/wikifcd_mirror.npz` las declaraciones P6/P7/P8/P11/P18/P86/
+P89/P99/P104/P271 y las etiquetas en inglés de cada alimento (un QID por
+fila, NaN si falta la propiedad). `querys.fetch_foods_with_ttl_and_json`
+responde las consultas de caja "±TOLERANCES" con un KD-tree sobre estas filas
+y sólo consulta el endpoint remoto si no hay espejo.
+
+Sincronización:
+
+    python3 wikifcd_mirror.py           # incremental (usa los QIDs guardados)
+    python3 wikifcd_mirror.py --full    # exportación completa
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from kdtree import KDTree
+
+logger = logging.getLogger(__name__)
+
+MIRROR_FILE = Path(__file__).resolve().parent / "utils/wikifcd_mirror.npz"
+
+ENTITY = "https://wikifcd.wikibase.cloud/entity/"
+
+# Campo (nombres de querys.TOLERANCES) → propiedad de WikiFCD
+WIKI_PROPS = {
+    "calories": "P6", "protein": "P7", "totalfat": "P8", "fiber": "P11",
+    "sodium": "P18", "fatsaturated": "P86", "carbs": "P89",
+    "cholesterol": "P99", "sugar": "P104", "fattrans": "P271",
+}
+FIELDS = tuple(WIKI_PROPS)
+
+PREFIXES = """
+PREFIX wb: <https://wikifcd.wikibase.cloud/entity/>
+PREFIX p: <https://wikifcd.wikibase.cloud/prop/>
+PREFIX ps: <https://wikifcd.wikibase.cloud/prop/statement/>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+PREFIX schema: <http://schema.org/>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+"""
+
+PAGE_SIZE = 5000
+BATCH_SIZE = 200
+
+
+class WikiFCDMirror:
+    """Filas (QID, nutrientes, etiqueta) con un índice de rangos en memoria."""
+
+    def __init__(self, qids, values, labels, synced_at=""):
+        self.qids = list(qids)
+        self.values = np.asarray(values, dtype=np.float64).reshape(-1, len(FIELDS))
+        self.labels = list(labels)
+        self.synced_at = synced_at
+        # la consulta remota exige las 10 propiedades, así que sólo se indexan filas completas
+        self.complete = np.flatnonzero(~np.isnan(self.values).any(axis=1))
+        self.tree = KDTree(self.values[self.complete])
+
+    def __len__(self):
+        return len(self.qids)
+
+    def box(self, reference_values, tolerances):
+        """Filas dentro de ±tolerancia para cada campo presente en `reference_values`."""
+        lower = np.full(len(FIELDS), -np.inf)
+        upper = np.full(len(FIELDS), np.inf)
+        for j, key in enumerate(FIELDS):
+            if key in reference_values:
+                tol = tolerances.get(key, 0)
+                lower[j] = reference_values[key] - tol
+                upper[j] = reference_values[key] + tol
+        return self.complete[self.tree.box(lower, upper)]
+
+    def similar_rows(self, reference_values, tolerances, limit=100, sample_size=6, lang="en"):
+        """Muestra aleatoria con el mismo formato que las filas de la consulta remota."""
+        hits = self.box(reference_values, tolerances)[:limit]
+        sample = random.sample(list(hits), min(sample_size, len(hits)))
+        rows = []
+        for i in sample:
+            row = dict(zip(FIELDS, self.values[i].tolist()))
+            row["food"] = ENTITY + self.qids[i]
+            row["foodLabel"] = (self.labels[i] if lang == "en" else "") or self.qids[i]
+            rows.append(row)
+        return rows
+
+    # --- Persistencia ---
+    def save(self, path=MIRROR_FILE):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                qids=np.array(self.qids, dtype=str),
+                values=self.values,
+                labels=np.array(self.labels, dtype=str),
+                synced_at=np.array(self.synced_at),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=MIRROR_FILE):
+        with np.load(path) as data:
+            return cls(data["qids"].tolist(), data["values"], data["labels"].tolist(), str(data["synced_at"]))
+
+
+_lock = threading.Lock()
+_cache = {"mtime": None, "mirror": None}
+
+
+def get_mirror(path=MIRROR_FILE):
+    """Espejo cargado (se recarga si el archivo cambia), o None si no existe."""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _cache["mtime"] == mtime:
+        return _cache["mirror"]
+    with _lock:
+        if _cache["mtime"] != mtime:
+            _cache.update(mirror=WikiFCDMirror.load(path), mtime=mtime)
+        return _cache["mirror"]
+
+
+# --- Sincronización ---
+def _qid(uri):
+    return uri.rsplit("/", 1)[-1]
+
+
+def _paged(client, query):
+    """Ejecuta `query` (ordenada) página por página."""
+    offset = 0
+    while True:
+        rows = client.select(f"{query}\nLIMIT {PAGE_SIZE} OFFSET {offset}", "mirror_export")
+        yield from rows
+        if len(rows) < PAGE_SIZE:
+            return
+        offset += PAGE_SIZE
+
+
+def _export_all(client):
+    data, labels = {}, {}
+    for j, (field, prop) in enumerate(WIKI_PROPS.items()):
+        query = f"""{PREFIXES}
+        SELECT ?food ?v WHERE {{ ?food p:{prop} ?s . ?s ps:{prop} ?v . }} ORDER BY ?food"""
+        for r in _paged(client, query):
+            row = data.setdefault(_qid(r["food"]["value"]), [np.nan] * len(FIELDS))
+            if np.isnan(row[j]):
+                row[j] = float(r["v"]["value"])
+        logger.info(f"{prop} ({field}): {len(data)} alimentos acumulados")
+
+    query = f"""{PREFIXES}
+    SELECT ?food ?label WHERE {{
+        ?food p:P6 [] ; rdfs:label ?label . FILTER(LANG(?label) = "en")
+    }} ORDER BY ?food"""
+    for r in _paged(client, query):
+        labels[_qid(r["food"]["value"])] = r["label"]["value"]
+    return data, labels
+
+
+def _fetch_entities(client, qids):
+    """Declaraciones y etiquetas de los QIDs dados, en lotes con VALUES."""
+    pairs = " ".join(f"(p:{p} ps:{p} \"{f}\")" for f, p in WIKI_PROPS.items())
+    data, labels = {}, {}
+    for start in range(0, len(qids), BATCH_SIZE):
+        batch = " ".join(f"wb:{q}" for q in qids[start:start + BATCH_SIZE])
+        query = f"""{PREFIXES}
+        SELECT ?food ?field ?v ?label WHERE {{
+            VALUES ?food {{ {batch} }}
+            {{ VALUES (?prop ?ps ?field) {{ {pairs} }} ?food ?prop ?s . ?s ?ps ?v . }}
+            UNION
+            {{ ?food rdfs:label ?label . FILTER(LANG(?label) = "en") }}
+        }}"""
+        for r in client.select(query, "mirror_entities"):
+            qid = _qid(r["food"]["value"])
+            row = data.setdefault(qid, [np.nan] * len(FIELDS))
+            if "label" in r:
+                labels[qid] = r["label"]["value"]
+            elif "field" in r:
+                j = FIELDS.index(r["field"]["value"])
+                if np.isnan(row[j]):
+                    row[j] = float(r["v"]["value"])
+    return data, labels
+
+
+def _modified_since(client, timestamp):
+    query = f"""{PREFIXES}
+    SELECT ?food WHERE {{
+        ?food p:P6 [] ; schema:dateModified ?m .
+        FILTER(?m > "{timestamp}"^^xsd:dateTime)
+    }} ORDER BY ?food"""
+    return [_qid(r["food"]["value"]) for r in _paged(client, query)]
+
+
+def sync(client, path=MIRROR_FILE, full=False):
+    """Exporta o actualiza el espejo y lo guarda en `path`."""
+    from querys import WikiFCDError
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    previous = WikiFCDMirror.load(path) if path.exists() and not full else None
+
+    if previous is None:
+        data, labels = _export_all(client)
+        mirror = WikiFCDMirror(list(data), list(data.values()), [labels.get(q, "") for q in data], now)
+    else:
+        # refresco incremental: entidades modificadas desde la última sincronización;
+        # si el endpoint no expone schema:dateModified se refrescan todos los QIDs guardados
+        try:
+            changed = _modified_since(client, previous.synced_at)
+        except WikiFCDError as e:
+            logger.warning(f"No se pudo consultar dateModified ({e}); refrescando QIDs guardados")
+            changed = previous.qids
+        data, labels = _fetch_entities(client, changed)
+
+        qids, values, names = list(previous.qids), previous.values.copy(), list(previous.labels)
+        row_of = {q: i for i, q in enumerate(qids)}
+        new = [q for q in data if q not in row_of]
+        if new:
+            values = np.vstack([values, np.full((len(new), len(FIELDS)), np.nan)])
+            for q in new:
+                row_of[q] = len(qids)
+                qids.append(q)
+                names.append("")
+        for q, row in data.items():
+            values[row_of[q]] = row
+            names[row_of[q]] = labels.get(q, names[row_of[q]])
+        mirror = WikiFCDMirror(qids, values, names, now)
+        logger.info(f"{len(data)} alimentos actualizados ({len(new)} nuevos)")
+
+    mirror.save(path)
+    logger.info(f"Espejo WikiFCD guardado en {path}: {len(mirror)} alimentos, {len(mirror.complete)} completos")
+    return mirror
+
+
+if __name__ == "__main__":
+    from querys import WikiFCDClient
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Sincroniza el espejo local de WikiFCD")
+    parser.add_argument("--full", action="store_true", help="exportación completa en vez de incremental")
+    parser.add_argument("--output", type=Path, default=MIRROR_FILE)
+    args = parser.parse_args()
+    sync(WikiFCDClient(), args.output, full=args.full)
@@ -0,0 +1,68 @@
+"""
+Limpieza de texto compartida por preprocessing_others.py y preprocessing_subway.py.
+
+`limpiar_texto(df)` quita los símbolos de marca (®, ™, ℠, ©), colapsa los
+espacios repetidos y recorta los extremos con operaciones vectorizadas de
+pandas (`str.translate` + un único `str.replace`), sólo sobre las columnas de
+texto; las columnas numéricas no se tocan.
+
+`limpiar_csv(...)` procesa un CSV de cualquier tamaño por bloques, con memoria
+acotada, e informa el rendimiento en filas/s.
+"""
+import re
+import time
+
+import pandas as pd
+
+CHUNKSIZE = 100000
+
+# Símbolos de marca registrada y otros caracteres especiales → se eliminan
+MARCAS = str.maketrans("", "", "®™℠©")
+ESPACIOS = r"\s{2,}"
+
+
+def limpiar_marcas(texto):
+    """
+    Elimina símbolos de marca registrada y caracteres especiales de un texto.
+
+    Versión de a un valor de `limpiar_texto`; si no es una cadena se devuelve
+    tal cual.
+
+    >>> limpiar_marcas("Pizza™  Hut")
+    'Pizza Hut'
+    """
+    if isinstance(texto, str):
+        return re.sub(ESPACIOS, " ", texto.translate(MARCAS)).strip()
+    return texto
+
+
+def _limpiar_serie(s):
+    limpia = s.str.translate(MARCAS).str.replace(ESPACIOS, " ", regex=True).str.strip()
+    # los valores que no son cadenas (NaN, números en columnas mixtas) quedan igual
+    return limpia.where(limpia.notna(), s)
+
+
+def limpiar_texto(df):
+    """Aplica la limpieza a todas las columnas de texto del DataFrame."""
+    df = df.copy()
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        df[col] = _limpiar_serie(df[col])
+    return df
+
+
+def limpiar_csv(entrada, salida, preparar, chunksize=CHUNKSIZE, **read_csv_args):
+    """Lee `entrada` por bloques, aplica `preparar` y escribe `salida`.
+
+    Devuelve (filas, segundos). Los valores se leen como texto (`dtype=object`)
+    para que cada bloque se escriba igual sin importar cómo se partió el archivo.
+    """
+    t0 = time.perf_counter()
+    filas = 0
+    read_csv_args.setdefault("dtype", object)
+    with open(salida, "w", encoding="utf-8-sig", newline="") as out:
+        for bloque in pd.read_csv(entrada, chunksize=chunksize, **read_csv_args):
+            preparar(bloque).to_csv(out, index=False, header=filas == 0)
+            filas += len(bloque)
+    segundos = time.perf_counter() - t0
+    print(f"{filas} filas → {salida} en {segundos:.2f} s ({filas / max(segundos, 1e-9):.0f} filas/s)")
+    return filas, segundos
@@ -1,36 +1,94 @@
 # python
+"""
+Merge the ontology and the menu data.
+
+Each source is parsed once into its own named graph and written as N-Quads
+(`<name>.nq`, skipped when the source did not change). `merged.nq` is the
+streaming concatenation of those files and `merged.ttl` the concatenation of
+the Turtle sources, so the merged graph is never re-serialized as a whole.
+"""
+import hashlib
+import os
+import shutil
 from pathlib import Path
-from rdflib import Graph, Literal
-import re
+
+from rdflib import Graph, URIRef
 
 BASE = Path(__file__).resolve().parent
-files = [
-    BASE / "nutritional_ontology.ttl",
-    BASE / "combined_menu.ttl",
-]
-
-g = Graph()
-for p in files:
-    if p.exists():
+GRAPH_BASE = "http://example.com/menu/graph/"
+files = {
+    "ontology": BASE / "nutritional_ontology.ttl",
+    "data": BASE / "combined_menu.ttl",
+}
+merged_ttl = BASE / "merged.ttl"
+merged_nq = BASE / "merged.nq"
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def first_line(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.readline().rstrip("\n")
+    except FileNotFoundError:
+        return None
+
+
+def write_nquads(source, graph_iri, path):
+    """Parse `source` and write it as N-Quads in `graph_iri` (first line: source hash)."""
+    key = f"# {sha256_file(source)}"
+    if first_line(path) == key:
+        print(f"Unchanged: `{source}`")
+        return
+    g = Graph(identifier=URIRef(graph_iri))
+    g.parse(source.as_posix(), format="turtle")
+    suffix = f" <{graph_iri}> .\n"
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as out:
+        out.write(key + "\n")
+        for line in g.serialize(format="nt").splitlines():
+            if line.endswith(" ."):
+                out.write(line[:-2] + suffix)
+    os.replace(tmp, path)
+    print(f"Parsed: `{source}` ({len(g)} triples) → `{path.name}`")
+
+
+def concat(paths, destination):
+    tmp = destination.with_name(destination.name + ".tmp")
+    with open(tmp, "wb") as out:
+        for p in paths:
+            with open(p, "rb") as f:
+                shutil.copyfileobj(f, out, 1 << 20)
+            out.write(b"\n")
+    os.replace(tmp, destination)
+
+
+def main():
+    parts = []
+    for name, source in files.items():
+        if not source.exists():
+            print(f"Missing: `{source}`")
+            continue
+        path = BASE / f"{name}.nq"
         try:
-            g.parse(p.as_posix(), format="turtle")
-            print(f"Parsed: `{p}` ({len(g)} triples)")
+            write_nquads(source, GRAPH_BASE + name, path)
         except Exception as e:
-            print(f"Failed to parse `{p}`:", e)
-    else:
-        print(f"Missing: `{p}`")
-
-print(f"{len(g)} triples in graph")
-
-# write merged Turtle
-merged_path = BASE / "merged.ttl"
-g.serialize(destination=merged_path.as_posix(), format="turtle", encoding="utf-8")
-print(f"Wrote merged TTL to `{merged_path}`\n")
-
-# print a short Turtle preview
-ttl = g.serialize(format="turtle")
-if isinstance(ttl, bytes):
-    ttl = ttl.decode("utf-8")
-print("Turtle preview (first 1200 chars):\n")
-print(ttl[:1200].replace("\n", "\\n"))
-print("\n---\n")
\ No newline at end of file
+            print(f"Failed to parse `{source}`:", e)
+            continue
+        parts.append((source, path))
+
+    concat([p for _, p in parts], merged_nq)
+    print(f"Wrote merged N-Quads to `{merged_nq}`")
+    # Turtle allows repeated @prefix, so the sources can be concatenated as is
+    concat([s for s, _ in parts], merged_ttl)
+    print(f"Wrote merged TTL to `{merged_ttl}`")
+
+
+if __name__ == "__main__":
+    main()
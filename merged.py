@@ -13,20 +13,8 @@ Este script:
 6. Guarda el DataFrame resultante en un nuevo CSV.
 """
 
-# --- Leer los CSV limpios ---
-df1 = pd.read_csv("FastFoodNutritionMenuV3_clean.csv")
-df2 = pd.read_csv("exported_data_clean.csv")
-
-# --- Normalizar nombres de columnas ---
-# Eliminar espacios al inicio/final y caracteres invisibles
-df1.columns = df1.columns.str.strip()
-df2.columns = df2.columns.str.strip()
-
-# --- Asegurar que df2 tenga las mismas columnas y en el mismo orden que df1 ---
-df2 = df2[df1.columns]
-
-# --- Unir los DataFrames verticalmente ---
-df_combined = pd.concat([df1, df2], ignore_index=True)
+INPUTS = ("FastFoodNutritionMenuV3_clean.csv", "exported_data_clean.csv")
+OUTPUT = "combined_menu.csv"
 
 # --- Columnas numéricas que pueden contener valores nulos ---
 cols_numericas = [
@@ -35,9 +23,32 @@ cols_numericas = [
     'Sugars (g)', 'Protein (g)'
 ]
 
-# --- Rellenar valores nulos con 0 solo para filas donde la categoría sea 'drink' ---
-df_combined.loc[df_combined['Category'].str.lower() == 'drink', cols_numericas] = \
-    df_combined.loc[df_combined['Category'].str.lower() == 'drink', cols_numericas].fillna(0)
 
-# --- Guardar el DataFrame combinado en un nuevo archivo CSV ---
-df_combined.to_csv("combined_menu.csv", index=False, encoding='utf-8-sig')
+def alinear(df, columnas):
+    """Deja `df` con las columnas `columnas` (las del primer CSV) en ese orden."""
+    # Eliminar espacios al inicio/final y caracteres invisibles
+    df.columns = df.columns.str.strip()
+    return df[list(columnas)]
+
+
+def rellenar_bebidas(df):
+    """Rellena con 0 los nutrientes nulos sólo en las filas de categoría 'drink'."""
+    bebidas = df['Category'].str.lower() == 'drink'
+    df.loc[bebidas, cols_numericas] = df.loc[bebidas, cols_numericas].fillna(0)
+    return df
+
+
+if __name__ == "__main__":
+    # --- Leer los CSV limpios ---
+    df1 = pd.read_csv(INPUTS[0])
+    df2 = pd.read_csv(INPUTS[1])
+
+    # --- Normalizar nombres de columnas y asegurar el mismo orden que df1 ---
+    df1.columns = df1.columns.str.strip()
+    df2 = alinear(df2, df1.columns)
+
+    # --- Unir los DataFrames verticalmente ---
+    df_combined = rellenar_bebidas(pd.concat([df1, df2], ignore_index=True))
+
+    # --- Guardar el DataFrame combinado en un nuevo archivo CSV ---
+    df_combined.to_csv(OUTPUT, index=False, encoding='utf-8-sig')
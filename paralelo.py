@@ -0,0 +1,26 @@
+"""
+Map ordenado sobre un pool de procesos, compartido por los scripts del ETL
+(rdf_mapper.py, fix_nutritional_values.py, pipeline.py).
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def ordered_map(fn, jobs, workers):
+    """Resultados de fn(*job) en el orden de `jobs`, con un pool de procesos acotado.
+
+    Con `workers <= 1` corre en el proceso actual. Se mantienen a lo sumo
+    2 × workers bloques en vuelo, así que la memoria no crece con la entrada.
+    """
+    if workers <= 1:
+        for job in jobs:
+            yield fn(*job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.submit(fn, *job))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,207 @@
+"""
+Pipeline ETL en un solo comando: CSV limpios → combined_menu_fixed.ttl → merged.ttl.
+
+Reemplaza la cadena merged.py → rename.py → fixed.py → tarql (menu_mapping.sparql)
+→ fix_nutritional_values.py → merge_ttl.py. Las filas pasan por todas las
+etapas en memoria, en bloques de `--chunksize` filas, sin escribir los CSV
+intermedios; el mapeo a RDF es el de `rdf_mapper.py` y los bloques se
+convierten en un pool de procesos (`--workers`).
+
+Las etapas se saltan por hash de contenido (guardado en `.pipeline_cache/`):
+
+- si no cambió ningún CSV de entrada ni el código de las etapas, no se hace nada;
+- si cambió, cada bloque se identifica por el hash de sus filas y sólo se
+  vuelven a convertir a Turtle los bloques modificados;
+- merged.ttl se regenera sólo si cambió el Turtle de datos o la ontología
+  (concatenando ambos archivos, sin volver a serializar el grafo).
+
+Uso:
+
+    python3 pipeline.py
+    python3 pipeline.py --force --chunksize 50000
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import fix_nutritional_values
+import fixed
+import limpieza
+import merged
+import preprocessing_others
+import preprocessing_subway
+import rdf_mapper
+import rename
+from paralelo import ordered_map
+
+BASE = Path(__file__).resolve().parent
+
+# CSV con la columna Category ya agregada (ver README), en el orden de ROWNUM
+SOURCES = (
+    (BASE / "FastFoodNutritionMenuV3_clean.csv", preprocessing_others.preparar),
+    (BASE / "exported_data_clean.csv", preprocessing_subway.preparar),
+)
+ONTOLOGY = BASE / "nutritional_ontology.ttl"
+DATA_TTL = BASE / "combined_menu_fixed.ttl"
+MERGED_TTL = BASE / "merged.ttl"
+CACHE_DIR = BASE / ".pipeline_cache"
+
+CHUNKSIZE = 10000
+
+# Módulos cuyo código define la salida: si cambian, se invalida la cache
+STAGE_MODULES = (limpieza, preprocessing_others, preprocessing_subway, merged, rename, fixed,
+                 fix_nutritional_values, rdf_mapper)
+
+
+# --- Hashes y cache ---
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def code_hash():
+    h = hashlib.sha256(Path(__file__).read_bytes())
+    for module in STAGE_MODULES:
+        h.update(Path(module.__file__).read_bytes())
+    return h.hexdigest()
+
+
+def load_manifest():
+    try:
+        return json.loads((CACHE_DIR / "manifest.json").read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    CACHE_DIR.mkdir(exist_ok=True)
+    write_atomic(CACHE_DIR / "manifest.json", json.dumps(manifest, indent=2))
+
+
+def write_atomic(path, text):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def stage_fresh(manifest, stage, inputs_hash, output):
+    """True si la etapa ya corrió con estas entradas y su salida sigue intacta."""
+    entry = manifest.get(stage)
+    return (entry is not None and entry["inputs"] == inputs_hash
+            and output.exists() and sha256_file(output) == entry["output"])
+
+
+# --- Etapas sobre un bloque de filas ---
+def transform(df, prepare, columns):
+    """preprocessing_* → merged.py → rename.py → fixed.py para un bloque."""
+    # object: con pandas >= 3 `map` infiere dtype str y fillna(0) fallaría
+    df = merged.alinear(prepare(df), columns).astype(object)
+    df = merged.rellenar_bebidas(df)
+    df = rename.renombrar(df)
+    return fixed.renombrar_columnas(df)
+
+
+def _chunk_key(source, first_row, chunk, code):
+    h = hashlib.sha256(f"{source.name}|{first_row}|{code}|{','.join(chunk.columns)}".encode())
+    h.update(pd.util.hash_pandas_object(chunk, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def _convert_chunk(chunk, prepare, columns, first_row, fragment):
+    """Turtle de un bloque: el fragmento guardado si existe, si no lo convierte."""
+    if fragment.exists():
+        return fragment.read_text(encoding="utf-8"), False
+    text = rdf_mapper.to_turtle(transform(chunk, prepare, columns), first_row)
+    write_atomic(fragment, text)
+    return text, True
+
+
+def build_data(chunksize, code, stats, workers=1):
+    """Genera DATA_TTL reutilizando los bloques cuyo contenido no cambió."""
+    chunk_dir = CACHE_DIR / "chunks"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    used = set()
+    # columnas (y orden) del primer CSV, como en merged.py
+    first, prepare_first = SOURCES[0]
+    columns = list(prepare_first(pd.read_csv(first, nrows=0, dtype=object)).columns)
+
+    def jobs():
+        first_row = 1
+        for source, prepare in SOURCES:
+            # dtype=object: los valores se copian tal cual (sin pasar por float)
+            for chunk in pd.read_csv(source, chunksize=chunksize, dtype=object):
+                fragment = chunk_dir / f"{_chunk_key(source, first_row, chunk, code)}.ttl"
+                used.add(fragment.name)
+                stats["rows"] += len(chunk)
+                yield chunk, prepare, columns, first_row, fragment
+                first_row += len(chunk)
+
+    tmp = DATA_TTL.with_name(DATA_TTL.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as out:
+        out.write(rdf_mapper.PREFIXES)
+        for text, converted in ordered_map(_convert_chunk, jobs(), workers):
+            out.write(text)
+            stats["converted" if converted else "reused"] += 1
+    os.replace(tmp, DATA_TTL)
+
+    # bloques de corridas anteriores que ya no corresponden a ninguna fila
+    for old in chunk_dir.glob("*.ttl"):
+        if old.name not in used:
+            old.unlink()
+
+
+def build_merged():
+    """Ontología + datos concatenados (el Turtle permite repetir @prefix)."""
+    tmp = MERGED_TTL.with_name(MERGED_TTL.name + ".tmp")
+    with open(tmp, "wb") as out:
+        for path in (ONTOLOGY, DATA_TTL):
+            with open(path, "rb") as f:
+                while block := f.read(1 << 20):
+                    out.write(block)
+            out.write(b"\n")
+    os.replace(tmp, MERGED_TTL)
+
+
+def run(chunksize=CHUNKSIZE, force=False, workers=1):
+    t0 = time.perf_counter()
+    manifest = {} if force else load_manifest()
+    code = code_hash()
+
+    data_inputs = hashlib.sha256(
+        "|".join([code, str(chunksize)] + [sha256_file(p) for p, _ in SOURCES]).encode()).hexdigest()
+    if stage_fresh(manifest, "data", data_inputs, DATA_TTL):
+        print(f"data:   sin cambios ({DATA_TTL.name})")
+    else:
+        stats = {"rows": 0, "converted": 0, "reused": 0}
+        build_data(chunksize, code, stats, workers)
+        manifest["data"] = {"inputs": data_inputs, "output": sha256_file(DATA_TTL)}
+        save_manifest(manifest)
+        print(f"data:   {stats['rows']} filas, {stats['converted']} bloques convertidos, "
+              f"{stats['reused']} reutilizados → {DATA_TTL.name}")
+
+    merged_inputs = hashlib.sha256(f"{sha256_file(ONTOLOGY)}|{manifest['data']['output']}".encode()).hexdigest()
+    if stage_fresh(manifest, "merged", merged_inputs, MERGED_TTL):
+        print(f"merged: sin cambios ({MERGED_TTL.name})")
+    else:
+        build_merged()
+        manifest["merged"] = {"inputs": merged_inputs, "output": sha256_file(MERGED_TTL)}
+        save_manifest(manifest)
+        print(f"merged: {MERGED_TTL.name} regenerado")
+    print(f"Listo en {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye merged.ttl a partir de los CSV limpios")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="filas por bloque")
+    parser.add_argument("--force", action="store_true", help="ignorar la cache y reconstruir todo")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="procesos para convertir bloques")
+    args = parser.parse_args()
+    run(args.chunksize, args.force, args.workers)
@@ -0,0 +1,193 @@
+"""
+Mapeo CSV → RDF sin tarql: combined_menu_fixed.csv → combined_menu_fixed.ttl / .nt.
+
+Hace en una pasada lo mismo que `menu_mapping.sparql` (tarql) seguido de
+`fix_nutritional_values.py`:
+
+- compañía → IRI de DBpedia con una tabla (en vez del IF anidado por fila);
+- nutrientes numéricos como literales `xsd:float` (los valores no numéricos,
+  p. ej. "<1", quedan como string, igual que antes);
+- categorías conocidas como IRIs `ex:Categoria` + `ex:hasPhysicalState`.
+
+El CSV se lee en bloques de `--chunksize` filas y cada bloque se serializa en
+un pool de procesos; la salida se escribe en el orden del CSV, con a lo sumo
+`2 × workers` bloques en memoria.
+
+Uso:
+
+    python3 rdf_mapper.py
+    python3 rdf_mapper.py combined_menu_fixed.csv -o combined_menu.nt --format nt --workers 8
+"""
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from fix_nutritional_values import CATEGORIES, infer_state_from_category
+from paralelo import ordered_map
+
+BASE = Path(__file__).resolve().parent
+INPUT = BASE / "combined_menu_fixed.csv"
+OUTPUT = BASE / "combined_menu_fixed.ttl"
+
+CHUNKSIZE = 10000
+
+ITEM_BASE = "http://example.com/menu/item/"
+EX = "http://example.com/menu#"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+XSD_FLOAT = "http://www.w3.org/2001/XMLSchema#float"
+
+# Igual que el IF anidado de menu_mapping.sparql
+COMPANY_IRIS = {
+    "McDonalds": "http://dbpedia.org/resource/McDonald's",
+    "Burger_King": "http://dbpedia.org/resource/Burger_King",
+    "Pizza_Hut": "http://dbpedia.org/resource/Pizza_Hut",
+    "KFC": "http://dbpedia.org/resource/KFC",
+    "Taco_Bell": "http://dbpedia.org/resource/Taco_Bell",
+    "Wendys": "http://dbpedia.org/resource/The_Wendy's_Company",
+    "Subway": "http://dbpedia.org/resource/Subway_(restaurant)",
+}
+UNKNOWN_COMPANY = EX + "UnknownCompany"
+
+# Columna de combined_menu_fixed.csv → propiedad
+NUMERIC_COLUMNS = (
+    ("Calories", "calories"), ("Total_Fat_g", "totalFat"), ("Saturated_Fat_g", "saturatedFat"),
+    ("Trans_Fat_g", "transFat"), ("Cholesterol_mg", "cholesterol"), ("Sodium_mg", "sodium"),
+    ("Carbs_g", "carbs"), ("Fiber_g", "fiber"), ("Sugars_g", "sugars"), ("Protein_g", "protein"),
+)
+
+CATEGORY_SET = frozenset(CATEGORIES)
+
+FORMATS = ("ttl", "nt")
+
+PREFIXES = """@prefix rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix ex:  <http://example.com/menu#> .
+
+"""
+
+_number = re.compile(r"^[0-9]+(?:\.[0-9]+)?$")
+
+
+def _string(value):
+    value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+    return f'"{value}"'
+
+
+def item_statements(row):
+    """(propiedad, tipo, valor) de una fila; tipo ∈ iri, ex, str, float."""
+    out = [("type", "ex", "MenuItem"),
+           ("company", "iri", COMPANY_IRIS.get(row.get("Company"), UNKNOWN_COMPANY))]
+    item = row.get("Item")
+    if not pd.isna(item):
+        out.append(("itemName", "str", str(item)))
+    category = row.get("Category")
+    state = None
+    if not pd.isna(category):
+        category = str(category)
+        if category in CATEGORY_SET:
+            out.append(("category", "ex", category))
+            state = infer_state_from_category(category)
+        else:
+            out.append(("category", "str", category))
+    for column, prop in NUMERIC_COLUMNS:
+        value = row.get(column)
+        if pd.isna(value):
+            continue
+        value = str(value)
+        out.append((prop, "float" if _number.match(value) else "str", value))
+    if state:
+        out.append(("hasPhysicalState", "ex", state))
+    return out
+
+
+def _turtle_term(kind, value):
+    if kind == "ex":
+        return f"ex:{value}"
+    if kind == "iri":
+        return f"<{value}>"
+    if kind == "float":
+        return f'"{value}"^^xsd:float'
+    return _string(value)
+
+
+def _nt_term(kind, value):
+    if kind == "ex":
+        return f"<{EX}{value}>"
+    if kind == "iri":
+        return f"<{value}>"
+    if kind == "float":
+        return f'"{value}"^^<{XSD_FLOAT}>'
+    return _string(value)
+
+
+def to_turtle(df, first_row):
+    """Turtle de un bloque; los sujetos son item/<first_row + i> (ROWNUM de tarql)."""
+    out = []
+    for rownum, row in enumerate(df.to_dict("records"), start=first_row):
+        lines = []
+        for prop, kind, value in item_statements(row):
+            pred = "rdf:type" if prop == "type" else f"ex:{prop}"
+            lines.append(f"        {pred:<16} {_turtle_term(kind, value)}")
+        out.append(f"<{ITEM_BASE}{rownum}>\n" + " ;\n".join(lines) + " .\n\n")
+    return "".join(out)
+
+
+def to_ntriples(df, first_row):
+    out = []
+    for rownum, row in enumerate(df.to_dict("records"), start=first_row):
+        subject = f"<{ITEM_BASE}{rownum}>"
+        for prop, kind, value in item_statements(row):
+            pred = RDF_TYPE if prop == "type" else EX + prop
+            out.append(f"{subject} <{pred}> {_nt_term(kind, value)} .\n")
+    return "".join(out)
+
+
+SERIALIZERS = {"ttl": to_turtle, "nt": to_ntriples}
+
+
+def _serialize(df, first_row, fmt):
+    return SERIALIZERS[fmt](df, first_row), len(df)
+
+
+def convert(input=INPUT, output=OUTPUT, fmt="ttl", chunksize=CHUNKSIZE, workers=None):
+    """Convierte el CSV completo; devuelve el número de filas."""
+    workers = workers or os.cpu_count() or 1
+
+    def jobs():
+        first_row = 1
+        # dtype=object: los valores se copian tal cual (sin pasar por float)
+        for chunk in pd.read_csv(input, chunksize=chunksize, dtype=object):
+            yield chunk, first_row, fmt
+            first_row += len(chunk)
+
+    rows = 0
+    output = Path(output)
+    tmp = output.with_name(output.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as out:
+        if fmt == "ttl":
+            out.write(PREFIXES)
+        for text, n in ordered_map(_serialize, jobs(), workers):
+            out.write(text)
+            rows += n
+    os.replace(tmp, output)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte combined_menu_fixed.csv a RDF (reemplaza tarql)")
+    parser.add_argument("input", nargs="?", type=Path, default=INPUT)
+    parser.add_argument("-o", "--output", type=Path)
+    parser.add_argument("--format", choices=FORMATS, default="ttl")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="filas por bloque")
+    parser.add_argument("--workers", type=int, help="procesos (por defecto, uno por CPU)")
+    args = parser.parse_args()
+
+    output = args.output or (OUTPUT if args.format == "ttl" else OUTPUT.with_suffix(".nt"))
+    t0 = time.perf_counter()
+    rows = convert(args.input, output, args.format, args.chunksize, args.workers)
+    elapsed = time.perf_counter() - t0
+    print(f"{rows} filas → {output} en {elapsed:.2f} s ({rows / elapsed:.0f} filas/s)")
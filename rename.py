@@ -11,11 +11,11 @@ Este script:
 4. Guarda el CSV resultante listo para procesos de RDF.
 """
 
-# Leer el CSV combinado original
-df = pd.read_csv("combined_menu.csv")
+INPUT = "combined_menu.csv"
+OUTPUT = "combined_menu_renamed.csv"
 
-# Renombrar columnas numéricas para que sean URI-friendly
-df = df.rename(columns={
+# Columnas numéricas con nombres URI-friendly
+COLUMNAS_RDF = {
     "Total Fat (g)": "Total_Fat_g",
     "Saturated Fat (g)": "Saturated_Fat_g",
     "Trans Fat (g)": "Trans_Fat_g",
@@ -25,7 +25,7 @@ df = df.rename(columns={
     "Fiber (g)": "Fiber_g",
     "Sugars (g)": "Sugars_g",
     "Protein (g)": "Protein_g"
-})
+}
 
 def clean_company_name_for_rdf(s):
     """
@@ -65,11 +65,20 @@ def clean_company_name_for_rdf(s):
     s = re.sub(r"[^a-zA-Z0-9_]", "", s)
     return s.strip()
 
-# Aplicar limpieza a la columna Company
-df['Company'] = df['Company'].apply(clean_company_name_for_rdf)
+def renombrar(df):
+    """Columnas y nombres de empresa listos para RDF."""
+    df = df.rename(columns=COLUMNAS_RDF)
+    # Aplicar limpieza a la columna Company
+    df['Company'] = df['Company'].apply(clean_company_name_for_rdf)
+    return df
 
-# Revisar nombres únicos de empresas
-print(df['Company'].unique())
 
-# Guardar CSV renombrado y limpio para RDF
-df.to_csv("combined_menu_renamed.csv", index=False, encoding="utf-8")
+if __name__ == "__main__":
+    # Leer el CSV combinado original
+    df = renombrar(pd.read_csv(INPUT))
+
+    # Revisar nombres únicos de empresas
+    print(df['Company'].unique())
+
+    # Guardar CSV renombrado y limpio para RDF
+    df.to_csv(OUTPUT, index=False, encoding="utf-8")